@@ -0,0 +1,126 @@
+"""
+Набор данных нагрузочного теста и тестов производительности:
+категории, продукты разных владельцев с версиями, статьи блога,
+контакты и пользователи с разными ролями.
+"""
+
+from django.contrib.auth.models import Group, Permission
+from pytils.translit import slugify
+
+from blog.models import Post
+from blog.services import invalidate_blog_list_cache
+from catalog.models import Category, Contacts, Product, ProductVersion
+from catalog.services import (
+    bump_catalog_version,
+    invalidate_categories_cache,
+    invalidate_contacts_cache,
+)
+from users.models import User
+
+CATEGORIES_COUNT = 5
+PRODUCTS_PER_CATEGORY = 30
+VERSIONS_PER_PRODUCT = 3
+POSTS_COUNT = 30
+
+MODERATOR_PERMISSIONS = ("change_category", "change_description", "cancel_publication")
+CONTENT_MANAGER_PERMISSIONS = ("add_post", "change_post", "delete_post")
+
+
+def create_group(name, codenames):
+    """
+    Создает группу пользователей с правами по их кодовым именам
+    или обновляет права существующей группы.
+    """
+    group, _ = Group.objects.get_or_create(name=name)
+    group.permissions.set(Permission.objects.filter(codename__in=codenames))
+    return group
+
+
+def create_user(email, **fields):
+    """
+    Возвращает пользователя с указанным email, создавая его при отсутствии.
+    Пароль не задается: в тестах и нагрузочном тесте пользователи
+    авторизуются через force_login.
+    """
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        user = User(email=email, **{"is_active": True, **fields})
+        user.set_unusable_password()
+        user.save()
+    return user
+
+
+def seed_dataset(
+    categories=CATEGORIES_COUNT,
+    products=CATEGORIES_COUNT * PRODUCTS_PER_CATEGORY,
+    versions=VERSIONS_PER_PRODUCT,
+    posts=POSTS_COUNT,
+    label="",
+):
+    """
+    Наполняет БД набором данных: категории, продукты разных владельцев
+    с версиями, статьи блога, контакты и пользователи с разными ролями.
+    Используется нагрузочным тестом (run_benchmark) и тестами.
+    Пользователи, группы и контакты создаются только при отсутствии,
+    а метка label добавляется к названиям категорий, продуктов и статей,
+    поэтому наполнение можно повторять на одной БД.
+    :return: словарь с пользователями по ролям
+    """
+    owner = create_user("owner@example.com")
+    stranger = create_user("stranger@example.com")
+    moderator = create_user("moderator@example.com")
+    moderator.groups.add(
+        create_group("moderator", MODERATOR_PERMISSIONS),
+        create_group("content_manager", CONTENT_MANAGER_PERMISSIONS),
+    )
+
+    Contacts.objects.get_or_create(
+        pk=1,
+        defaults={
+            "country": "Россия",
+            "address": "Москва, ул. Тверская, 1",
+            "inn": 7700000000,
+        },
+    )
+
+    category_objects = Category.objects.bulk_create(
+        Category(name=f"Категория {i}{label}", description=f"Описание категории {i}")
+        for i in range(max(categories, 1))
+    )
+    product_objects = Product.objects.bulk_create(
+        Product(
+            name=f"Товар {i}{label}",
+            description=f"Описание товара {i}. " * 10,
+            category=category_objects[i % len(category_objects)],
+            price=100 + i * 10,
+            owner=(owner, stranger)[i % 2],
+            is_published=i % 4 != 0,
+        )
+        for i in range(products)
+    )
+    ProductVersion.objects.bulk_create(
+        ProductVersion(
+            product=product,
+            version_number=number,
+            version_name=f"Версия {number}",
+            is_active=number == versions - 1,
+        )
+        for product in product_objects
+        for number in range(versions)
+    )
+    Post.objects.bulk_create(
+        Post(
+            title=f"Статья {i}{label}",
+            slug=slugify(f"Статья {i}{label}"),
+            text="Текст статьи. " * 50,
+            is_published=i % 5 != 0,
+        )
+        for i in range(posts)
+    )
+
+    # bulk_create не отправляет сигналы, поэтому кэши сбрасываются явно.
+    bump_catalog_version()
+    invalidate_categories_cache()
+    invalidate_contacts_cache()
+    invalidate_blog_list_cache()
+    return {"anonymous": None, "owner": owner, "moderator": moderator}
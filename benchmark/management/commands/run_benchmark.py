@@ -0,0 +1,274 @@
+import json
+import os
+import secrets
+import subprocess
+import sys
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from benchmark.dataset import seed_dataset
+from benchmark.routes import EXCLUDED_ROUTES, collect_routes, get_samples
+from benchmark.runner import (
+    ASGITarget,
+    ServerTarget,
+    WSGITarget,
+    compare,
+    run_benchmark,
+)
+
+ROLES = ("anonymous", "owner", "moderator")
+# Цели нагрузки в этом процессе: приложение с синхронными
+# или асинхронными контроллерами.
+IN_PROCESS_TARGETS = {"wsgi": WSGITarget, "asgi": ASGITarget}
+RESULTS_DIR = "benchmark_results"
+
+
+def get_commit():
+    """
+    Возвращает текущий коммит git или None, если он недоступен.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def split(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест всех страниц проекта: задержки p50/p95/p99, "
+        "пропускная способность и количество SQL-запросов на запрос "
+        "для синхронных (WSGI) и асинхронных (ASGI) контроллеров "
+        "или запущенного сервера."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            default="wsgi",
+            help="wsgi или asgi - приложение в этом процессе на временной БД "
+            "с синхронными или асинхронными контроллерами "
+            "или адрес запущенного сервера, например http://127.0.0.1:8000",
+        )
+        parser.add_argument(
+            "--users", type=int, default=10, help="Количество виртуальных пользователей"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=100, help="Количество запросов к странице"
+        )
+        parser.add_argument(
+            "--roles",
+            default=",".join(ROLES),
+            help="Роли виртуальных пользователей через запятую: "
+            "anonymous, owner, moderator",
+        )
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--versions", type=int, default=3)
+        parser.add_argument("--posts", type=int, default=100)
+        parser.add_argument(
+            "--seed",
+            metavar="DATABASE",
+            help="Наполнить перед тестом тестовую БД сервера с указанным именем "
+            "(test_...), на которую указывают настройки; "
+            "для wsgi и asgi временная БД наполняется всегда",
+        )
+        parser.add_argument(
+            "--include", default="", help="Имена страниц или пространств имен"
+        )
+        parser.add_argument(
+            "--exclude",
+            default=",".join(EXCLUDED_ROUTES),
+            help="Исключаемые страницы или пространства имен",
+        )
+        parser.add_argument("--output", help="Файл результатов JSON")
+        parser.add_argument(
+            "--compare", help="Файл результатов предыдущего запуска для сравнения"
+        )
+
+    def seed(self, options):
+        """
+        Наполняет БД общим набором данных (benchmark/dataset.py).
+        Пользователи создаются без пароля, а метка в названиях записей
+        позволяет повторять наполнение на одной БД.
+        :return: словарь с пользователями по ролям
+        """
+        return seed_dataset(
+            categories=options["categories"],
+            products=options["products"],
+            versions=options["versions"],
+            posts=options["posts"],
+            label=f" {secrets.token_hex(3)}",
+        )
+
+    def run(self, target, samples, options):
+        """
+        Собирает адреса страниц и выполняет нагрузку.
+        """
+        routes, skipped = collect_routes(
+            samples, split(options["include"]), split(options["exclude"])
+        )
+        if skipped:
+            self.stderr.write(f"Нет данных для страниц: {', '.join(skipped)}")
+        return run_benchmark(
+            target,
+            routes,
+            options["roles"],
+            max(options["users"], 1),
+            options["requests"],
+        )
+
+    def run_in_process(self, options):
+        """
+        Создает временную БД, наполняет ее и прогоняет нагрузку
+        на приложении в этом процессе.
+        """
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Тестовый клиент отправляет запросы на хост testserver.
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+            ):
+                users = self.seed(options)
+                target = IN_PROCESS_TARGETS[options["target"]](users)
+                return self.run(target, get_samples(users["owner"]), options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def run_subprocess(self, options):
+        """
+        Перезапускает команду в отдельном процессе: выбор синхронных
+        или асинхронных контроллеров зависит от настройки ASYNC_VIEWS
+        и задается при запуске.
+        """
+        env = {**os.environ, "ASYNC_VIEWS": str(options["target"] == "asgi")}
+        if subprocess.run([sys.executable, *sys.argv], env=env).returncode:
+            raise CommandError("Нагрузочный тест завершился с ошибкой")
+
+    @staticmethod
+    def check_seed_database(name):
+        """
+        Проверяет, что наполняемая БД названа явно, является тестовой
+        и именно на нее указывают настройки: наполнение записывает
+        тысячи строк и пользователей в БД из настроек.
+        """
+        configured = str(settings.DATABASES["default"]["NAME"])
+        if name not in (configured, os.path.basename(configured)):
+            raise CommandError(
+                f"Настройки указывают на БД {configured}, а не на {name}"
+            )
+        if not os.path.basename(name).startswith("test_"):
+            raise CommandError(
+                f"Наполняется только тестовая БД (имя начинается с test_): {name}"
+            )
+
+    def run_server(self, options):
+        """
+        Прогоняет нагрузку на запущенном сервере.
+        """
+        if set(options["roles"]) != {"anonymous"}:
+            raise CommandError("Для сервера поддерживается только роль anonymous")
+        if options["seed"]:
+            self.check_seed_database(options["seed"])
+            self.seed(options)
+        return self.run(ServerTarget(options["target"]), get_samples(), options)
+
+    def write_results(self, results, options):
+        """
+        Сохраняет результаты в JSON-файл и возвращает его путь.
+        """
+        commit = get_commit()
+        created_at = datetime.now()
+        path = options["output"] or os.path.join(
+            RESULTS_DIR,
+            f"{created_at:%Y%m%d-%H%M%S}-{commit or 'nocommit'}.json",
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        config = {
+            key: options[key]
+            for key in (
+                "target",
+                "users",
+                "requests",
+                "roles",
+                "categories",
+                "products",
+                "versions",
+                "posts",
+            )
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "commit": commit,
+                    "created_at": created_at.isoformat(timespec="seconds"),
+                    "config": config,
+                    "routes": results,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        return path
+
+    def print_results(self, results, changes):
+        """
+        Выводит таблицу результатов.
+        """
+
+        def number(value, digits=1):
+            return "-" if value is None else f"{value:.{digits}f}"
+
+        self.stdout.write(
+            f"{'Страница':<30}{'запр/с':>9}{'p50 мс':>9}{'p95 мс':>9}"
+            f"{'p99 мс':>9}{'SQL':>7}{'ошибки':>8}{'Δp95 %':>9}{'Δзапр/с %':>11}"
+        )
+        for name, result in results.items():
+            change = changes.get(name, {})
+            self.stdout.write(
+                f"{name:<30}{number(result['rps']):>9}"
+                f"{number(result['p50_ms']):>9}{number(result['p95_ms']):>9}"
+                f"{number(result['p99_ms']):>9}"
+                f"{number(result['queries_per_request']):>7}{result['errors']:>8}"
+                f"{number(change.get('p95'), 0):>9}{number(change.get('rps'), 0):>11}"
+            )
+
+    def handle(self, *args, **options):
+        """
+        Обработка команды: нагрузка на приложение в этом процессе
+        или на сервер, сохранение результатов и сравнение с предыдущими.
+        Результаты режимов wsgi и asgi сравниваются параметром --compare.
+        """
+        options["roles"] = split(options["roles"])
+        unknown = set(options["roles"]) - set(ROLES)
+        if unknown or not options["roles"]:
+            raise CommandError(f"Неизвестные роли: {', '.join(unknown)}")
+        target = options["target"]
+        if target not in IN_PROCESS_TARGETS:
+            results = self.run_server(options)
+        elif settings.ASYNC_VIEWS != (target == "asgi"):
+            self.run_subprocess(options)
+            return
+        else:
+            results = self.run_in_process(options)
+
+        changes = {}
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                changes = compare(results, json.load(file)["routes"])
+        path = self.write_results(results, options)
+        self.print_results(results, changes)
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {path}"))
@@ -0,0 +1,87 @@
+from django.urls import URLResolver, get_resolver, reverse
+
+from blog.models import Post
+from catalog.models import Category, Product
+
+# Страницы, GET-запрос к которым меняет данные или требует токена из письма.
+EXCLUDED_ROUTES = (
+    "admin",
+    "users:logout",
+    "users:email_confirm",
+    "users:change_email",
+    "users:reset_password_confirm",
+)
+# Модель объекта для адресов, контроллер которых не указывает модель.
+ROUTE_MODELS = {"catalog:product_by_category": Category}
+# Параметры запроса, без которых страница пуста.
+ROUTE_QUERIES = {"catalog:search": "q=Товар"}
+
+
+def iter_patterns(patterns, namespace=None):
+    """
+    Обходит схему адресов, возвращая полное имя адреса,
+    контроллер и имена параметров адреса.
+    """
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            nested = pattern.namespace
+            if namespace and nested:
+                nested = f"{namespace}:{nested}"
+            yield from iter_patterns(pattern.url_patterns, nested or namespace)
+        elif pattern.name:
+            name = f"{namespace}:{pattern.name}" if namespace else pattern.name
+            params = getattr(pattern.pattern, "converters", None)
+            if params is None:
+                params = pattern.pattern.regex.groupindex
+            yield name, pattern.callback, list(params)
+
+
+def is_selected(name, prefixes):
+    return any(name == prefix or name.startswith(f"{prefix}:") for prefix in prefixes)
+
+
+def collect_routes(samples, include=None, exclude=EXCLUDED_ROUTES):
+    """
+    Возвращает адреса всех страниц проекта (config/urls.py) с подставленными
+    параметрами: pk и slug берутся из записей samples по модели контроллера.
+    :return: кортеж (словарь {имя: адрес}, список пропущенных имен)
+    """
+    objects = {
+        Product: samples["product"],
+        Category: samples["category"],
+        Post: samples["post"],
+    }
+    routes, skipped = {}, []
+    for name, callback, params in iter_patterns(get_resolver().url_patterns):
+        if is_selected(name, exclude) or (include and not is_selected(name, include)):
+            continue
+        view_class = getattr(callback, "view_class", None)
+        obj = objects.get(ROUTE_MODELS.get(name, getattr(view_class, "model", None)))
+        kwargs = {}
+        for param in params:
+            if obj is not None and param in ("pk", "slug"):
+                kwargs[param] = getattr(obj, param)
+        if len(kwargs) != len(params):
+            skipped.append(name)
+            continue
+        url = reverse(name, kwargs=kwargs)
+        if name in ROUTE_QUERIES:
+            url = f"{url}?{ROUTE_QUERIES[name]}"
+        routes[name] = url
+    return routes, skipped
+
+
+def get_samples(owner=None):
+    """
+    Возвращает записи для подстановки в адреса страниц: первую категорию,
+    опубликованную статью и опубликованный продукт владельца owner
+    (его он может редактировать) или любого владельца.
+    """
+    products = Product.objects.filter(is_published=True, owner__isnull=False)
+    if owner is not None:
+        products = products.filter(owner=owner)
+    return {
+        "category": Category.objects.first(),
+        "product": products.first(),
+        "post": Post.objects.filter(is_published=True).first(),
+    }
@@ -0,0 +1,245 @@
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import math
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+
+
+class ThreadTarget(ABC):
+    """
+    Цель нагрузки, виртуальные пользователи которой работают в пуле потоков,
+    как в многопоточном WSGI-сервере.
+    """
+
+    @abstractmethod
+    def get_client(self, role):
+        """
+        Возвращает клиент виртуального пользователя с ролью role.
+        """
+
+    @abstractmethod
+    def request(self, client, url):
+        """
+        Выполняет запрос к странице.
+        :return: (код ответа, время в секундах, количество SQL-запросов или None)
+        """
+
+    def close(self):
+        """
+        Освобождает ресурсы потока виртуального пользователя.
+        """
+
+    def run(self, url, roles, users, requests):
+        """
+        Выполняет requests запросов к странице users виртуальными пользователями
+        одновременно. Роли распределяются между пользователями по кругу.
+        Один виртуальный пользователь работает в текущем потоке.
+        :return: список результатов запросов
+        """
+        counter = itertools.count()
+
+        def virtual_user(index, in_thread=True):
+            client = self.get_client(roles[index % len(roles)])
+            samples = []
+            try:
+                while next(counter) < requests:
+                    samples.append(self.request(client, url))
+            finally:
+                if in_thread:
+                    self.close()
+            return samples
+
+        if users <= 1:
+            return virtual_user(0, in_thread=False)
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            results = list(executor.map(virtual_user, range(users)))
+        return list(itertools.chain.from_iterable(results))
+
+
+class WSGITarget(ThreadTarget):
+    """
+    Приложение в том же процессе с синхронными контроллерами: запросы
+    проходят все промежуточные слои через тестовый клиент, количество
+    SQL-запросов считается для каждого запроса.
+    """
+
+    def __init__(self, users):
+        self.users = users
+
+    def get_client(self, role):
+        client = Client(raise_request_exception=False)
+        user = self.users.get(role)
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def request(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            status = client.get(url).status_code
+            elapsed = time.perf_counter() - started
+        return status, elapsed, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ASGITarget:
+    """
+    Приложение в том же процессе с асинхронными контроллерами: виртуальные
+    пользователи работают в одном цикле событий, как в ASGI-сервере,
+    а синхронные части запроса (промежуточные слои, сессии) выполняются
+    в отдельном потоке для каждого запроса. SQL-запросы выполняются
+    в этих потоках, поэтому их количество недоступно.
+    """
+
+    def __init__(self, users):
+        self.users = users
+
+    def get_client(self, role):
+        client = AsyncClient(raise_request_exception=False)
+        user = self.users.get(role)
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    async def request(self, client, url):
+        async with ThreadSensitiveContext():
+            started = time.perf_counter()
+            status = (await client.get(url)).status_code
+            return status, time.perf_counter() - started, None
+
+    def run(self, url, roles, users, requests):
+        """
+        Выполняет requests запросов к странице users виртуальными пользователями
+        одновременно. Клиенты авторизуются до запуска цикла событий.
+        :return: список результатов запросов
+        """
+        counter = itertools.count()
+        clients = [self.get_client(roles[index % len(roles)]) for index in range(users)]
+
+        async def virtual_user(client):
+            samples = []
+            while next(counter) < requests:
+                samples.append(await self.request(client, url))
+            return samples
+
+        async def run_users():
+            return await asyncio.gather(*(virtual_user(client) for client in clients))
+
+        return list(itertools.chain.from_iterable(asyncio.run(run_users())))
+
+
+class ServerTarget(ThreadTarget):
+    """
+    Запущенный сервер: запросы отправляются по HTTP от имени анонимного
+    пользователя, количество SQL-запросов недоступно.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def get_client(self, role):
+        return urllib.request.build_opener(NoRedirect)
+
+    def request(self, client, url):
+        started = time.perf_counter()
+        try:
+            with client.open(self.base_url + url, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        return status, time.perf_counter() - started, None
+
+
+def percentile(values, percent):
+    """
+    Возвращает перцентиль отсортированного списка (метод ближайшего ранга).
+    """
+    if not values:
+        return None
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def summarize(samples, elapsed):
+    """
+    Считает задержки, пропускную способность и количество SQL-запросов
+    по результатам запросов к странице.
+    """
+    times = sorted(seconds * 1000 for _, seconds, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    statuses = Counter(str(status) for status, _, _ in samples)
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / elapsed if elapsed else 0,
+        "p50_ms": percentile(times, 50),
+        "p95_ms": percentile(times, 95),
+        "p99_ms": percentile(times, 99),
+        "mean_ms": statistics.fmean(times) if times else None,
+        "queries_per_request": statistics.fmean(queries) if queries else None,
+        "statuses": dict(sorted(statuses.items())),
+        "errors": sum(
+            count for status, count in statuses.items() if not 0 < int(status) < 500
+        ),
+    }
+
+
+def run_route(target, url, roles, users, requests):
+    """
+    Выполняет нагрузку на одну страницу и считает ее результаты.
+    """
+    started = time.perf_counter()
+    samples = target.run(url, roles, max(users, 1), requests)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def run_benchmark(target, routes, roles, users=10, requests=100, warmup=True):
+    """
+    Прогоняет нагрузку по всем страницам.
+    Перед замером каждая страница запрашивается каждым виртуальным
+    пользователем, чтобы прогреть кэши.
+    :return: словарь {имя страницы: адрес и результаты}
+    """
+    results = {}
+    for name, url in routes.items():
+        if warmup:
+            run_route(target, url, roles, users, users)
+        results[name] = {"url": url, **run_route(target, url, roles, users, requests)}
+    return results
+
+
+def compare(results, baseline):
+    """
+    Сравнивает результаты с ранее сохраненными.
+    :return: словарь {имя страницы: изменение p95 и пропускной способности в %}
+    """
+    changes = {}
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous["p95_ms"] or not previous["rps"]:
+            continue
+        changes[name] = {
+            "p95": (result["p95_ms"] / previous["p95_ms"] - 1) * 100,
+            "rps": (result["rps"] / previous["rps"] - 1) * 100,
+        }
+    return changes
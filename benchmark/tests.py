@@ -0,0 +1,114 @@
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from benchmark.dataset import seed_dataset
+from benchmark.routes import collect_routes, get_samples
+from benchmark.runner import (
+    ASGITarget,
+    WSGITarget,
+    compare,
+    percentile,
+    run_benchmark,
+)
+from catalog.models import Product, ProductVersion
+from users.models import User
+
+
+class BenchmarkTest(TestCase):
+    """
+    Наполнение БД, сбор адресов и прогон нагрузки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_dataset(categories=2, products=8, versions=2, posts=4)
+        cls.samples = get_samples(cls.users["owner"])
+
+    def test_seed(self):
+        self.assertEqual(Product.objects.count(), 8)
+        self.assertEqual(ProductVersion.objects.count(), 16)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertTrue(self.users["moderator"].has_perm("catalog.cancel_publication"))
+        # Пароль не задается: войти под наполненными пользователями нельзя.
+        self.assertFalse(any(user.has_usable_password() for user in User.objects.all()))
+        self.assertEqual(self.samples["product"].owner, self.users["owner"])
+        # Повторное наполнение той же БД не конфликтует с уже созданными данными.
+        seed_dataset(categories=1, products=1, versions=1, posts=1, label=" 2")
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_collect_routes(self):
+        routes, skipped = collect_routes(self.samples)
+        product = self.samples["product"]
+        self.assertEqual(
+            routes["catalog:product_detail"],
+            reverse("catalog:product_detail", args=[product.pk]),
+        )
+        self.assertEqual(
+            routes["catalog:product_by_category"],
+            reverse("catalog:product_by_category", args=[self.samples["category"].pk]),
+        )
+        self.assertEqual(
+            routes["blog:view"], reverse("blog:view", args=[self.samples["post"].slug])
+        )
+        self.assertNotIn("users:logout", routes)
+        self.assertFalse(any(name.startswith("admin:") for name in routes))
+        self.assertEqual(skipped, [])
+
+    def test_server_seed_requires_test_database(self):
+        products = Product.objects.count()
+        for name in ("production", "test_other"):
+            with self.subTest(name=name):
+                with self.assertRaises(CommandError):
+                    call_command(
+                        "run_benchmark",
+                        target="http://127.0.0.1:9",
+                        roles="anonymous",
+                        seed=name,
+                    )
+        self.assertEqual(Product.objects.count(), products)
+
+    def test_include(self):
+        routes, _ = collect_routes(self.samples, include=["blog"])
+        self.assertTrue(routes)
+        self.assertTrue(all(name.startswith("blog:") for name in routes))
+
+    def test_run_benchmark(self):
+        routes = {"catalog:home": reverse("catalog:home")}
+        target = WSGITarget(self.users)
+        results = run_benchmark(target, routes, ["owner"], users=1, requests=5)
+        result = results["catalog:home"]
+        self.assertEqual(result["requests"], 5)
+        self.assertEqual(result["statuses"], {"200": 5})
+        self.assertEqual(result["errors"], 0)
+        self.assertGreater(result["queries_per_request"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+        self.assertLessEqual(result["p95_ms"], result["p99_ms"])
+
+    def test_percentile_and_compare(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+        changes = compare(
+            {"home": {"p95_ms": 15, "rps": 50}}, {"home": {"p95_ms": 10, "rps": 100}}
+        )
+        self.assertEqual(changes, {"home": {"p95": 50, "rps": -50}})
+
+
+class ASGITargetTest(TransactionTestCase):
+    """
+    Нагрузка в цикле событий: запросы выполняются в отдельных потоках,
+    поэтому данные должны быть сохранены в БД.
+    """
+
+    def test_run_benchmark(self):
+        users = seed_dataset(categories=1, products=2, versions=1, posts=1)
+        routes = {"catalog:home": reverse("catalog:home")}
+        results = run_benchmark(
+            ASGITarget(users), routes, ["anonymous"], users=2, requests=4
+        )
+        result = results["catalog:home"]
+        self.assertEqual(result["requests"], 4)
+        self.assertEqual(result["statuses"], {"200": 4})
+        self.assertIsNone(result["queries_per_request"])
@@ -1,9 +1,15 @@
 from django.contrib import admin
 
-from blog.models import Post
+from blog.models import Post, PostSlugRedirect
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ("pk", "title", "created_at", "is_published", "views_count")
     list_filter = ("created_at", "is_published")
+
+
+@admin.register(PostSlugRedirect)
+class PostSlugRedirectAdmin(admin.ModelAdmin):
+    list_display = ("old_slug", "post", "created_at")
+    search_fields = ("old_slug",)
@@ -0,0 +1,78 @@
+from django.http import Http404
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response
+
+from blog.models import Post, PostSlugRedirect
+from blog.services import (
+    aget_blog_list_from_cache,
+    aget_blog_list_state,
+    arecord_post_view,
+    get_blog_tier,
+)
+from blog.views import PostDetailView, PostListView
+from users.mixins import AsyncUserMixin
+
+
+class AsyncPostListView(AsyncUserMixin, PostListView):
+    """
+    Асинхронный контроллер списка статей.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу списка из кэша или ответ 304 по заголовкам
+        If-None-Match и If-Modified-Since.
+        """
+        self.tier = get_blog_tier(request.user)
+        self.state = await aget_blog_list_state(self.tier)
+        etag, timestamp = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = await aget_blog_list_from_cache(etag, self.render_page)
+        return self.set_validators(response, etag, timestamp)
+
+    async def render_page(self):
+        """
+        Получает статьи страницы асинхронным запросом и отрисовывает ее.
+        """
+        self.object_list = self.get_queryset()
+        paginator, page, object_list, is_paginated = super().paginate_queryset(
+            self.object_list, self.paginate_by
+        )
+        page.object_list = [post async for post in object_list]
+        self.pagination = (paginator, page, page.object_list, is_paginated)
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Возвращает уже полученную страницу статей.
+        """
+        return self.pagination
+
+
+class AsyncPostDetailView(AsyncUserMixin, PostDetailView):
+    """
+    Асинхронный контроллер детального просмотра статьи.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Отдает статью, учитывая ее просмотр. Если статья по slug не найдена,
+        ищет ее среди старых адресов и выполняет постоянное перенаправление.
+        """
+        slug = kwargs.get(self.slug_url_kwarg)
+        try:
+            self.object = await self.get_queryset().aget(slug=slug)
+        except Post.DoesNotExist:
+            redirect_to = (
+                await PostSlugRedirect.objects.filter(old_slug=slug)
+                .values_list("post__slug", flat=True)
+                .afirst()
+            )
+            if redirect_to is None:
+                raise Http404("Статья не найдена")
+            return redirect(
+                request.resolver_match.view_name, slug=redirect_to, permanent=True
+            )
+        self.object.views_count += await arecord_post_view(self.object.pk)
+        return self.render_to_response(self.get_context_data(object=self.object))
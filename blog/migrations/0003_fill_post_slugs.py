@@ -0,0 +1,31 @@
+from django.db import migrations
+from pytils.translit import slugify
+
+
+def fill_post_slugs(apps, schema_editor):
+    """
+    Заполняет пустые slug и делает повторяющиеся уникальными
+    перед добавлением ограничения уникальности.
+    """
+    Post = apps.get_model("blog", "Post")
+    taken = set()
+    for post in Post.objects.order_by("pk").only("pk", "title", "slug"):
+        base = (post.slug or slugify(post.title))[:140].strip("-") or "post"
+        slug, number = base, 1
+        while slug in taken:
+            number += 1
+            slug = f"{base}-{number}"
+        taken.add(slug)
+        if slug != post.slug:
+            Post.objects.filter(pk=post.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0002_rename_blogpost_post"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_post_slugs, migrations.RunPython.noop),
+    ]
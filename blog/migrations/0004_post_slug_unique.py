@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0003_fill_post_slugs"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="slug",
+            field=models.SlugField(
+                blank=True,
+                help_text="Заполняется по заголовку при создании статьи",
+                max_length=150,
+                unique=True,
+                verbose_name="slug",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PostSlugRedirect",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "old_slug",
+                    models.SlugField(
+                        max_length=150, unique=True, verbose_name="Старый slug"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slug_redirects",
+                        to="blog.post",
+                        verbose_name="Статья",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Старый адрес статьи",
+                "verbose_name_plural": "Старые адреса статей",
+            },
+        ),
+    ]
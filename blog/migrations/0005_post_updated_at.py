@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 13:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_post_slug_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата последнего изменения",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="post_pub_created_idx",
+            ),
+        ),
+    ]
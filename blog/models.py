@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from pytils.translit import slugify
 
 NULLABLE = {"blank": True, "null": True}
 
+SLUG_MAX_LENGTH = 150
+# Количество попыток сохранения статьи, если такой же slug успели занять.
+SLUG_SAVE_ATTEMPTS = 5
+
 
 class Post(models.Model):
     """
@@ -9,16 +14,134 @@ class Post(models.Model):
     """
 
     title = models.CharField(max_length=200, verbose_name="Заголовок")
-    slug = models.CharField(max_length=150, verbose_name="slug", **NULLABLE)
+    slug = models.SlugField(
+        max_length=SLUG_MAX_LENGTH,
+        unique=True,
+        blank=True,
+        verbose_name="slug",
+        help_text="Заполняется по заголовку при создании статьи",
+    )
     text = models.TextField(verbose_name="Текст")
     image = models.ImageField(upload_to="blog/", verbose_name="Изображение", **NULLABLE)
+    # Изображение, для которого созданы уменьшенные копии, и его ширина
+    # (catalog/images.py).
+    variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="Изображение с копиями",
+    )
+    image_width = models.PositiveIntegerField(
+        editable=False, verbose_name="Ширина изображения", **NULLABLE
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата последнего изменения"
+    )
     is_published = models.BooleanField(default=True, verbose_name="Опубликовано")
     views_count = models.IntegerField(default=0, verbose_name="Просмотры")
 
     def __str__(self):
         return f"{self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает slug загруженной статьи, чтобы при его изменении
+        сохранить старый адрес для перенаправления.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get("slug")
+        return instance
+
+    def get_unique_slug(self):
+        """
+        Возвращает свободный slug по заголовку статьи:
+        при совпадении с существующим или старым slug добавляется суффикс -2, -3...
+        """
+        base = slugify(self.title)[: SLUG_MAX_LENGTH - 10].strip("-") or "post"
+        taken = set(
+            Post.objects.filter(slug__startswith=base)
+            .values_list("slug", flat=True)
+            .union(
+                PostSlugRedirect.objects.filter(old_slug__startswith=base).values_list(
+                    "old_slug", flat=True
+                )
+            )
+        )
+        slug, number = base, 1
+        while slug in taken:
+            number += 1
+            slug = f"{base}-{number}"
+        return slug
+
+    def save_with_unique_slug(self, *args, **kwargs):
+        """
+        Сохраняет статью со свободным slug, повторяя попытку,
+        если такой же slug успела занять параллельно созданная статья.
+        """
+        for attempt in range(SLUG_SAVE_ATTEMPTS):
+            self.slug = self.get_unique_slug()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = Post.objects.filter(slug=self.slug).exists()
+                self.slug = ""
+                if not slug_taken or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                    raise
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет статью, при создании заполняя slug одним запросом
+        на запись. При изменении сохраненного slug старый адрес
+        записывается для перенаправления.
+        """
+        loaded_slug = getattr(self, "_loaded_slug", None)
+        if not self.slug:
+            self.save_with_unique_slug(*args, **kwargs)
+        elif loaded_slug and loaded_slug != self.slug:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                PostSlugRedirect.objects.filter(old_slug=self.slug).delete()
+                PostSlugRedirect.objects.update_or_create(
+                    old_slug=loaded_slug, defaults={"post": self}
+                )
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_slug = self.slug
+
     class Meta:
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        indexes = [
+            models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="post_pub_created_idx",
+            ),
+        ]
+
+
+class PostSlugRedirect(models.Model):
+    """
+    Модель старого адреса статьи, с которого выполняется перенаправление.
+    """
+
+    old_slug = models.SlugField(
+        max_length=SLUG_MAX_LENGTH, unique=True, verbose_name="Старый slug"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="slug_redirects",
+        verbose_name="Статья",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    def __str__(self):
+        return f"{self.old_slug} -> {self.post.slug}"
+
+    class Meta:
+        verbose_name = "Старый адрес статьи"
+        verbose_name_plural = "Старые адреса статей"
@@ -0,0 +1,338 @@
+import hashlib
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, When
+from django.http import HttpResponse
+
+from blog.models import Post
+from config.settings import CACHE_ENABLED
+from mailing.services import enqueue_mail
+
+VIEWS_MILESTONE = 100
+MILESTONE_RECIPIENTS = ["putilovskayaa@gmail.com", "putilovskayaa@mail.ru"]
+FLUSH_BATCH_SIZE = 500
+POSTS_PER_PAGE = 12
+BLOG_TIERS = ("public", "author", "manager")
+BLOG_LIST_STATE_KEY = "blog_list_state"
+BLOG_LIST_CACHE_TIMEOUT = 60 * 60
+# Множество pk статей с еще не перенесенными в БД просмотрами
+# и блокировка его изменения (cache.add). Срок блокировки ограничен,
+# чтобы процесс, завершившийся во время изменения, не оставил ее навсегда.
+CHANGED_POSTS_KEY = "post_views_changed"
+CHANGED_POSTS_LOCK_KEY = "post_views_changed_lock"
+CHANGED_POSTS_LOCK_TIMEOUT = 10
+CHANGED_POSTS_LOCK_WAIT = 0.005
+
+
+def get_post_views_key(pk):
+    return f"post_views:{pk}"
+
+
+@contextmanager
+def changed_posts_lock():
+    """
+    Блокировка множества измененных статей: множество хранится одним
+    значением кэша, и без нее одновременные изменения теряли бы друг друга.
+    """
+    while not cache.add(CHANGED_POSTS_LOCK_KEY, 1, CHANGED_POSTS_LOCK_TIMEOUT):
+        time.sleep(CHANGED_POSTS_LOCK_WAIT)
+    try:
+        yield
+    finally:
+        cache.delete(CHANGED_POSTS_LOCK_KEY)
+
+
+def mark_posts_changed(pks):
+    """
+    Добавляет статьи в множество статей с неперенесенными просмотрами.
+    """
+    with changed_posts_lock():
+        changed = cache.get(CHANGED_POSTS_KEY, set())
+        cache.set(CHANGED_POSTS_KEY, changed | set(pks), None)
+
+
+def pop_changed_posts():
+    """
+    Забирает множество статей с неперенесенными просмотрами.
+    :return: отсортированный список pk статей
+    """
+    with changed_posts_lock():
+        changed = cache.get(CHANGED_POSTS_KEY, set())
+        cache.delete(CHANGED_POSTS_KEY)
+    return sorted(changed)
+
+
+def record_post_view(pk):
+    """
+    Учитывает просмотр статьи.
+    Просмотры накапливаются в кэше и записываются в БД периодической
+    задачей flush_post_views. Без кэша просмотр сразу записывается в БД.
+    Статья с первым неперенесенным просмотром добавляется
+    в множество измененных статей, которое читает перенос.
+    :return: количество еще не записанных в БД просмотров статьи
+    """
+    if not CACHE_ENABLED:
+        apply_post_views({pk: 1})
+        return 0
+    key = get_post_views_key(pk)
+    if cache.add(key, 1, None):
+        count = 1
+    else:
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Ключ успели удалить между add и incr.
+            cache.set(key, 1, None)
+            count = 1
+    if count == 1:
+        mark_posts_changed([pk])
+    return count
+
+
+async def arecord_post_view(pk):
+    """
+    Асинхронно учитывает просмотр статьи.
+    :return: количество еще не записанных в БД просмотров статьи
+    """
+    if not CACHE_ENABLED:
+        # Запись с блокировкой строки выполняется в транзакции синхронного ORM.
+        await sync_to_async(apply_post_views)({pk: 1})
+        return 0
+    key = get_post_views_key(pk)
+    if await cache.aadd(key, 1, None):
+        count = 1
+    else:
+        try:
+            count = await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, None)
+            count = 1
+    if count == 1:
+        # Ожидание блокировки не должно останавливать цикл событий.
+        await sync_to_async(mark_posts_changed, thread_sensitive=False)([pk])
+    return count
+
+
+def send_milestone_mail(title):
+    """
+    Ставит в очередь поздравление с достижением статьей порога просмотров.
+    """
+    enqueue_mail(
+        subject="Поздравляем!",
+        message=f'Количество просмотров поста "{title}" достигло {VIEWS_MILESTONE}',
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=MILESTONE_RECIPIENTS,
+    )
+
+
+def apply_post_views(views):
+    """
+    Прибавляет просмотры к счетчикам статей одним атомарным UPDATE.
+    Строки статей блокируются на время транзакции, поэтому переход
+    через порог просмотров видит ровно одна запись, и поздравление
+    ставится в очередь один раз - в той же транзакции.
+    :param views: словарь {pk статьи: количество новых просмотров}
+    """
+    with transaction.atomic():
+        posts = (
+            Post.objects.select_for_update()
+            .filter(pk__in=views)
+            .values_list("pk", "title", "views_count")
+        )
+        for pk, title, views_count in posts:
+            if views_count < VIEWS_MILESTONE <= views_count + views[pk]:
+                send_milestone_mail(title)
+        Post.objects.filter(pk__in=views).update(
+            views_count=Case(
+                *(
+                    When(pk=pk, then=F("views_count") + count)
+                    for pk, count in views.items()
+                ),
+                default=F("views_count"),
+            )
+        )
+
+
+def take_post_views(pks):
+    """
+    Забирает из кэша накопленные просмотры статей: счетчики уменьшаются
+    на прочитанное количество, поэтому просмотры, пришедшие во время
+    переноса, не теряются, а статьи с ними возвращаются в множество
+    измененных.
+    :return: словарь {pk статьи: количество просмотров}
+    """
+    keys = {get_post_views_key(pk): pk for pk in pks}
+    views = {keys[key]: count for key, count in cache.get_many(keys).items() if count}
+    pending = []
+    for pk, count in views.items():
+        try:
+            remaining = cache.decr(get_post_views_key(pk), count)
+        except ValueError:
+            # Ключ вытеснен после чтения: прочитанные просмотры переносятся,
+            # следующий просмотр создаст счетчик заново.
+            continue
+        if remaining > 0:
+            pending.append(pk)
+    if pending:
+        mark_posts_changed(pending)
+    return views
+
+
+def flush_post_views():
+    """
+    Переносит накопленные в кэше просмотры статей в БД порциями.
+    Обрабатываются только статьи из множества измененных,
+    а не все статьи блога.
+    Запускается периодически (настройка CRONJOBS).
+    :return: количество перенесенных просмотров
+    """
+    if not CACHE_ENABLED:
+        return 0
+    flushed = 0
+    changed = pop_changed_posts()
+    for start in range(0, len(changed), FLUSH_BATCH_SIZE):
+        views = take_post_views(changed[start : start + FLUSH_BATCH_SIZE])
+        if not views:
+            continue
+        try:
+            apply_post_views(views)
+        except Exception:
+            # Возвращаем просмотры и еще не обработанные статьи в кэш
+            # до следующего запуска.
+            for pk, count in views.items():
+                try:
+                    cache.incr(get_post_views_key(pk), count)
+                except ValueError:
+                    cache.set(get_post_views_key(pk), count, None)
+            mark_posts_changed([*views, *changed[start + FLUSH_BATCH_SIZE :]])
+            raise
+        flushed += sum(views.values())
+    if flushed:
+        invalidate_blog_list_cache()
+    return flushed
+
+
+def get_blog_tier(user):
+    """
+    Возвращает уровень доступа пользователя к блогу:
+    контент-менеджер видит все статьи, автор может добавлять статьи,
+    остальные видят только опубликованные.
+    Права загружаются один раз и кэшируются в объекте пользователя.
+    """
+    permissions = user.get_all_permissions()
+    if "blog.add_post" in permissions and "blog.change_post" in permissions:
+        return "manager"
+    if "blog.add_post" in permissions:
+        return "author"
+    return "public"
+
+
+def get_visible_posts(tier):
+    """
+    Возвращает статьи, доступные пользователям уровня tier.
+    """
+    if tier == "manager":
+        return Post.objects.all()
+    return Post.objects.filter(is_published=True)
+
+
+def get_blog_list_state(tier):
+    """
+    Возвращает состояние списка статей уровня tier: дату последнего
+    изменения, количество статей и версию закэшированного состояния
+    (время ее вычисления в наносекундах).
+    Состояние считается одним агрегирующим запросом и кэшируется
+    до изменения статей.
+    """
+    key = f"{BLOG_LIST_STATE_KEY}:{tier}"
+    if CACHE_ENABLED:
+        state = cache.get(key)
+        if state is not None:
+            return state
+    state = get_visible_posts(tier).aggregate(
+        last_modified=Max("updated_at"), count=Count("pk")
+    )
+    state["version"] = time.time_ns() if CACHE_ENABLED else 0
+    if CACHE_ENABLED:
+        cache.set(key, state, BLOG_LIST_CACHE_TIMEOUT)
+    return state
+
+
+async def aget_blog_list_state(tier):
+    """
+    Асинхронно возвращает состояние списка статей уровня tier.
+    """
+    key = f"{BLOG_LIST_STATE_KEY}:{tier}"
+    if CACHE_ENABLED:
+        state = await cache.aget(key)
+        if state is not None:
+            return state
+    state = await get_visible_posts(tier).aaggregate(
+        last_modified=Max("updated_at"), count=Count("pk")
+    )
+    state["version"] = time.time_ns() if CACHE_ENABLED else 0
+    if CACHE_ENABLED:
+        await cache.aset(key, state, BLOG_LIST_CACHE_TIMEOUT)
+    return state
+
+
+def get_blog_list_etag(tier, state, page):
+    """
+    Возвращает ETag страницы списка статей.
+    Он меняется при изменении, добавлении и удалении статей.
+    """
+    value = (
+        f"{tier}:{page}:{state['version']}:{state['last_modified']}:{state['count']}"
+    )
+    return f'"{hashlib.md5(value.encode()).hexdigest()}"'
+
+
+def get_blog_list_from_cache(etag, render):
+    """
+    Получает HTML страницы списка статей из кэша по ее ETag.
+    Если кэш пуст, получает страницу функцией render и кэширует
+    успешный ответ.
+    """
+    if not CACHE_ENABLED:
+        return render()
+    key = f"blog_list:{etag}"
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content)
+    response = render()
+    if response.status_code == 200:
+        response.render()
+        cache.set(key, response.content, BLOG_LIST_CACHE_TIMEOUT)
+    return response
+
+
+async def aget_blog_list_from_cache(etag, render):
+    """
+    Асинхронно получает HTML страницы списка статей из кэша по ее ETag.
+    Если кэш пуст, получает страницу корутиной render и кэширует
+    успешный ответ.
+    """
+    if not CACHE_ENABLED:
+        return await render()
+    key = f"blog_list:{etag}"
+    content = await cache.aget(key)
+    if content is not None:
+        return HttpResponse(content)
+    response = await render()
+    if response.status_code == 200:
+        await sync_to_async(response.render)()
+        await cache.aset(key, response.content, BLOG_LIST_CACHE_TIMEOUT)
+    return response
+
+
+def invalidate_blog_list_cache():
+    """
+    Сбрасывает состояние списков статей всех уровней доступа.
+    """
+    if CACHE_ENABLED:
+        cache.delete_many([f"{BLOG_LIST_STATE_KEY}:{tier}" for tier in BLOG_TIERS])
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blog.models import Post
+from blog.services import invalidate_blog_list_cache
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш списков статей после изменения статьи.
+    """
+    transaction.on_commit(invalidate_blog_list_cache)
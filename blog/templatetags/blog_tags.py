@@ -1,10 +0,0 @@
-from django import template
-
-register = template.Library()
-
-
-@register.filter
-def media_filter(path):
-    if path:
-        return f"/media/{path}"
-    return "#"
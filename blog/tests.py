@@ -1 +1,295 @@
+import time
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.async_views import AsyncPostDetailView, AsyncPostListView
+from blog.models import Post
+from blog.services import (
+    CHANGED_POSTS_LOCK_KEY,
+    POSTS_PER_PAGE,
+    VIEWS_MILESTONE,
+    flush_post_views,
+    get_post_views_key,
+    record_post_view,
+)
+from mailing.models import OutgoingEmail
+from tests.perf import CacheEnabledMixin, DatasetMixin, ViewPerformanceMixin
+
+
+class BlogViewsPerformanceTest(ViewPerformanceMixin, TestCase):
+    """
+    Бюджет SQL-запросов и время ответа контроллеров блога.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.post = Post.objects.filter(is_published=True).first()
+
+    def test_post_list(self):
+        url = reverse("blog:post_list")
+        # Состояние списка (дата изменения и количество статей) и страница.
+        self.assertViewWithinBudget(url, "anonymous", 2)
+        self.assertViewWithinBudget(url, "owner", 6)
+        self.assertViewWithinBudget(url, "moderator", 6)
+
+    def test_post_detail(self):
+        url = reverse("blog:view", args=[self.post.slug])
+        # Без кэша просмотр сразу записывается в БД в отдельной транзакции:
+        # блокировка статьи, UPDATE и две команды точки сохранения.
+        self.assertViewWithinBudget(url, "anonymous", 5)
+        self.assertViewWithinBudget(url, "owner", 9)
+        self.assertViewWithinBudget(url, "moderator", 9)
+
+    def test_post_create(self):
+        url = reverse("blog:create")
+        self.assertViewWithinBudget(url, "anonymous", 0)
+        self.assertViewWithinBudget(url, "owner", 0)
+        self.assertViewWithinBudget(url, "moderator", 0)
+
+    def test_post_edit(self):
+        url = reverse("blog:edit", args=[self.post.slug])
+        self.assertViewWithinBudget(url, "anonymous", 1)
+        self.assertViewWithinBudget(url, "owner", 1)
+        self.assertViewWithinBudget(url, "moderator", 1)
+
+    def test_post_delete(self):
+        url = reverse("blog:delete", args=[self.post.slug])
+        self.assertViewWithinBudget(url, "anonymous", 1)
+        self.assertViewWithinBudget(url, "owner", 1)
+        self.assertViewWithinBudget(url, "moderator", 1)
+
+
+class PostViewsCounterTest(CacheEnabledMixin, TestCase):
+    """
+    Накопление просмотров статей в кэше и их перенос в БД.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.filter(is_published=True).first()
+        self.url = reverse("blog:view", args=[self.post.slug])
+
+    def test_views_buffered(self):
+        # Просмотр не записывает статью в БД: только запрос самой статьи.
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["object"].views_count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 0)
+
+        self.assertEqual(flush_post_views(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
+        self.assertEqual(flush_post_views(), 0)
+
+    def test_milestone_mail_sent_once(self):
+        Post.objects.filter(pk=self.post.pk).update(views_count=VIEWS_MILESTONE - 2)
+        for _ in range(3):
+            record_post_view(self.post.pk)
+        flush_post_views()
+        for _ in range(3):
+            record_post_view(self.post.pk)
+        flush_post_views()
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, VIEWS_MILESTONE + 4)
+
+    def test_flush_reads_only_changed_posts(self):
+        other = Post.objects.exclude(pk=self.post.pk).first()
+        record_post_view(self.post.pk)
+        with mock.patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            self.assertEqual(flush_post_views(), 1)
+        get_many.assert_called_once_with(
+            {get_post_views_key(self.post.pk): self.post.pk}
+        )
+        # Просмотры после переноса снова отмечают статью измененной.
+        record_post_view(self.post.pk)
+        record_post_view(other.pk)
+        self.assertEqual(flush_post_views(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
+
+    def test_flush_survives_evicted_counter(self):
+        other = Post.objects.exclude(pk=self.post.pk).first()
+        record_post_view(self.post.pk)
+        record_post_view(other.pk)
+        decr = cache.decr
+
+        def evicted_decr(key, delta=1, version=None):
+            if key == get_post_views_key(self.post.pk):
+                raise ValueError
+            return decr(key, delta, version)
+
+        with mock.patch.object(cache, "decr", side_effect=evicted_decr):
+            self.assertEqual(flush_post_views(), 2)
+        other.refresh_from_db()
+        self.assertEqual(other.views_count, 1)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_stock_cache_backend(self):
+        # Множество измененных статей использует только стандартный API кэша.
+        other = Post.objects.exclude(pk=self.post.pk).first()
+        for pk in (self.post.pk, other.pk, self.post.pk):
+            record_post_view(pk)
+        self.assertEqual(flush_post_views(), 3)
+        other.refresh_from_db()
+        self.assertEqual(other.views_count, 1)
+        self.assertIsNone(cache.get(CHANGED_POSTS_LOCK_KEY))
+
+    def test_edit_keeps_flushed_views(self):
+        self.login_as("moderator")
+        url = reverse("blog:edit", args=[self.post.slug])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {"title": "Новый заголовок", "text": "Текст"})
+        update = next(
+            query["sql"] for query in queries if query["sql"].startswith("UPDATE")
+        )
+        self.assertIn('"title"', update)
+        self.assertNotIn('"views_count"', update)
+
+
+class PostSlugTest(TestCase):
+    """
+    Уникальные и постоянные адреса статей.
+    """
+
+    def test_unique_slug(self):
+        first = Post.objects.create(title="Новая статья", text="Текст")
+        # Один запрос занятых slug и одна запись в БД в точке сохранения.
+        with self.assertNumQueries(4):
+            second = Post.objects.create(title="Новая статья", text="Текст")
+        third = Post.objects.create(title="Новая статья", text="Текст")
+        self.assertEqual(
+            [first.slug, second.slug, third.slug],
+            ["novaya-statya", "novaya-statya-2", "novaya-statya-3"],
+        )
+
+    def test_slug_stable_on_title_change(self):
+        post = Post.objects.create(title="Новая статья", text="Текст")
+        post.title = "Другой заголовок"
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.slug, "novaya-statya")
+        self.assertFalse(post.slug_redirects.exists())
+
+    def test_old_slug_redirect(self):
+        post = Post.objects.create(title="Новая статья", text="Текст")
+        post = Post.objects.get(pk=post.pk)
+        post.slug = "drugoi-adres"
+        post.save()
+        response = self.client.get(reverse("blog:view", args=["novaya-statya"]))
+        self.assertRedirects(
+            response,
+            reverse("blog:view", args=["drugoi-adres"]),
+            status_code=301,
+        )
+        # Старый адрес не выдается новым статьям.
+        other = Post.objects.create(title="Новая статья", text="Текст")
+        self.assertEqual(other.slug, "novaya-statya-2")
+        response = self.client.get(reverse("blog:view", args=["unknown"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostListCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэш страниц списка статей и условные запросы.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("blog:post_list")
+
+    def test_pagination(self):
+        response = self.client.get(self.url, {"page": 2})
+        published = Post.objects.filter(is_published=True).count()
+        self.assertEqual(response.context["paginator"].count, published)
+        self.assertEqual(len(response.context["object_list"]), POSTS_PER_PAGE)
+        self.assertEqual(self.client.get(self.url, {"page": 100}).status_code, 404)
+
+    def test_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Другая страница и другой уровень доступа имеют свой ETag.
+        response = self.client.get(self.url, {"page": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.login_as("moderator")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unpublish_newest_post_changes_last_modified(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        post = Post.objects.filter(is_published=True).latest("updated_at")
+        post.is_published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        # Следующее состояние списка вычисляется позже предыдущего.
+        later = time.time_ns() + 2 * 10**9
+        with mock.patch("blog.services.time.time_ns", return_value=later):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(post, response.context["object_list"])
+
+    def test_post_change_invalidates_list(self):
+        response = self.client.get(self.url)
+        post = Post.objects.filter(is_published=True).order_by("-created_at").first()
+        post.title = "Новый заголовок"
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertContains(response, "Новый заголовок")
+
+
+class AsyncBlogViewsTest(DatasetMixin, TestCase):
+    """
+    Асинхронные контроллеры блога отдают те же данные, что и синхронные.
+    """
+
+    async def test_post_list(self):
+        url = reverse("blog:post_list") + "?page=2"
+        for role in ("anonymous", "moderator"):
+            with self.subTest(role=role):
+                await sync_to_async(self.login_as)(role)
+                expected = await sync_to_async(self.client.get)(url)
+                response = await self.arequest_view(AsyncPostListView, url, role)
+                self.assertEqual(
+                    list(response.context_data["object_list"]),
+                    list(expected.context["object_list"]),
+                )
+                self.assertEqual(response["ETag"], expected["ETag"])
+
+    async def test_post_detail_counts_view(self):
+        post = await Post.objects.filter(is_published=True).afirst()
+        url = reverse("blog:view", args=[post.slug])
+        response = await self.arequest_view(AsyncPostDetailView, url)
+        self.assertContains(response, post.title)
+        await post.arefresh_from_db()
+        self.assertEqual(post.views_count, 1)
+
+    async def test_old_slug_redirect(self):
+        post = await Post.objects.filter(is_published=True).afirst()
+        old_slug = post.slug
+        post.slug = "drugoi-adres"
+        await sync_to_async(post.save)()
+        response = await self.arequest_view(
+            AsyncPostDetailView, reverse("blog:view", args=[old_slug])
+        )
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response.url, reverse("blog:view", args=["drugoi-adres"]))
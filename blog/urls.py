@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from blog.apps import BlogConfig
@@ -9,6 +10,12 @@ from blog.views import (
     PostDeleteView,
 )
 
+if settings.ASYNC_VIEWS:
+    from blog.async_views import (
+        AsyncPostDetailView as PostDetailView,
+        AsyncPostListView as PostListView,
+    )
+
 app_name = BlogConfig.name
 
 
@@ -1,6 +1,8 @@
-from django.conf import settings
-from django.core.mail import send_mail
+from django.http import Http404
+from django.shortcuts import redirect
 from django.urls import reverse_lazy, reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.generic import (
     ListView,
     DetailView,
@@ -8,31 +10,115 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
-from pytils.translit import slugify
 
-from blog.models import Post
+from blog.models import Post, PostSlugRedirect
+from blog.services import (
+    POSTS_PER_PAGE,
+    get_blog_list_etag,
+    get_blog_list_from_cache,
+    get_blog_list_state,
+    get_blog_tier,
+    get_visible_posts,
+    record_post_view,
+)
+
+
+POST_FIELDS = ("title", "text", "image", "is_published")
+
+
+class PostSlugRedirectMixin:
+    """
+    Миксин перенаправления со старого адреса статьи на текущий.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Если статья по slug не найдена, ищет ее среди старых адресов
+        и выполняет постоянное перенаправление.
+        """
+        try:
+            return super().get(request, *args, **kwargs)
+        except Http404:
+            redirect_to = (
+                PostSlugRedirect.objects.filter(old_slug=kwargs.get("slug"))
+                .values_list("post__slug", flat=True)
+                .first()
+            )
+            if redirect_to is None:
+                raise
+            return redirect(
+                request.resolver_match.view_name, slug=redirect_to, permanent=True
+            )
 
 
 class PostListView(ListView):
     """
     Контроллер списка статей.
+    Страницы кэшируются для каждого уровня доступа и поддерживают
+    условные запросы: при неизменном списке возвращается ответ 304.
     """
 
     model = Post
+    paginate_by = POSTS_PER_PAGE
+
+    def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу списка из кэша или ответ 304 по заголовкам
+        If-None-Match и If-Modified-Since.
+        """
+        self.tier = get_blog_tier(request.user)
+        self.state = get_blog_list_state(self.tier)
+        etag, timestamp = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = get_blog_list_from_cache(
+                etag, lambda: super(PostListView, self).get(request, *args, **kwargs)
+            )
+        return self.set_validators(response, etag, timestamp)
+
+    def get_validators(self):
+        """
+        Возвращает ETag и время последнего изменения (timestamp) страницы списка.
+        Время изменения - версия состояния списка: она вычисляется заново
+        после каждого сброса кэша и не уменьшается, в отличие от даты
+        изменения самой новой статьи при ее удалении или снятии с публикации.
+        Без кэша версия не ведется, и отдается только ETag.
+        """
+        etag = get_blog_list_etag(
+            self.tier, self.state, self.request.GET.get(self.page_kwarg, "1")
+        )
+        version = self.state["version"]
+        return etag, version // 10**9 if version else None
+
+    def set_validators(self, response, etag, timestamp):
+        """
+        Добавляет валидаторы к заголовкам ответа.
+        """
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        # Кэши могут хранить страницу, но должны проверять ее актуальность.
+        response["Cache-Control"] = "no-cache"
+        return response
 
     def get_queryset(self):
         """
         В зависимости от прав доступа пользователя возвращает все или только опубликованные статьи.
         :return: queryset статей
         """
-        if self.request.user.has_perm("blog.add_post") and self.request.user.has_perm(
-            "blog.change_post"
-        ):
-            return super().get_queryset().order_by("-created_at")
-        return super().get_queryset().filter(is_published=True).order_by("-created_at")
+        return get_visible_posts(self.tier).order_by("-created_at", "-pk")
+
+    def get_paginator(self, *args, **kwargs):
+        """
+        Использует количество статей из состояния списка
+        вместо отдельного запроса.
+        """
+        paginator = super().get_paginator(*args, **kwargs)
+        paginator.count = self.state["count"]
+        return paginator
 
 
-class PostDetailView(DetailView):
+class PostDetailView(PostSlugRedirectMixin, DetailView):
     """
     Контроллер детального просмотра статьи.
     """
@@ -41,69 +127,55 @@ class PostDetailView(DetailView):
 
     def get_object(self, queryset=None):
         """
-        Прибавляет к счетчику просмотров 1.
-        Если счетчик просмотров достиг 100, отправляет письмо на электронную почту.
+        Учитывает просмотр статьи.
+        Счетчик увеличивается периодической задачей, поэтому к значению
+        из БД прибавляются еще не записанные просмотры.
         :return: объект статьи
         """
         self.object = super().get_object(queryset)
-        self.object.views_count += 1
-        if self.object.views_count == 100:
-            send_mail(
-                subject="Поздравляем!",
-                message=f'Количество просмотров поста "{self.object.title}" достигло 100',
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=["putilovskayaa@gmail.com", "putilovskayaa@mail.ru"],
-            )
-        self.object.save()
+        self.object.views_count += record_post_view(self.object.pk)
         return self.object
 
 
 class PostCreateView(CreateView):
     """
     Контроллер создания новой статьи.
+    slug статьи заполняется по заголовку при сохранении.
     """
 
     model = Post
-    fields = "__all__"
+    fields = POST_FIELDS
     success_url = reverse_lazy("blog:post_list")
 
-    def form_valid(self, form):
-        """
-        Привязывает к новой статье slug.
-        """
-        if form.is_valid():
-            new_post = form.save()
-            new_post.slug = slugify(new_post.title)
-            new_post.save()
-        return super().form_valid(form)
-
 
-class PostUpdateView(UpdateView):
+class PostUpdateView(PostSlugRedirectMixin, UpdateView):
     """
     Контроллер редактирования статьи.
+    slug статьи при изменении заголовка не меняется.
     """
 
     model = Post
-    fields = "__all__"
+    fields = POST_FIELDS
 
     def form_valid(self, form):
         """
-        Привязывает к редактируемой статье slug.
+        Сохраняет только поля формы: счетчик просмотров, прочитанный
+        при открытии статьи, не перезаписывает перенесенные за это время
+        в БД просмотры.
         """
-        if form.is_valid():
-            new_post = form.save()
-            new_post.slug = slugify(new_post.title)
-            new_post.save()
-        return super().form_valid(form)
+        self.object = form.save(commit=False)
+        # variants_source сбрасывается при загрузке нового изображения.
+        self.object.save(update_fields=[*POST_FIELDS, "variants_source", "updated_at"])
+        return redirect(self.get_success_url())
 
     def get_success_url(self):
         """
-        Возвращает URL страницы списка статей после успешного редактирования.
+        Возвращает URL страницы статьи после успешного редактирования.
         """
-        return reverse("blog:view", args=[self.kwargs.get("slug")])
+        return reverse("blog:view", args=[self.object.slug])
 
 
-class PostDeleteView(DeleteView):
+class PostDeleteView(PostSlugRedirectMixin, DeleteView):
     """
     Контроллер удаления статьи.
     """
@@ -1,5 +1,13 @@
 from django.contrib import admin
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 
+from catalog.export import (
+    CONTENT_TYPES,
+    aiterate_chunks,
+    export_products,
+    get_export_filename,
+)
 from catalog.models import Category, Product, Contacts, ProductVersion
 
 
@@ -19,6 +27,34 @@ class ProductAdmin(admin.ModelAdmin):
         "name",
         "description",
     )
+    actions = ("export_csv", "export_jsonl")
+
+    @staticmethod
+    def export(request, queryset, export_format, compress=False):
+        """
+        Отдает выгрузку выбранных продуктов потоком, не формируя файл в памяти.
+        Под ASGI выгрузка отдается асинхронным итератором.
+        """
+        content = export_products(queryset, export_format, compress)
+        if isinstance(request, ASGIRequest):
+            content = aiterate_chunks(content)
+        response = StreamingHttpResponse(
+            content,
+            content_type=(
+                "application/gzip" if compress else CONTENT_TYPES[export_format]
+            ),
+        )
+        filename = get_export_filename(export_format, compress)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description="Выгрузить в CSV")
+    def export_csv(self, request, queryset):
+        return self.export(request, queryset, "csv")
+
+    @admin.action(description="Выгрузить в JSON Lines (gzip)")
+    def export_jsonl(self, request, queryset):
+        return self.export(request, queryset, "jsonl", compress=True)
 
 
 @admin.register(Contacts)
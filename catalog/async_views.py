@@ -0,0 +1,123 @@
+import asyncio
+
+from django.http import Http404
+
+from catalog.models import Product
+from catalog.pagination import apaginate_by_cursor
+from catalog.services import (
+    aget_catalog_data_from_cache,
+    aget_catalog_list_etag,
+    aget_categories_from_cache,
+    aget_contacts_from_cache,
+    aget_product_detail_from_cache,
+    aget_product_detail_validators,
+)
+from catalog.views import CategoryListView, ProductDetailView, ProductListView
+from users.mixins import AsyncUserMixin
+
+
+class AsyncCategoryListView(AsyncUserMixin, CategoryListView):
+    """
+    Асинхронный контроллер списка категорий.
+    """
+
+    load_permissions = False
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Получает категории и контакты одновременно.
+        """
+        self.object_list, contacts = await asyncio.gather(
+            aget_categories_from_cache(), aget_contacts_from_cache()
+        )
+        return self.render_to_response(self.get_context_data(contacts=contacts))
+
+
+class AsyncProductListView(AsyncUserMixin, ProductListView):
+    """
+    Асинхронный контроллер списка продуктов.
+    """
+
+    async def aget_validators(self):
+        """
+        Возвращает ETag страницы по версии каталога.
+        """
+        etag = await aget_catalog_list_etag(
+            self.request.user, self.request.get_full_path()
+        )
+        return etag, None
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Получает страницу продуктов, фасеты и контакты одновременно.
+        """
+        self.object_list = self.get_queryset()
+        self.page, self.facets, contacts = await asyncio.gather(
+            aget_catalog_data_from_cache(
+                "product_list",
+                request.user,
+                (
+                    self.get_filter_query(),
+                    self.get_sort(),
+                    request.GET.get("cursor", ""),
+                ),
+                lambda: apaginate_by_cursor(
+                    self.object_list,
+                    self.get_sort(),
+                    request.GET.get("cursor"),
+                    self.paginate_by,
+                ),
+            ),
+            self.aget_facets(),
+            aget_contacts_from_cache(),
+        )
+        return self.render_to_response(self.get_context_data(contacts=contacts))
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Возвращает уже полученную страницу продуктов.
+        """
+        return None, self.page, self.page.object_list, self.page.has_other_pages()
+
+    def get_facets(self):
+        """
+        Возвращает уже посчитанные фасеты.
+        """
+        return self.facets
+
+
+class AsyncProductDetailView(AsyncUserMixin, ProductDetailView):
+    """
+    Асинхронный контроллер детальной информации о продукте.
+    """
+
+    async def aget_validators(self):
+        """
+        Возвращает ETag и время изменения страницы по отметке изменения продукта.
+        """
+        return await aget_product_detail_validators(
+            self.request.user, self.kwargs.get("pk")
+        )
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу продукта из кэша уровня видимости пользователя.
+        """
+        return await aget_product_detail_from_cache(
+            request.user, kwargs.get("pk"), self.render_product
+        )
+
+    async def render_product(self):
+        """
+        Получает продукт с категорией и активной версией и контакты одновременно.
+        """
+        try:
+            self.object, contacts = await asyncio.gather(
+                self.get_queryset().aget(pk=self.kwargs.get("pk")),
+                aget_contacts_from_cache(for_shared_page=True),
+            )
+        except Product.DoesNotExist:
+            raise Http404("Продукт не найден")
+        return self.render_to_response(
+            self.get_context_data(object=self.object, contacts=contacts)
+        )
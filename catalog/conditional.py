@@ -0,0 +1,77 @@
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Примесь условных GET-запросов к страницам каталога.
+    Валидаторы страницы (ETag и время изменения) вычисляются до запросов
+    к БД и отрисовки шаблона, и при совпадении с заголовками If-None-Match
+    или If-Modified-Since сразу возвращается ответ 304.
+    Работает и с асинхронными контроллерами.
+    """
+
+    def get_validators(self):
+        """
+        Возвращает ETag и время последнего изменения страницы (timestamp)
+        или (None, None), если их нельзя получить без запросов к БД.
+        """
+        return None, None
+
+    async def aget_validators(self):
+        """
+        Асинхронно возвращает ETag и время последнего изменения страницы.
+        """
+        return await sync_to_async(self.get_validators)()
+
+    def set_validators(self, response, etag, last_modified):
+        """
+        Добавляет валидаторы к заголовкам ответа.
+        """
+        if etag is not None:
+            response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # Кэши могут хранить страницу, но должны проверять ее актуальность.
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Отвечает 304 на условный запрос к неизменившейся странице
+        и добавляет валидаторы к заголовкам ответа.
+        """
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        if etag is None and last_modified is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, last_modified)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        Асинхронный вариант dispatch.
+        """
+        if request.method not in ("GET", "HEAD"):
+            return await super().dispatch(request, *args, **kwargs)
+        etag, last_modified = await self.aget_validators()
+        if etag is None and last_modified is None:
+            return await super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, last_modified)
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from catalog.services import get_contacts_from_cache
+
+
+def contacts(request):
+    """
+    Добавляет контакты организации в контекст всех шаблонов.
+    Контакты загружаются только при обращении к ним в шаблоне.
+    """
+    return {"contacts": SimpleLazyObject(get_contacts_from_cache)}
@@ -0,0 +1,107 @@
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+
+# Заголовок колонки -> поле выборки продуктов.
+EXPORT_FIELDS = {
+    "id": "pk",
+    "name": "name",
+    "description": "description",
+    "price": "price",
+    "category": "category__name",
+    "owner": "owner__email",
+    "is_published": "is_published",
+    "active_version": "active_version",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+EXPORT_FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class Echo:
+    """
+    Псевдо-файл для csv.writer: возвращает строку вместо записи.
+    """
+
+    def write(self, value):
+        return value
+
+
+def get_export_rows(queryset, chunk_size=2000):
+    """
+    Возвращает строки выгрузки продуктов с категорией, владельцем
+    и активной версией. Строки считываются порциями (в PostgreSQL -
+    серверным курсором) и не накапливаются в памяти.
+    """
+    return (
+        queryset.with_active_version()
+        .order_by("pk")
+        .values_list(*EXPORT_FIELDS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def format_rows(rows, export_format):
+    """
+    Форматирует строки выгрузки в CSV (с заголовком) или JSON Lines.
+    """
+    if export_format == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            line = json.dumps(
+                dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False, default=str
+            )
+            yield line + "\n"
+
+
+def encode_chunks(lines, chunk_size=2000, compress=False):
+    """
+    Объединяет строки в блоки байтов, при необходимости сжимая их gzip.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            data = "".join(buffer).encode()
+            buffer.clear()
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = "".join(buffer).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def export_products(queryset, export_format="csv", compress=False, chunk_size=2000):
+    """
+    Возвращает генератор блоков байтов выгрузки продуктов.
+    Потребление памяти не зависит от количества продуктов.
+    """
+    rows = get_export_rows(queryset, chunk_size)
+    return encode_chunks(format_rows(rows, export_format), chunk_size, compress)
+
+
+async def aiterate_chunks(chunks):
+    """
+    Отдает блоки выгрузки асинхронно для ответа под ASGI: синхронный
+    итератор ответа ASGI-обработчик Django сначала считывает целиком.
+    Каждый блок вычисляется в потоке синхронного кода запроса,
+    поэтому курсор БД используется в одном потоке.
+    """
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def get_export_filename(export_format, compress=False):
+    return f"products.{export_format}" + (".gz" if compress else "")
@@ -0,0 +1,230 @@
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max, Min, Q
+
+from catalog.services import (
+    aget_catalog_data_from_cache,
+    aget_categories_from_cache,
+    get_catalog_data_from_cache,
+    get_categories_from_cache,
+)
+
+# Границы интервалов гистограммы цен: [0, 500), [500, 1000), ..., [10000, ∞).
+PRICE_BUCKETS = (0, 500, 1000, 2000, 5000, 10000)
+FILTER_PARAMS = ("price_min", "price_max", "category", "published")
+
+
+def get_facet_aggregates(conditions, category_ids, with_published=False):
+    """
+    Возвращает агрегаты фасетов списка продуктов для одного запроса:
+    количество продуктов по категориям, интервалам цен и признаку публикации,
+    а также минимальную и максимальную цену.
+    Счетчики каждой группы учитывают все выбранные фильтры, кроме фильтра
+    самой группы, чтобы было видно, сколько продуктов даст другой выбор.
+    :param conditions: словарь условий выбранных фильтров по группам
+    """
+
+    def other_than(group, condition=None):
+        result = Q()
+        for name, other_condition in conditions.items():
+            if name != group:
+                result &= other_condition
+        if condition is not None:
+            result &= condition
+        return result or None
+
+    aggregates = {
+        "price_min": Min("price", filter=other_than("price")),
+        "price_max": Max("price", filter=other_than("price")),
+    }
+    for pk in category_ids:
+        aggregates[f"category_{pk}"] = Count(
+            "pk", filter=other_than("category", Q(category=pk))
+        )
+    for index, low in enumerate(PRICE_BUCKETS):
+        condition = Q(price__gte=low)
+        if index + 1 < len(PRICE_BUCKETS):
+            condition &= Q(price__lt=PRICE_BUCKETS[index + 1])
+        aggregates[f"price_{index}"] = Count(
+            "pk", filter=other_than("price", condition)
+        )
+    if with_published:
+        for value in (True, False):
+            aggregates[f"published_{value:d}"] = Count(
+                "pk", filter=other_than("published", Q(is_published=value))
+            )
+    return aggregates
+
+
+def get_facets(queryset, conditions, category_ids, with_published=False):
+    """
+    Считает фасеты списка продуктов одним агрегирующим запросом.
+    Счетчики с условиями filter считаются за один проход по видимым
+    продуктам без условия на категорию, поэтому индекс здесь не помогает:
+    результат кэшируется до смены версии каталога.
+    """
+    return queryset.aggregate(
+        **get_facet_aggregates(conditions, category_ids, with_published)
+    )
+
+
+async def aget_facets(queryset, conditions, category_ids, with_published=False):
+    """
+    Асинхронно считает фасеты списка продуктов одним агрегирующим запросом.
+    """
+    return await queryset.aaggregate(
+        **get_facet_aggregates(conditions, category_ids, with_published)
+    )
+
+
+class ProductFilterMixin:
+    """
+    Миксин фильтрации списка продуктов по цене, категории
+    и (для модераторов) признаку публикации с подсчетом фасетов.
+    Фильтры передаются GET-параметрами price_min, price_max, category, published.
+    """
+
+    filter_by_category = True
+    facet_queryset = None
+
+    def can_filter_published(self):
+        return self.request.user.has_perm("catalog.cancel_publication")
+
+    def get_filters(self):
+        """
+        Возвращает корректные значения фильтров из GET-параметров.
+        """
+        filters = {}
+        for name in FILTER_PARAMS:
+            value = self.request.GET.get(name, "")
+            if value.isdigit():
+                filters[name] = int(value)
+        if not self.filter_by_category:
+            filters.pop("category", None)
+        if "published" in filters and (
+            filters["published"] not in (0, 1) or not self.can_filter_published()
+        ):
+            filters.pop("published")
+        return filters
+
+    def get_filter_conditions(self):
+        """
+        Возвращает условия выбранных фильтров, сгруппированные по фасетам.
+        """
+        filters = self.get_filters()
+        conditions = {}
+        price = Q()
+        if "price_min" in filters:
+            price &= Q(price__gte=filters["price_min"])
+        if "price_max" in filters:
+            price &= Q(price__lte=filters["price_max"])
+        if price:
+            conditions["price"] = price
+        if "category" in filters:
+            conditions["category"] = Q(category=filters["category"])
+        if "published" in filters:
+            conditions["published"] = Q(is_published=bool(filters["published"]))
+        return conditions
+
+    def get_filter_query(self):
+        """
+        Возвращает выбранные фильтры в виде строки GET-параметров.
+        """
+        return urlencode(self.get_filters())
+
+    def filter_queryset(self, queryset):
+        """
+        Применяет фильтры к выборке.
+        Выборка без фильтров сохраняется для подсчета фасетов.
+        """
+        self.facet_queryset = queryset
+        return queryset.filter(*self.get_filter_conditions().values())
+
+    def get_facets(self):
+        """
+        Возвращает фасеты для шаблона.
+        """
+        categories = get_categories_from_cache() if self.filter_by_category else []
+        counts = get_catalog_data_from_cache(
+            "product_facets",
+            self.request.user,
+            (self.request.path, self.get_filter_query()),
+            lambda: get_facets(
+                self.facet_queryset,
+                self.get_filter_conditions(),
+                [category["pk"] for category in categories],
+                self.can_filter_published(),
+            ),
+        )
+        return self.build_facets(counts, categories)
+
+    async def aget_facets(self):
+        """
+        Асинхронно возвращает фасеты для шаблона.
+        """
+        categories = (
+            await aget_categories_from_cache() if self.filter_by_category else []
+        )
+        counts = await aget_catalog_data_from_cache(
+            "product_facets",
+            self.request.user,
+            (self.request.path, self.get_filter_query()),
+            lambda: aget_facets(
+                self.facet_queryset,
+                self.get_filter_conditions(),
+                [category["pk"] for category in categories],
+                self.can_filter_published(),
+            ),
+        )
+        return self.build_facets(counts, categories)
+
+    def build_facets(self, counts, categories):
+        """
+        Собирает фасеты для шаблона из счетчиков агрегирующего запроса.
+        """
+        filters = self.get_filters()
+        with_published = self.can_filter_published()
+        prices = []
+        for index, low in enumerate(PRICE_BUCKETS):
+            high = (
+                PRICE_BUCKETS[index + 1] - 1 if index + 1 < len(PRICE_BUCKETS) else None
+            )
+            prices.append(
+                {
+                    "price_min": low,
+                    "price_max": high,
+                    "count": counts[f"price_{index}"],
+                    "selected": filters.get("price_min") == low
+                    and filters.get("price_max") == high,
+                }
+            )
+        facets = {
+            "price_min": counts["price_min"],
+            "price_max": counts["price_max"],
+            "prices": prices,
+            "categories": [
+                {
+                    "pk": category["pk"],
+                    "name": category["name"],
+                    "count": counts.get(f"category_{category['pk']}", 0),
+                    "selected": filters.get("category") == category["pk"],
+                }
+                for category in categories
+            ],
+        }
+        if with_published:
+            facets["published"] = {
+                "yes": counts["published_1"],
+                "no": counts["published_0"],
+            }
+        return facets
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет фильтры и фасеты в контекст.
+        """
+        context_data = super().get_context_data(**kwargs)
+        context_data["filters"] = self.get_filters()
+        context_data["filter_query"] = self.get_filter_query()
+        context_data["facets"] = self.get_facets()
+        return context_data
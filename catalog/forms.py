@@ -2,18 +2,7 @@ from django.core.exceptions import ValidationError
 from django.forms import ModelForm, BooleanField
 
 from catalog.models import Product, ProductVersion
-
-FORBIDDEN_WORDS = [
-    "казино",
-    "криптовалюта",
-    "крипта",
-    "биржа",
-    "дешево",
-    "бесплатно",
-    "обман",
-    "полиция",
-    "радар",
-]
+from catalog.validators import find_forbidden_word
 
 
 class StyleFormMixin:
@@ -45,9 +34,8 @@ class ProductForm(StyleFormMixin, ModelForm):
         в названии продукта.
         """
         name = self.cleaned_data["name"]
-        for word in FORBIDDEN_WORDS:
-            if word in name:
-                raise ValidationError("Запрещенное название продукта")
+        if find_forbidden_word(name):
+            raise ValidationError("Запрещенное название продукта")
         return name
 
     def clean_description(self):
@@ -56,9 +44,8 @@ class ProductForm(StyleFormMixin, ModelForm):
         в описании продукта.
         """
         description = self.cleaned_data["description"]
-        for word in FORBIDDEN_WORDS:
-            if word in description:
-                raise ValidationError("Запрещенное описание продукта")
+        if find_forbidden_word(description):
+            raise ValidationError("Запрещенное описание продукта")
         return description
 
 
@@ -87,7 +74,6 @@ class ProductModeratorForm(StyleFormMixin, ModelForm):
         в описании продукта.
         """
         description = self.cleaned_data["description"]
-        for word in FORBIDDEN_WORDS:
-            if word in description:
-                raise ValidationError("Запрещенное описание продукта")
+        if find_forbidden_word(description):
+            raise ValidationError("Запрещенное описание продукта")
         return description
@@ -0,0 +1,119 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Ширина уменьшенных копий изображений в пикселях.
+VARIANT_WIDTHS = (300, 600)
+# Формат копии -> (расширение файла, параметры сохранения Pillow).
+VARIANT_FORMATS = {
+    "WEBP": ("webp", {"quality": 80, "method": 4}),
+    "JPEG": ("jpg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+VARIANTS_DIR = "variants"
+
+
+def get_variant_name(path, width, image_format="WEBP"):
+    """
+    Возвращает путь к уменьшенной копии изображения в хранилище:
+    catalog/photo.jpg -> catalog/variants/photo_300w.webp
+    """
+    directory, filename = os.path.split(str(path))
+    stem = os.path.splitext(filename)[0]
+    extension = VARIANT_FORMATS[image_format][0]
+    return os.path.join(directory, VARIANTS_DIR, f"{stem}_{width}w.{extension}")
+
+
+def get_variant_widths(instance):
+    """
+    Возвращает ширины созданных копий изображения продукта или статьи.
+    Копии создаются для всех ширин не больше оригинала, поэтому список
+    вычисляется по сохраненной ширине без обращения к хранилищу.
+    Пока копии текущего изображения не созданы, список пуст.
+    """
+    image = instance.image
+    if not image or instance.variants_source != image.name:
+        return []
+    return [width for width in VARIANT_WIDTHS if width <= (instance.image_width or 0)]
+
+
+def is_variant_current(name, source_modified):
+    """
+    Проверяет, что копия существует и создана не раньше оригинала:
+    изображение, загруженное заново под тем же именем, получает новые копии.
+    """
+    return (
+        default_storage.exists(name)
+        and default_storage.get_modified_time(name) >= source_modified
+    )
+
+
+def generate_variants(path, force=False):
+    """
+    Создает уменьшенные копии изображения во всех форматах.
+    Копии шире оригинала не создаются, актуальные копии
+    без force не пересоздаются.
+    :return: количество созданных файлов и ширина оригинала
+    """
+    created = 0
+    source_modified = default_storage.get_modified_time(path)
+    with default_storage.open(path) as file:
+        with Image.open(file) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            for width in VARIANT_WIDTHS:
+                if width > image.width:
+                    continue
+                height = round(image.height * width / image.width)
+                resized = None
+                for image_format, (_, options) in VARIANT_FORMATS.items():
+                    name = get_variant_name(path, width, image_format)
+                    if not force and is_variant_current(name, source_modified):
+                        continue
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    variant = resized
+                    if image_format == "JPEG" and variant.mode != "RGB":
+                        variant = variant.convert("RGB")
+                    buffer = BytesIO()
+                    variant.save(buffer, image_format, **options)
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    default_storage.save(name, ContentFile(buffer.getvalue()))
+                    created += 1
+            return created, image.width
+
+
+def reset_variants(instance):
+    """
+    Отмечает, что копии изображения продукта или статьи нужно создать
+    заново, если загружен новый файл (в том числе под прежним именем).
+    Вызывается перед сохранением записи (catalog/signals.py).
+    """
+    if instance.image and not instance.image._committed:
+        instance.variants_source = ""
+
+
+def get_variant_url(instance, width, image_format="JPEG"):
+    """
+    Возвращает URL копии изображения нужной ширины,
+    а если копия еще не создана - URL оригинала.
+    """
+    path = instance.image.name
+    if width in get_variant_widths(instance):
+        return default_storage.url(get_variant_name(path, width, image_format))
+    return default_storage.url(path)
+
+
+def get_srcset(instance, image_format="WEBP"):
+    """
+    Возвращает значение атрибута srcset из созданных копий изображения.
+    """
+    path = instance.image.name
+    return ", ".join(
+        f"{default_storage.url(get_variant_name(path, width, image_format))} {width}w"
+        for width in get_variant_widths(instance)
+    )
@@ -0,0 +1,75 @@
+import sys
+import time
+
+from django.core.management import BaseCommand
+
+from catalog.export import (
+    EXPORT_FORMATS,
+    encode_chunks,
+    format_rows,
+    get_export_filename,
+    get_export_rows,
+)
+from catalog.models import Product
+
+
+class Command(BaseCommand):
+    help = "Выгружает все продукты в CSV или JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=EXPORT_FORMATS, default="csv", help="Формат выгрузки"
+        )
+        parser.add_argument("--gzip", action="store_true", help="Сжать выгрузку gzip")
+        parser.add_argument(
+            "--output",
+            help="Путь к файлу выгрузки, '-' - стандартный вывод "
+            "(по умолчанию products.<формат> в текущем каталоге)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Количество продуктов, считываемых из БД за один раз",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Обработка команды: потоковая запись выгрузки в файл порциями.
+        """
+        output = options["output"] or get_export_filename(
+            options["format"], options["gzip"]
+        )
+        started = time.perf_counter()
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        rows = counted(get_export_rows(Product.objects.all(), options["chunk_size"]))
+        chunks = encode_chunks(
+            format_rows(rows, options["format"]),
+            options["chunk_size"],
+            options["gzip"],
+        )
+        if output == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+
+        elapsed = time.perf_counter() - started
+        # При выводе выгрузки в стандартный вывод итог пишется в поток ошибок.
+        report = self.stderr if output == "-" else self.stdout
+        report.write(
+            self.style.SUCCESS(
+                f"Выгружено продуктов: {count} за {elapsed:.1f} с. "
+                f"Скорость: {count / elapsed if elapsed else count:.0f} продуктов/с."
+            )
+        )
@@ -1,80 +1,386 @@
 import json
+import time
+from io import StringIO
 
-from django.core.management import BaseCommand
-from django.db import connection
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
 from catalog.models import Category, Product
+from catalog.services import (
+    bump_catalog_version,
+    bump_product_detail_version,
+    invalidate_categories_cache,
+    set_product_stamp,
+)
+
+# Поля продукта, заполняемые из файла; остальные получают значения по умолчанию.
+PRODUCT_FIELDS = (
+    "name",
+    "description",
+    "image",
+    "price",
+    "created_at",
+    "updated_at",
+)
+
+# Поля продукта, которые сравниваются и обновляются при синхронизации.
+SYNC_FIELDS = ("name", "description", "image", "category_id", "price")
+
+
+def get_category_values(name, description):
+    """
+    Возвращает сравниваемые значения категории в едином виде.
+    """
+    return name, description or None
+
+
+def get_product_values(name, description, image, category_id, price):
+    """
+    Возвращает сравниваемые значения продукта в едином виде.
+    """
+    return name, description or None, image or "", category_id, price
+
+
+def reset_product_stamps(pks):
+    """
+    Сбрасывает кэш страниц измененных продуктов.
+    """
+    for pk in pks:
+        set_product_stamp(pk)
+
+
+def copy_value(value):
+    """
+    Форматирует значение для COPY в формате CSV:
+    NULL передается пустым значением без кавычек, остальное - в кавычках.
+    """
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
 
 
 class Command(BaseCommand):
+    help = "Заменяет категории и продукты в БД данными из json-файла."
+    # Размер фрагмента файла, считываемого за один раз, в символах.
+    read_chunk_size = 1 << 16
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default="fixtures/catalog_data.json",
+            help="Путь к json-файлу с данными каталога",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество записей, сохраняемых в БД за один запрос",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Записать только отличия файла от БД, не удаляя остальные данные",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY в PostgreSQL",
+        )
+
+    @classmethod
+    def json_read_items(cls, path):
+        """
+        Потоково считывает записи из json-файла, не загружая его целиком.
+        Поддерживается массив объектов (формат dumpdata)
+        и объекты, разделенные переводом строки.
+        :return: Генератор словарей с записями
+        """
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        with open(path, encoding="utf-8") as file:
+            while True:
+                while position < len(buffer) and buffer[position] in "[], \t\r\n":
+                    position += 1
+                if position < len(buffer):
+                    try:
+                        item, position = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        # Объект прочитан не полностью - дочитываем файл.
+                        pass
+                    else:
+                        yield item
+                        continue
+                chunk = file.read(cls.read_chunk_size)
+                if not chunk:
+                    if position < len(buffer):
+                        raise CommandError(f"Некорректные данные в файле {path}")
+                    return
+                buffer = buffer[position:] + chunk
+                position = 0
 
     @staticmethod
-    def json_read_categories():
+    def clear():
         """
-        Считывает категории из json-файла и создает список словарей.
-        :return: Список словарей с категориями
+        Удаляет все существующие категории и продукты.
         """
-        with open("catalog_data.json") as file:
-            catalog_json = json.load(file)
-            categories_list = []
-            for item in catalog_json:
-                if item.get("model") == "catalog.category":
-                    category_dict = item.get("fields")
-                    category_dict["pk"] = item.get("pk")
-                    categories_list.append(category_dict)
-            return categories_list
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "TRUNCATE TABLE catalog_category, catalog_product "
+                    "RESTART IDENTITY CASCADE;"
+                )
+        else:
+            Product.objects.all().delete()
+            Category.objects.all().delete()
 
     @staticmethod
-    def json_read_products():
+    def reset_sequences():
         """
-        Считывает продукты из json-файла и создает список словарей.
-        :return: Список словарей с продуктами
+        Сдвигает счетчики pk после создания категорий с pk из файла.
         """
-        with open("catalog_data.json") as file:
-            catalog_json = json.load(file)
-            products_list = []
-            for item in catalog_json:
-                if item.get("model") == "catalog.product":
-                    products_list.append(item.get("fields"))
-            return products_list
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), [Category, Product]
+        )
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+    @staticmethod
+    def copy_products(products):
+        """
+        Сохраняет продукты командой COPY: значения полей готовятся
+        так же, как при bulk_create, но передаются одним потоком CSV.
+        """
+        fields = [
+            field
+            for field in Product._meta.concrete_fields
+            if not field.primary_key and field.name != "search_vector"
+        ]
+        data = StringIO()
+        for product in products:
+            values = (
+                field.get_db_prep_save(field.pre_save(product, True), connection)
+                for field in fields
+            )
+            data.write(",".join(map(copy_value, values)) + "\n")
+        data.seek(0)
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Product._meta.db_table} ({columns}) FROM STDIN WITH CSV", data
+            )
 
     def handle(self, *args, **options):
         """
-        Обработка команды: удаление всех существующих данных из базы
-        и занесение новых из json-файла.
+        Обработка команды: полная перезагрузка каталога
+        или, с параметром --sync, синхронизация с файлом.
         """
+        started = time.perf_counter()
+        if options["sync"]:
+            summary = self.sync(options)
+        else:
+            summary = self.load(options, started)
+        elapsed = time.perf_counter() - started
+        rows = sum(summary.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join(f"{name}: {count}" for name, count in summary.items())
+                + f" за {elapsed:.1f} с. "
+                f"Скорость: {rows / elapsed if elapsed else rows:.0f} записей/с."
+            )
+        )
 
-        # Удаление данных
-        with connection.cursor() as cursor:
-            cursor.execute("TRUNCATE TABLE catalog_category RESTART IDENTITY CASCADE;")
-        Product.objects.all().delete()
-        Category.objects.all().delete()
-        # sqlsequencereset
-
-        # Создание списков для хранения объектов
-        product_for_create = []
-        category_for_create = []
-
-        # Добавление информации о категориях в список
-        for category in Command.json_read_categories():
-            category_for_create.append(Category(**category))
-
-        # Создание объектов "категория" в базе
-        Category.objects.bulk_create(category_for_create)
-
-        # Добавление информации о продуктах в список
-        for product in Command.json_read_products():
-            product_for_create.append(
-                Product(
-                    name=product["name"],
-                    description=product["description"],
-                    image=product["image"],
-                    category=Category.objects.get(pk=product["category"]),
-                    price=product["price"],
-                    created_at=product["created_at"],
-                    updated_at=product["updated_at"],
+    def load(self, options, started):
+        """
+        Удаляет все существующие данные из базы и потоково заносит новые
+        из json-файла порциями в одной транзакции.
+        """
+        batch_size = options["batch_size"]
+        use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        save_products = (
+            self.copy_products
+            if use_copy
+            else lambda batch: Product.objects.bulk_create(batch)
+        )
+        # Соответствие pk категории в файле и в БД.
+        category_ids = {}
+        categories = []
+        products = []
+        counts = {"Загружено категорий": 0, "продуктов": 0}
+
+        def flush_categories():
+            Category.objects.bulk_create(categories)
+            for category in categories:
+                category_ids[category.pk] = category.pk
+            counts["Загружено категорий"] += len(categories)
+            categories.clear()
+
+        def flush_products():
+            save_products(products)
+            counts["продуктов"] += len(products)
+            products.clear()
+            if options["verbosity"] > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Загружено продуктов: {counts['продуктов']} "
+                    f"({counts['продуктов'] / elapsed:.0f} записей/с)"
                 )
+
+        with transaction.atomic():
+            self.clear()
+            for item in self.json_read_items(options["file"]):
+                fields = item.get("fields", {})
+                if item.get("model") == "catalog.category":
+                    categories.append(Category(pk=item.get("pk"), **fields))
+                    if len(categories) >= batch_size:
+                        flush_categories()
+                elif item.get("model") == "catalog.product":
+                    if categories:
+                        flush_categories()
+                    category = fields.get("category")
+                    if category is not None and category not in category_ids:
+                        raise CommandError(f"Категория {category} не найдена")
+                    products.append(
+                        Product(
+                            external_id=item.get("pk"),
+                            category_id=category_ids.get(category),
+                            **{
+                                name: fields[name]
+                                for name in PRODUCT_FIELDS
+                                if name in fields
+                            },
+                        )
+                    )
+                    if len(products) >= batch_size:
+                        flush_products()
+            if categories:
+                flush_categories()
+            if products:
+                flush_products()
+
+            self.reset_sequences()
+            transaction.on_commit(bump_catalog_version)
+            transaction.on_commit(bump_product_detail_version)
+            transaction.on_commit(invalidate_categories_cache)
+        return counts
+
+    def sync(self, options):
+        """
+        Сравнивает файл с базой по pk категорий и внешним идентификаторам
+        продуктов и записывает только новые, измененные и удаленные записи.
+        Продукты, созданные на сайте, не затрагиваются; владельцы
+        и версии сохраненных продуктов не меняются.
+        """
+        batch_size = options["batch_size"]
+        counts = dict.fromkeys(("Создано", "изменено", "удалено", "без изменений"), 0)
+        existing_categories = {
+            pk: get_category_values(name, description)
+            for pk, name, description in Category.objects.values_list(
+                "pk", "name", "description"
+            )
+        }
+        existing_products = {
+            external_id: (pk, get_product_values(*values))
+            for external_id, pk, *values in Product.objects.filter(
+                external_id__isnull=False
             )
+            .values_list("external_id", "pk", *SYNC_FIELDS)
+            .iterator(chunk_size=batch_size)
+        }
+        category_ids = set()
+        categories = []
+        products = []
+        changed_pks = []
+
+        def flush_categories():
+            Category.objects.bulk_create(
+                categories,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["name", "description"],
+            )
+            categories.clear()
+
+        def flush_products():
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=["external_id"],
+                update_fields=[*SYNC_FIELDS, "updated_at"],
+            )
+            products.clear()
+
+        def is_changed(old, values):
+            if old == values:
+                counts["без изменений"] += 1
+                return False
+            counts["Создано" if old is None else "изменено"] += 1
+            return True
+
+        with transaction.atomic():
+            for item in self.json_read_items(options["file"]):
+                fields = item.get("fields", {})
+                if item.get("model") == "catalog.category":
+                    pk = item.get("pk")
+                    category_ids.add(pk)
+                    values = get_category_values(
+                        fields.get("name"), fields.get("description")
+                    )
+                    if is_changed(existing_categories.pop(pk, None), values):
+                        categories.append(
+                            Category(
+                                pk=pk, **dict(zip(("name", "description"), values))
+                            )
+                        )
+                        if len(categories) >= batch_size:
+                            flush_categories()
+                elif item.get("model") == "catalog.product":
+                    if categories:
+                        flush_categories()
+                    category = fields.get("category")
+                    if category is not None and category not in category_ids:
+                        raise CommandError(f"Категория {category} не найдена")
+                    external_id = item.get("pk")
+                    values = get_product_values(
+                        fields.get("name"),
+                        fields.get("description"),
+                        fields.get("image"),
+                        category,
+                        fields.get("price"),
+                    )
+                    pk, old = existing_products.pop(external_id, (None, None))
+                    if is_changed(old, values):
+                        if pk is not None:
+                            changed_pks.append(pk)
+                        products.append(
+                            Product(
+                                external_id=external_id,
+                                **dict(zip(SYNC_FIELDS, values)),
+                            )
+                        )
+                        if len(products) >= batch_size:
+                            flush_products()
+            if categories:
+                flush_categories()
+            if products:
+                flush_products()
+
+            # Записи, которых нет в файле, удаляются.
+            deleted_pks = [pk for pk, values in existing_products.values()]
+            for index in range(0, len(deleted_pks), batch_size):
+                Product.objects.filter(
+                    pk__in=deleted_pks[index : index + batch_size]
+                ).delete()
+            Category.objects.filter(pk__in=existing_categories).delete()
+            counts["удалено"] = len(deleted_pks) + len(existing_categories)
 
-        # Создаем объекты "продукт" в базе
-        Product.objects.bulk_create(product_for_create)
+            if counts["Создано"] or counts["изменено"] or counts["удалено"]:
+                self.reset_sequences()
+                transaction.on_commit(lambda: reset_product_stamps(changed_pks))
+                transaction.on_commit(bump_catalog_version)
+                # Категории изменяются без сигналов.
+                transaction.on_commit(bump_product_detail_version)
+                transaction.on_commit(invalidate_categories_cache)
+        return counts
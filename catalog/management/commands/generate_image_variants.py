@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management import BaseCommand
+from django.db.models import F
+
+from blog.models import Post
+from blog.services import invalidate_blog_list_cache
+from catalog.images import generate_variants
+from catalog.models import Product
+from catalog.services import bump_catalog_version, bump_product_detail_version
+
+MODELS = (Product, Post)
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает уменьшенные копии и WebP-версии изображений продуктов и статей, "
+        "для которых они еще не созданы. Запускается периодически "
+        "(настройка CRONJOBS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов обработки изображений",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии всех изображений",
+        )
+
+    @staticmethod
+    def get_image_paths(force=False):
+        """
+        Возвращает пути изображений без повторов: без --force - только тех,
+        копии которых не созданы (изображение загружено или заменено
+        после последнего запуска).
+        """
+        paths = set()
+        for model in MODELS:
+            queryset = model.objects.exclude(image="").exclude(image__isnull=True)
+            if not force:
+                queryset = queryset.exclude(variants_source=F("image"))
+            paths.update(queryset.values_list("image", flat=True))
+        return sorted(paths)
+
+    @staticmethod
+    def save_variants(path, width):
+        """
+        Запоминает, что копии изображения созданы, у всех продуктов
+        и статей с этим изображением. Ширина None - изображение
+        не удалось обработать: копии не создаются повторно,
+        страницы выводят оригинал.
+        :return: множество моделей, записи которых изменены
+        """
+        return {
+            model
+            for model in MODELS
+            if model.objects.filter(image=path).update(
+                variants_source=path, image_width=width
+            )
+        }
+
+    def handle(self, *args, **options):
+        """
+        Обработка команды: изображения обрабатываются параллельно
+        в нескольких процессах, ошибки отдельных файлов не прерывают работу.
+        """
+        paths = self.get_image_paths(options["force"])
+        if not paths:
+            return
+        started = time.perf_counter()
+        created = failed = 0
+        updated_models = set()
+
+        with ProcessPoolExecutor(
+            max_workers=max(options["workers"] or 1, 1), initializer=django.setup
+        ) as executor:
+            task = partial(generate_variants, force=options["force"])
+            futures = [(path, executor.submit(task, path)) for path in paths]
+            for path, future in futures:
+                try:
+                    count, width = future.result()
+                except Exception as error:
+                    failed += 1
+                    width = None
+                    self.stderr.write(f"{path}: {error}")
+                else:
+                    created += count
+                updated_models |= self.save_variants(path, width)
+
+        # Страницы выводят копии после сброса их кэша.
+        if Product in updated_models:
+            bump_catalog_version()
+            bump_product_detail_version()
+        if Post in updated_models:
+            invalidate_blog_list_cache()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано изображений: {len(paths)}, ошибок: {failed}, "
+                f"создано копий: {created}. "
+                f"Скорость: {len(paths) / elapsed if elapsed else len(paths):.1f} изображений/с."
+            )
+        )
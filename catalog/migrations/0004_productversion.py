@@ -27,7 +27,10 @@ class Migration(migrations.Migration):
                     "version_number",
                     models.PositiveSmallIntegerField(verbose_name="Номер версии"),
                 ),
-                ("version_name", models.CharField(verbose_name="Название версии")),
+                (
+                    "version_name",
+                    models.CharField(max_length=100, verbose_name="Название версии"),
+                ),
                 (
                     "is_active",
                     models.BooleanField(
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0007_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productversion",
+            name="version_name",
+            field=models.CharField(max_length=100, verbose_name="Название версии"),
+        ),
+    ]
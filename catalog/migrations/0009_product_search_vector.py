@@ -0,0 +1,77 @@
+# Generated by Django 4.2 on 2026-10-18 12:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('pg_catalog.russian', coalesce({table}name, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.russian', coalesce({table}description, '')), 'B')
+"""
+
+CREATE_SEARCH_SQL = f"""
+CREATE INDEX product_search_vector_idx ON catalog_product USING gin (search_vector);
+
+CREATE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(table="NEW.")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, description ON catalog_product
+FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update();
+
+UPDATE catalog_product SET search_vector = {SEARCH_VECTOR_SQL.format(table="")};
+"""
+
+DROP_SEARCH_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_search_vector_update();
+DROP INDEX IF EXISTS product_search_vector_idx;
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Создает GIN-индекс и триггер, заполняющий поисковый вектор.
+    Полнотекстовый поиск доступен только в PostgreSQL.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_alter_productversion_version_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="product",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="product_search_vector_idx"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
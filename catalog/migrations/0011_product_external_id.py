@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0009_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="external_id",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                unique=True,
+                verbose_name="Внешний идентификатор",
+            ),
+        ),
+    ]
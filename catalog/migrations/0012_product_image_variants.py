@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0011_product_external_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="variants_source",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=100,
+                verbose_name="Изображение с копиями",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Ширина изображения",
+            ),
+        ),
+    ]
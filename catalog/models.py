@@ -1,10 +1,19 @@
-from django.db import models
-from django.db.models import CASCADE
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+)
+from django.db import connections, models
+from django.db.models import CASCADE, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 
 from users.models import User
 
 NULLABLE = {"blank": True, "null": True}
 
+SEARCH_CONFIG = "russian"
+
 
 class Category(models.Model):
     """
@@ -22,6 +31,70 @@ class Category(models.Model):
         verbose_name_plural = "Категории"
 
 
+class ProductQuerySet(models.QuerySet):
+    """
+    Набор запросов продуктов.
+    """
+
+    def visible_to(self, user):
+        """
+        Оставляет продукты, доступные пользователю:
+        модератору - все, авторизованному пользователю - опубликованные и свои,
+        анониму - только опубликованные.
+        """
+        if user.has_perm("catalog.cancel_publication"):
+            return self
+        elif user.is_authenticated:
+            return self.filter(Q(owner=user) | Q(is_published=True))
+        return self.filter(is_published=True)
+
+    def with_active_version(self):
+        """
+        Добавляет к каждому продукту название активной версии
+        одним подзапросом, без отдельного запроса на каждый продукт.
+        Если активной версии нет, подставляется "Новый".
+        """
+        active_versions = ProductVersion.objects.filter(
+            product=OuterRef("pk"), is_active=True
+        ).order_by("-pk")
+        return self.annotate(
+            active_version=Coalesce(
+                Subquery(active_versions.values("version_name")[:1]),
+                Value("Новый"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def search(self, query):
+        """
+        Ищет продукты по названию и описанию.
+        В PostgreSQL используется полнотекстовый поиск с русской морфологией
+        по индексируемому полю search_vector, результаты упорядочены
+        по релевантности. В остальных СУБД - поиск по вхождению подстроки.
+        """
+        if connections[self.db].vendor != "postgresql":
+            return self.filter(
+                Q(name__icontains=query) | Q(description__icontains=query)
+            ).order_by("-created_at", "-pk")
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            self.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-pk")
+        )
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    """
+    Менеджер продуктов.
+    Поисковый вектор нужен только в условиях запросов,
+    поэтому не загружается вместе с объектами.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
+
 class Product(models.Model):
     """
     Модель продукта.
@@ -32,6 +105,18 @@ class Product(models.Model):
     image = models.ImageField(
         upload_to="catalog/", verbose_name="Изображение", **NULLABLE
     )
+    # Изображение, для которого созданы уменьшенные копии, и его ширина:
+    # по ним srcset строится без обращения к хранилищу.
+    variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="Изображение с копиями",
+    )
+    image_width = models.PositiveIntegerField(
+        editable=False, verbose_name="Ширина изображения", **NULLABLE
+    )
     category = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -49,6 +134,17 @@ class Product(models.Model):
         User, verbose_name="Владелец", **NULLABLE, on_delete=models.SET_NULL
     )
     is_published = models.BooleanField(default=False, verbose_name="Опубликовано")
+    # Идентификатор продукта в загружаемом каталоге (команда fill).
+    external_id = models.PositiveIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name="Внешний идентификатор",
+        **NULLABLE,
+    )
+    # Заполняется триггером PostgreSQL из названия и описания.
+    search_vector = SearchVectorField(editable=False, **NULLABLE)
+
+    objects = ProductManager()
 
     def __str__(self):
         return f"{self.name} ({self.category})"
@@ -56,6 +152,29 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_created_idx"),
+            models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="product_pub_created_idx",
+            ),
+            models.Index(
+                fields=["is_published", "price", "id"], name="product_pub_price_idx"
+            ),
+            models.Index(
+                fields=["is_published", "name", "id"], name="product_pub_name_idx"
+            ),
+            # Модератор видит все продукты, а владелец - опубликованные и свои
+            # (условие OR выполняется для большинства строк), поэтому их списки
+            # читают индекс сортировки без фильтра по публикации.
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["name", "id"], name="product_name_idx"),
+            models.Index(
+                fields=["category", "is_published", "-created_at", "-id"],
+                name="product_cat_pub_created_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+        ]
         permissions = [
             ("change_category", "Can change category"),
             ("change_description", "Can change product description"),
@@ -87,7 +206,7 @@ class ProductVersion(models.Model):
 
     product = models.ForeignKey(Product, on_delete=CASCADE, verbose_name="Продукт")
     version_number = models.PositiveSmallIntegerField(verbose_name="Номер версии")
-    version_name = models.CharField(verbose_name="Название версии")
+    version_name = models.CharField(max_length=100, verbose_name="Название версии")
     is_active = models.BooleanField(
         default=False, verbose_name="Признак текущей версии"
     )
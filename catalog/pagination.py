@@ -0,0 +1,179 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+# Допустимые варианты сортировки: значение GET-параметра "sort" -> поле модели.
+# Вторым ключом всегда выступает id в том же направлении, что делает порядок стабильным.
+PRODUCT_SORTS = {
+    "new": "-created_at",
+    "price": "price",
+    "-price": "-price",
+    "name": "name",
+}
+DEFAULT_SORT = "new"
+
+
+class KeysetPage:
+    """
+    Страница результатов курсорной пагинации.
+    Не знает общего количества объектов и не требует COUNT(*).
+    """
+
+    def __init__(self, object_list, sort, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.sort = sort
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(sort, direction, value, pk):
+    """
+    Кодирует позицию в выборке в строку, пригодную для URL.
+    """
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    payload = json.dumps([sort, direction, value, pk], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Декодирует курсор.
+    :return: кортеж (сортировка, направление, значение ключа, id)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, direction, value, pk = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise Http404("Некорректный курсор")
+    if direction not in ("next", "prev") or not isinstance(pk, int):
+        raise Http404("Некорректный курсор")
+    return sort, direction, value, pk
+
+
+def get_cursor_query(queryset, sort, cursor, page_size):
+    """
+    Возвращает выборку строк страницы, начиная с позиции курсора,
+    и функцию, собирающую из полученных строк страницу.
+    Условие WHERE по (ключ сортировки, id) вместо OFFSET позволяет
+    получать дальние страницы так же быстро, как первую.
+    """
+    if sort not in PRODUCT_SORTS:
+        sort = DEFAULT_SORT
+    ordering = PRODUCT_SORTS[sort]
+    descending = ordering.startswith("-")
+    field_name = ordering.lstrip("-")
+    direction = "next"
+
+    if cursor:
+        cursor_sort, direction, raw_value, pk = decode_cursor(cursor)
+        if cursor_sort != sort:
+            raise Http404("Курсор не соответствует сортировке")
+        try:
+            value = queryset.model._meta.get_field(field_name).to_python(raw_value)
+        except ValidationError:
+            raise Http404("Некорректный курсор")
+        # При движении назад сравнение и порядок инвертируются.
+        lookup = "lt" if descending == (direction == "next") else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field_name}__{lookup}": value})
+            | Q(**{field_name: value, f"pk__{lookup}": pk})
+        )
+
+    reverse = direction == "prev"
+    if descending != reverse:
+        queryset = queryset.order_by(f"-{field_name}", "-pk")
+    else:
+        queryset = queryset.order_by(field_name, "pk")
+
+    def build_page(rows):
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or reverse:
+                next_cursor = encode_cursor(
+                    sort, "next", getattr(last, field_name), last.pk
+                )
+            if (has_more and reverse) or (cursor and not reverse):
+                previous_cursor = encode_cursor(
+                    sort, "prev", getattr(first, field_name), first.pk
+                )
+        return KeysetPage(rows, sort, next_cursor, previous_cursor)
+
+    return queryset[: page_size + 1], build_page
+
+
+def paginate_by_cursor(queryset, sort, cursor, page_size):
+    """
+    Возвращает страницу выборки, начиная с позиции курсора.
+    """
+    rows, build_page = get_cursor_query(queryset, sort, cursor, page_size)
+    return build_page(list(rows))
+
+
+async def apaginate_by_cursor(queryset, sort, cursor, page_size):
+    """
+    Асинхронно возвращает страницу выборки, начиная с позиции курсора.
+    """
+    rows, build_page = get_cursor_query(queryset, sort, cursor, page_size)
+    return build_page([row async for row in rows])
+
+
+class KeysetPaginationMixin:
+    """
+    Миксин курсорной пагинации для ListView.
+    Сортировка и курсор передаются GET-параметрами "sort" и "cursor".
+    """
+
+    paginate_by = 24
+
+    def get_sort(self):
+        """
+        Возвращает ключ сортировки из GET-параметров.
+        """
+        sort = self.request.GET.get("sort", DEFAULT_SORT)
+        return sort if sort in PRODUCT_SORTS else DEFAULT_SORT
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Разбивает выборку на страницы по курсору, без подсчета количества объектов.
+        """
+        page = paginate_by_cursor(
+            queryset, self.get_sort(), self.request.GET.get("cursor"), page_size
+        )
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет в контекст сортировку и курсоры соседних страниц.
+        """
+        context_data = super().get_context_data(**kwargs)
+        page = context_data["page_obj"]
+        context_data["sort"] = page.sort
+        context_data["next_cursor"] = page.next_cursor
+        context_data["previous_cursor"] = page.previous_cursor
+        return context_data
@@ -1,7 +1,65 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
+from django.db.models import Count, Q
+from django.http import HttpResponse
 
 from config.settings import CACHE_ENABLED
-from catalog.models import Category
+from catalog.models import Category, Contacts
+
+CATALOG_VERSION_KEY = "catalog_version"
+# Версия общих частей страниц продуктов (название категории, контакты
+# в подвале, копии изображений): меняется только при их изменении,
+# а изменение отдельного продукта отмечается его отметкой.
+PRODUCT_DETAIL_VERSION_KEY = "product_detail_version"
+CATEGORY_LIST_KEY = "category_list"
+CATEGORY_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+PRODUCT_LIST_CACHE_TIMEOUT = 60 * 60
+PRODUCT_DETAIL_CACHE_TIMEOUT = 60 * 60 * 12
+CONTACTS_KEY = "contacts"
+CONTACTS_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни копии контактов в памяти процесса, в секундах.
+# Другие процессы узнают об изменении контактов не позже этого срока.
+CONTACTS_MEMO_TIMEOUT = 60
+# Права, с которыми можно редактировать любой продукт (ProductModeratorForm).
+PRODUCT_EDITOR_PERMISSIONS = (
+    "catalog.change_category",
+    "catalog.change_description",
+    "catalog.cancel_publication",
+)
+
+# Копия контактов в памяти процесса: (время устаревания, контакты).
+_contacts_memo = None
+
+
+def get_categories_queryset():
+    """
+    Возвращает выборку категорий с количеством опубликованных продуктов,
+    которая выполняется одним агрегирующим запросом.
+    """
+    return (
+        Category.objects.annotate(
+            products_count=Count("products", filter=Q(products__is_published=True))
+        )
+        .order_by("pk")
+        .values("pk", "name", "description", "products_count")
+    )
+
+
+def get_categories():
+    """
+    Получает из БД список категорий с количеством опубликованных продуктов.
+    """
+    return list(get_categories_queryset())
+
+
+async def aget_categories():
+    """
+    Асинхронно получает из БД список категорий с количеством опубликованных продуктов.
+    """
+    return [category async for category in get_categories_queryset()]
 
 
 def get_categories_from_cache():
@@ -10,12 +68,417 @@ def get_categories_from_cache():
     Если кэш пуст, получает данные из БД.
     """
     if not CACHE_ENABLED:
-        return Category.objects.all()
+        return get_categories()
     else:
-        key = "category_list"
-        categories = cache.get(key)
+        categories = cache.get(CATEGORY_LIST_KEY)
         if categories is not None:
             return categories
-        categories = Category.objects.all()
-        cache.set(key, categories)
+        categories = get_categories()
+        cache.set(CATEGORY_LIST_KEY, categories, CATEGORY_LIST_CACHE_TIMEOUT)
         return categories
+
+
+async def aget_categories_from_cache():
+    """
+    Асинхронно получает список категорий из кэша.
+    Если кэш пуст, получает данные из БД.
+    """
+    if not CACHE_ENABLED:
+        return await aget_categories()
+    categories = await cache.aget(CATEGORY_LIST_KEY)
+    if categories is not None:
+        return categories
+    categories = await aget_categories()
+    await cache.aset(CATEGORY_LIST_KEY, categories, CATEGORY_LIST_CACHE_TIMEOUT)
+    return categories
+
+
+def invalidate_categories_cache():
+    """
+    Удаляет список категорий из кэша.
+    """
+    if CACHE_ENABLED:
+        cache.delete(CATEGORY_LIST_KEY)
+
+
+def get_visibility_tier(user):
+    """
+    Возвращает уровень видимости каталога для пользователя:
+    модератор видит все продукты, авторизованный пользователь -
+    опубликованные и свои, аноним - только опубликованные.
+    """
+    if not user.is_authenticated:
+        return "anonymous"
+    if user.has_perm("catalog.cancel_publication"):
+        return "moderator"
+    return f"owner-{user.pk}"
+
+
+def get_version(key):
+    """
+    Возвращает текущее значение версии из кэша.
+    Версия входит в ключи кэша страниц, поэтому ее смена делает
+    все ранее закэшированные страницы недоступными.
+    """
+    version = cache.get(key)
+    if version is None:
+        # Начальное значение от времени, чтобы после вытеснения ключа
+        # не совпасть с версией уже закэшированных страниц.
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_version(key):
+    """
+    Асинхронно возвращает текущее значение версии из кэша.
+    """
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def get_catalog_version():
+    """
+    Возвращает текущую версию каталога (списков продуктов).
+    """
+    return get_version(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    """
+    Асинхронно возвращает текущую версию каталога.
+    """
+    return await aget_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """
+    Меняет версию каталога после изменения данных.
+    """
+    if not CACHE_ENABLED:
+        return
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def bump_product_detail_version():
+    """
+    Меняет версию общих частей страниц продуктов.
+    """
+    if not CACHE_ENABLED:
+        return
+    # Версия - время изменения в наносекундах: по ней же вычисляется
+    # время изменения страниц продуктов (Last-Modified).
+    cache.set(PRODUCT_DETAIL_VERSION_KEY, time.time_ns(), None)
+
+
+def get_catalog_data_key(prefix, user, version, params):
+    return ":".join((prefix, get_visibility_tier(user), str(version), *params))
+
+
+def get_catalog_data_from_cache(prefix, user, params, compute):
+    """
+    Получает данные страницы каталога из кэша.
+    Ключ кэша учитывает уровень видимости пользователя, версию каталога
+    и параметры запроса (сортировку, курсор, фильтры).
+    Если кэш пуст, получает данные функцией compute и сохраняет их в кэш.
+    """
+    if not CACHE_ENABLED:
+        return compute()
+    key = get_catalog_data_key(prefix, user, get_catalog_version(), params)
+    data = cache.get(key)
+    if data is not None:
+        return data
+    data = compute()
+    cache.set(key, data, PRODUCT_LIST_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_catalog_data_from_cache(prefix, user, params, compute):
+    """
+    Асинхронно получает данные страницы каталога из кэша.
+    Если кэш пуст, получает данные корутиной compute и сохраняет их в кэш.
+    """
+    if not CACHE_ENABLED:
+        return await compute()
+    key = get_catalog_data_key(prefix, user, await aget_catalog_version(), params)
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+    data = await compute()
+    await cache.aset(key, data, PRODUCT_LIST_CACHE_TIMEOUT)
+    return data
+
+
+def get_product_stamp_key(pk):
+    return f"product_updated_at:{pk}"
+
+
+def get_product_stamp(pk):
+    """
+    Возвращает отметку последнего изменения продукта.
+    Отметка хранится в кэше и обновляется сигналами при изменении
+    продукта или его версий, поэтому не требует запроса к БД.
+    """
+    key = get_product_stamp_key(pk)
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = time.time_ns()
+        if not cache.add(key, stamp, None):
+            stamp = cache.get(key, stamp)
+    return stamp
+
+
+async def aget_product_stamp(pk):
+    """
+    Асинхронно возвращает отметку последнего изменения продукта.
+    """
+    key = get_product_stamp_key(pk)
+    stamp = await cache.aget(key)
+    if stamp is None:
+        stamp = time.time_ns()
+        if not await cache.aadd(key, stamp, None):
+            stamp = await cache.aget(key, stamp)
+    return stamp
+
+
+def set_product_stamp(pk, updated_at=None):
+    """
+    Обновляет отметку изменения продукта, делая недоступным
+    закэшированное отображение продукта для всех пользователей.
+    """
+    if not CACHE_ENABLED:
+        return
+    if updated_at:
+        # Отметка в наносекундах, как и начальное значение от time_ns.
+        stamp = int(updated_at.timestamp()) * 10**9 + updated_at.microsecond * 1000
+    else:
+        stamp = time.time_ns()
+    cache.set(get_product_stamp_key(pk), stamp, None)
+
+
+def get_product_detail_state(pk):
+    """
+    Возвращает отметку изменения продукта и версию общих частей
+    страниц продуктов. Изменение другого продукта не меняет ни одну
+    из них, поэтому страница остается в кэше.
+    Обе читаются из кэша за одно обращение.
+    """
+    key = get_product_stamp_key(pk)
+    values = cache.get_many([key, PRODUCT_DETAIL_VERSION_KEY])
+    stamp = values.get(key)
+    if stamp is None:
+        stamp = get_product_stamp(pk)
+    version = values.get(PRODUCT_DETAIL_VERSION_KEY)
+    if version is None:
+        version = get_version(PRODUCT_DETAIL_VERSION_KEY)
+    return stamp, version
+
+
+async def aget_product_detail_state(pk):
+    """
+    Асинхронно возвращает отметку изменения продукта и версию общих
+    частей страниц продуктов.
+    """
+    key = get_product_stamp_key(pk)
+    values = await cache.aget_many([key, PRODUCT_DETAIL_VERSION_KEY])
+    stamp = values.get(key)
+    if stamp is None:
+        stamp = await aget_product_stamp(pk)
+    version = values.get(PRODUCT_DETAIL_VERSION_KEY)
+    if version is None:
+        version = await aget_version(PRODUCT_DETAIL_VERSION_KEY)
+    return stamp, version
+
+
+def can_edit_product(user, product):
+    """
+    Проверяет, может ли пользователь редактировать продукт:
+    владелец - свой продукт, модератор со всеми правами - любой.
+    """
+    return user.is_authenticated and (
+        user.pk == product.owner_id or user.has_perms(PRODUCT_EDITOR_PERMISSIONS)
+    )
+
+
+def get_detail_tier(user):
+    """
+    Возвращает уровень страницы продукта по тем же проверкам, что и шаблон:
+    модератор со всеми правами видит все продукты со ссылкой редактирования
+    (суперпользователю дополнительно доступно удаление).
+    Остальным авторизованным пользователям страница кэшируется отдельно:
+    видимость продукта и ссылка редактирования зависят от владельца продукта.
+    """
+    if not user.is_authenticated:
+        return "anonymous"
+    if user.has_perms(PRODUCT_EDITOR_PERMISSIONS):
+        return "editor-superuser" if user.is_superuser else "editor"
+    return f"user-{user.pk}"
+
+
+def get_product_detail_key(user, pk, stamp, version):
+    return f"{pk}:{stamp}:{version}:{get_detail_tier(user)}"
+
+
+def get_etag(value):
+    return f'"{hashlib.md5(value.encode()).hexdigest()}"'
+
+
+def get_catalog_list_etag(user, path):
+    """
+    Возвращает ETag страницы списка продуктов.
+    Он учитывает уровень видимости пользователя, версию каталога
+    и адрес страницы с параметрами запроса, поэтому вычисляется
+    без запросов к БД. Без кэша версия каталога не ведется,
+    и ETag не возвращается.
+    """
+    if not CACHE_ENABLED:
+        return None
+    return get_etag(f"{get_visibility_tier(user)}:{get_catalog_version()}:{path}")
+
+
+async def aget_catalog_list_etag(user, path):
+    """
+    Асинхронно возвращает ETag страницы списка продуктов.
+    """
+    if not CACHE_ENABLED:
+        return None
+    version = await aget_catalog_version()
+    return get_etag(f"{get_visibility_tier(user)}:{version}:{path}")
+
+
+def get_product_detail_validators(user, pk):
+    """
+    Возвращает ETag и время последнего изменения страницы продукта
+    по отметке его изменения, версии общих частей страниц и уровню пользователя.
+    Без кэша отметки не ведутся, и валидаторы не возвращаются.
+    """
+    if not CACHE_ENABLED:
+        return None, None
+    stamp, version = get_product_detail_state(pk)
+    etag = get_etag(get_product_detail_key(user, pk, stamp, version))
+    return etag, max(stamp, version) // 10**9
+
+
+async def aget_product_detail_validators(user, pk):
+    """
+    Асинхронно возвращает ETag и время последнего изменения страницы продукта.
+    """
+    if not CACHE_ENABLED:
+        return None, None
+    stamp, version = await aget_product_detail_state(pk)
+    etag = get_etag(get_product_detail_key(user, pk, stamp, version))
+    return etag, max(stamp, version) // 10**9
+
+
+def get_product_detail_from_cache(user, pk, render):
+    """
+    Получает HTML страницы продукта из кэша.
+    Ключ кэша учитывает продукт, отметку его изменения, версию общих
+    частей страниц (название категории и контакты в подвале)
+    и уровень пользователя.
+    Если кэш пуст, получает страницу функцией render и кэширует
+    успешный ответ.
+    """
+    if not CACHE_ENABLED:
+        return render()
+    stamp, version = get_product_detail_state(pk)
+    key = f"product_detail:{get_product_detail_key(user, pk, stamp, version)}"
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content)
+    response = render()
+    if response.status_code == 200:
+        response.render()
+        cache.set(key, response.content, PRODUCT_DETAIL_CACHE_TIMEOUT)
+    return response
+
+
+async def aget_product_detail_from_cache(user, pk, render):
+    """
+    Асинхронно получает HTML страницы продукта из кэша.
+    Если кэш пуст, получает страницу корутиной render и кэширует
+    успешный ответ. Шаблон отрисовывается в потоке, так как
+    шаблонизатор работает синхронно.
+    """
+    if not CACHE_ENABLED:
+        return await render()
+    stamp, version = await aget_product_detail_state(pk)
+    key = f"product_detail:{get_product_detail_key(user, pk, stamp, version)}"
+    content = await cache.aget(key)
+    if content is not None:
+        return HttpResponse(content)
+    response = await render()
+    if response.status_code == 200:
+        await sync_to_async(response.render)()
+        await cache.aset(key, response.content, PRODUCT_DETAIL_CACHE_TIMEOUT)
+    return response
+
+
+def get_contacts():
+    """
+    Получает контакты организации из БД.
+    """
+    return Contacts.objects.order_by("pk").first()
+
+
+def use_contacts_memo(for_shared_page):
+    """
+    Проверяет, можно ли взять контакты из памяти процесса.
+    Страница, HTML которой сохраняется в общем кэше (for_shared_page),
+    получает контакты из общего кэша: иначе процесс с устаревшей копией
+    сохранил бы подвал со старыми контактами под новой версией страниц.
+    """
+    return (
+        not (for_shared_page and CACHE_ENABLED)
+        and _contacts_memo is not None
+        and _contacts_memo[0] > time.monotonic()
+    )
+
+
+def get_contacts_from_cache(for_shared_page=False):
+    """
+    Получает контакты организации из памяти процесса,
+    затем из общего кэша и только после этого из БД.
+    """
+    global _contacts_memo
+    if use_contacts_memo(for_shared_page):
+        return _contacts_memo[1]
+    contacts = cache.get(CONTACTS_KEY) if CACHE_ENABLED else None
+    if contacts is None:
+        contacts = get_contacts()
+        if CACHE_ENABLED and contacts is not None:
+            cache.set(CONTACTS_KEY, contacts, CONTACTS_CACHE_TIMEOUT)
+    _contacts_memo = (time.monotonic() + CONTACTS_MEMO_TIMEOUT, contacts)
+    return contacts
+
+
+async def aget_contacts_from_cache(for_shared_page=False):
+    """
+    Асинхронно получает контакты организации из памяти процесса,
+    затем из общего кэша и только после этого из БД.
+    """
+    global _contacts_memo
+    if use_contacts_memo(for_shared_page):
+        return _contacts_memo[1]
+    contacts = await cache.aget(CONTACTS_KEY) if CACHE_ENABLED else None
+    if contacts is None:
+        contacts = await Contacts.objects.order_by("pk").afirst()
+        if CACHE_ENABLED and contacts is not None:
+            await cache.aset(CONTACTS_KEY, contacts, CONTACTS_CACHE_TIMEOUT)
+    _contacts_memo = (time.monotonic() + CONTACTS_MEMO_TIMEOUT, contacts)
+    return contacts
+
+
+def invalidate_contacts_cache():
+    """
+    Удаляет контакты из памяти процесса и из общего кэша.
+    """
+    global _contacts_memo
+    _contacts_memo = None
+    if CACHE_ENABLED:
+        cache.delete(CONTACTS_KEY)
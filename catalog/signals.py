@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from blog.models import Post
+from catalog.images import reset_variants
+from catalog.models import Category, Contacts, Product, ProductVersion
+from catalog.services import (
+    bump_catalog_version,
+    bump_product_detail_version,
+    invalidate_categories_cache,
+    invalidate_contacts_cache,
+    set_product_stamp,
+)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVersion)
+@receiver(post_delete, sender=ProductVersion)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш страниц каталога при изменении продуктов,
+    версий или категорий.
+    Версия меняется после фиксации транзакции, иначе параллельный запрос
+    успеет закэшировать старые данные под новой версией.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def categories_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш списка категорий с количеством продуктов.
+    """
+    transaction.on_commit(invalidate_categories_cache)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш страниц продуктов: на них выводится название категории.
+    """
+    transaction.on_commit(bump_product_detail_version)
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Post)
+def image_uploaded(sender, instance, **kwargs):
+    """
+    Ставит загруженное изображение в очередь на создание копий
+    (generate_image_variants).
+    """
+    reset_variants(instance)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш страницы продукта после его сохранения.
+    """
+    transaction.on_commit(lambda: set_product_stamp(instance.pk, instance.updated_at))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш страницы удаленного продукта.
+    """
+    # После удаления Django обнуляет pk объекта, поэтому он сохраняется заранее.
+    pk = instance.pk
+    transaction.on_commit(lambda: set_product_stamp(pk))
+
+
+def is_product_deletion(origin):
+    """
+    Проверяет, что удаление начато с удаления продуктов
+    (версии удаляются каскадно вместе с ними).
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is Product
+    return isinstance(origin, Product)
+
+
+@receiver(post_save, sender=ProductVersion)
+@receiver(post_delete, sender=ProductVersion)
+def product_version_changed(sender, instance, origin=None, **kwargs):
+    """
+    Отмечает изменение версии как изменение продукта
+    и сбрасывает кэш страницы продукта.
+    При удалении самого продукта отмечать нечего: его строка удаляется,
+    а кэш страницы сбрасывает product_deleted.
+    """
+    if is_product_deletion(origin):
+        return
+    updated_at = timezone.now()
+    Product.objects.filter(pk=instance.product_id).update(updated_at=updated_at)
+    transaction.on_commit(lambda: set_product_stamp(instance.product_id, updated_at))
+
+
+@receiver(post_save, sender=Contacts)
+@receiver(post_delete, sender=Contacts)
+def contacts_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш контактов организации, закэшированные страницы
+    продуктов с подвалом контактов и ETag списков продуктов.
+    """
+    transaction.on_commit(invalidate_contacts_cache)
+    transaction.on_commit(bump_product_detail_version)
+    transaction.on_commit(bump_catalog_version)
@@ -1,10 +1,13 @@
 from django import template
 
+from catalog.services import get_categories_from_cache
+
 register = template.Library()
 
 
-@register.filter
-def media_filter(path):
-    if path:
-        return f"/media/{path}"
-    return "#"
+@register.simple_tag
+def categories():
+    """
+    Возвращает список категорий с количеством продуктов из кэша.
+    """
+    return get_categories_from_cache()
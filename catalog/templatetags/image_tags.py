@@ -0,0 +1,26 @@
+from django import template
+
+from catalog.images import get_srcset, get_variant_url
+
+register = template.Library()
+
+
+@register.filter
+def variant_filter(instance, width):
+    """
+    Возвращает URL уменьшенной копии изображения продукта или статьи
+    заданной ширины.
+    """
+    if instance.image:
+        return get_variant_url(instance, width)
+    return "#"
+
+
+@register.filter
+def srcset_filter(instance):
+    """
+    Возвращает значение srcset из WebP-копий изображения продукта или статьи.
+    """
+    if instance.image:
+        return get_srcset(instance)
+    return ""
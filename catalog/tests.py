@@ -1 +1,872 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from catalog.async_views import (
+    AsyncCategoryListView,
+    AsyncProductDetailView,
+    AsyncProductListView,
+)
+from catalog.facets import get_facets
+from catalog.forms import ProductForm
+from catalog.management.commands.fill import Command as FillCommand
+from catalog.images import (
+    generate_variants,
+    get_srcset,
+    get_variant_name,
+    get_variant_url,
+)
+from catalog.models import Category, Contacts, Product, ProductVersion
+from catalog.pagination import get_cursor_query
+from catalog.services import get_contacts_from_cache, invalidate_contacts_cache
+from catalog.validators import find_forbidden_word
+from tests.perf import CacheEnabledMixin, DatasetMixin, ViewPerformanceMixin
+from users.models import User
+
+
+class CatalogViewsPerformanceTest(ViewPerformanceMixin, TestCase):
+    """
+    Бюджет SQL-запросов и время ответа контроллеров каталога.
+    Бюджет не должен зависеть от количества продуктов на странице.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.first()
+        cls.product = Product.objects.filter(
+            owner=cls.users["owner"], is_published=True
+        ).first()
+
+    def test_product_list(self):
+        url = reverse("catalog:home")
+        self.assertViewWithinBudget(url, "anonymous", 4)
+        self.assertViewWithinBudget(url, "owner", 8)
+        self.assertViewWithinBudget(url, "moderator", 8)
+
+    def test_product_by_category(self):
+        url = reverse("catalog:product_by_category", args=[self.category.pk])
+        self.assertViewWithinBudget(url, "anonymous", 4)
+        self.assertViewWithinBudget(url, "owner", 8)
+        self.assertViewWithinBudget(url, "moderator", 8)
+
+    def test_product_search(self):
+        url = f"{reverse('catalog:search')}?q=Товар"
+        self.assertViewWithinBudget(url, "anonymous", 2)
+        self.assertViewWithinBudget(url, "owner", 6)
+        self.assertViewWithinBudget(url, "moderator", 6)
+
+    def test_product_detail(self):
+        url = reverse("catalog:product_detail", args=[self.product.pk])
+        self.assertViewWithinBudget(url, "anonymous", 2)
+        self.assertViewWithinBudget(url, "owner", 6)
+        self.assertViewWithinBudget(url, "moderator", 5)
+
+    def test_categories(self):
+        url = reverse("catalog:categories")
+        self.assertViewWithinBudget(url, "anonymous", 1)
+        self.assertViewWithinBudget(url, "owner", 3)
+        self.assertViewWithinBudget(url, "moderator", 3)
+
+    def test_contacts(self):
+        url = reverse("catalog:contacts")
+        self.assertViewWithinBudget(url, "anonymous", 0)
+        self.assertViewWithinBudget(url, "owner", 2)
+        self.assertViewWithinBudget(url, "moderator", 2)
+
+    def test_product_create(self):
+        url = reverse("catalog:product_create")
+        self.assertViewWithinBudget(url, "anonymous", 0, status=302)
+        self.assertViewWithinBudget(url, "owner", 3)
+        self.assertViewWithinBudget(url, "moderator", 3)
+
+    def test_product_edit(self):
+        url = reverse("catalog:product_edit", args=[self.product.pk])
+        self.assertViewWithinBudget(url, "anonymous", 0, status=302)
+        self.assertViewWithinBudget(url, "owner", 5)
+        self.assertViewWithinBudget(url, "moderator", 8)
+
+    def test_product_delete(self):
+        url = reverse("catalog:product_delete", args=[self.product.pk])
+        self.assertViewWithinBudget(url, "anonymous", 0, status=302)
+        self.assertViewWithinBudget(url, "owner", 3)
+        self.assertViewWithinBudget(url, "moderator", 3)
+
+
+class ProductListOrderingTest(DatasetMixin, TestCase):
+    """
+    Сортировка и постраничный вывод списка продуктов по курсору.
+    """
+
+    def get_products(self, **params):
+        response = self.client.get(reverse("catalog:home"), params)
+        return response, list(response.context["object_list"])
+
+    def test_sorted(self):
+        for sort, key, reverse_order in (
+            ("price", "price", False),
+            ("-price", "price", True),
+            ("name", "name", False),
+        ):
+            with self.subTest(sort=sort):
+                _, products = self.get_products(sort=sort)
+                values = [getattr(product, key) for product in products]
+                self.assertTrue(values)
+                self.assertEqual(values, sorted(values, reverse=reverse_order))
+
+    def test_next_page_same_queries(self):
+        # Следующая страница продолжает список без повторов
+        # и не требует дополнительных запросов. Контакты организации
+        # загружаются первым запросом к процессу.
+        get_contacts_from_cache()
+        with CaptureQueriesContext(connection) as first_queries:
+            response, first = self.get_products(sort="price")
+        with CaptureQueriesContext(connection) as next_queries:
+            _, second = self.get_products(
+                sort="price", cursor=response.context["next_cursor"]
+            )
+        self.assertTrue(second)
+        self.assertFalse(
+            {product.pk for product in first} & {product.pk for product in second}
+        )
+        self.assertGreaterEqual(second[0].price, first[-1].price)
+        self.assertEqual(len(next_queries), len(first_queries))
+
+    def test_sort_indexes(self):
+        # Списки модератора (без фильтра) и владельца (свои или опубликованные)
+        # читают индекс сортировки, а не сортируют всю таблицу.
+        if connection.vendor == "postgresql":
+            # На маленькой тестовой таблице PostgreSQL выбирает полный
+            # просмотр: без сортировки план возможен только по индексу.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+        for role in ("moderator", "owner"):
+            products = Product.objects.visible_to(self.users[role])
+            for sort, index in (
+                ("price", "product_price_idx"),
+                ("-price", "product_price_idx"),
+                ("name", "product_name_idx"),
+            ):
+                rows, _ = get_cursor_query(products, sort, None, 12)
+                self.assertIn(index, rows.explain(), f"{role} {sort}")
+
+
+class ProductListCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэш страниц списка продуктов по уровням видимости.
+    """
+
+    def test_anonymous_page_served_from_cache(self):
+        url = reverse("catalog:home")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_tiers_are_cached_separately(self):
+        url = reverse("catalog:home")
+        anonymous = self.client.get(url).context["object_list"]
+        self.client.force_login(self.users["moderator"])
+        moderator = self.client.get(url).context["object_list"]
+        self.assertTrue(all(product.is_published for product in anonymous))
+        self.assertFalse(all(product.is_published for product in moderator))
+
+    def test_product_change_invalidates_page(self):
+        url = reverse("catalog:home")
+        product = self.client.get(url).context["object_list"][0]
+        product.name = "Новое название"
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        names = [item.name for item in self.client.get(url).context["object_list"]]
+        self.assertIn("Новое название", names)
+
+
+class ProductDetailCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэш страницы продукта с учетом уровня видимости пользователя.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.filter(
+            owner=cls.users["owner"], is_published=True
+        ).first()
+        cls.url = reverse("catalog:product_detail", args=[cls.product.pk])
+
+    def test_anonymous_page_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_tiers_are_cached_separately(self):
+        edit_url = reverse("catalog:product_edit", args=[self.product.pk])
+        self.assertNotContains(self.client.get(self.url), edit_url)
+        self.client.force_login(self.users["owner"])
+        self.assertContains(self.client.get(self.url), edit_url)
+
+    def test_unpublished_product_hidden_from_anonymous(self):
+        product = Product.objects.filter(is_published=False).first()
+        url = reverse("catalog:product_detail", args=[product.pk])
+        self.client.force_login(self.users["moderator"])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_product_change_invalidates_page(self):
+        self.client.get(self.url)
+        self.product.name = "Новое название"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertContains(self.client.get(self.url), "Новое название")
+
+    def test_other_product_change_keeps_page(self):
+        etag = self.client.get(self.url)["ETag"]
+        other = Product.objects.exclude(pk=self.product.pk).first()
+        other.name = "Новое название"
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_version_change_invalidates_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVersion.objects.create(
+                product=self.product,
+                version_number=10,
+                version_name="Новая версия",
+                is_active=True,
+            )
+        self.assertContains(self.client.get(self.url), "Новая версия")
+
+    def test_product_delete_skips_version_updates(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.delete()
+        updates = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "catalog_product"')
+        ]
+        self.assertEqual(updates, [])
+
+    def test_version_delete_marks_product_changed(self):
+        updated_at = self.product.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVersion.objects.filter(product=self.product).first().delete()
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_at, updated_at)
+
+    def test_category_change_invalidates_page(self):
+        etag = self.client.get(self.url)["ETag"]
+        category = self.product.category
+        category.name = "Новая категория"
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Новая категория")
+
+    def test_edit_link_follows_template_checks(self):
+        edit_url = reverse("catalog:product_edit", args=[self.product.pk])
+        self.client.force_login(self.users["owner"])
+        self.assertContains(self.client.get(self.url), edit_url)
+        # Страница владельца не отдается другим пользователям.
+        stranger = User.objects.get(email="stranger@example.com")
+        self.client.force_login(stranger)
+        self.assertNotContains(self.client.get(self.url), edit_url)
+        # Права снятия с публикации недостаточно для редактирования.
+        publisher = User.objects.create(email="publisher@example.com")
+        publisher.user_permissions.add(
+            Permission.objects.get(codename="cancel_publication")
+        )
+        self.client.force_login(publisher)
+        self.assertNotContains(self.client.get(self.url), edit_url)
+        self.client.force_login(self.users["moderator"])
+        self.assertContains(self.client.get(self.url), edit_url)
+
+
+class CatalogConditionalGetTest(CacheEnabledMixin, TestCase):
+    """
+    Ответы 304 на условные запросы к страницам каталога.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.filter(
+            owner=cls.users["owner"], is_published=True
+        ).first()
+        cls.detail_url = reverse("catalog:product_detail", args=[cls.product.pk])
+        cls.category_url = reverse(
+            "catalog:product_by_category", args=[cls.product.category_id]
+        )
+
+    def test_not_modified_without_queries(self):
+        for url in (reverse("catalog:home"), self.category_url, self.detail_url):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)["Last-Modified"]
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_visibility(self):
+        for url in (reverse("catalog:home"), self.detail_url):
+            with self.subTest(url=url):
+                self.client.logout()
+                etag = self.client.get(url)["ETag"]
+                self.client.force_login(self.users["owner"])
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_change_invalidates_etag(self):
+        url = reverse("catalog:home")
+        list_etag = self.client.get(url)["ETag"]
+        detail_etag = self.client.get(self.detail_url)["ETag"]
+        self.product.name = "Новое название"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertContains(response, "Новое название")
+
+    def test_hidden_product_not_validated(self):
+        product = Product.objects.filter(is_published=False).first()
+        response = self.client.get(reverse("catalog:product_detail", args=[product.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class AsyncCatalogViewsTest(DatasetMixin, TestCase):
+    """
+    Асинхронные контроллеры каталога отдают те же данные, что и синхронные.
+    """
+
+    async def test_product_list(self):
+        url = reverse("catalog:home") + "?sort=price&price_min=500"
+        for role in ("anonymous", "moderator"):
+            with self.subTest(role=role):
+                await sync_to_async(self.login_as)(role)
+                expected = await sync_to_async(self.client.get)(url)
+                response = await self.arequest_view(AsyncProductListView, url, role)
+                self.assertEqual(
+                    response.context_data["object_list"],
+                    expected.context["object_list"],
+                )
+                self.assertEqual(
+                    response.context_data["facets"], expected.context["facets"]
+                )
+
+    async def test_product_detail_visibility(self):
+        product = await Product.objects.filter(is_published=False).afirst()
+        url = reverse("catalog:product_detail", args=[product.pk])
+        response = await self.arequest_view(AsyncProductDetailView, url, "moderator")
+        self.assertContains(response, product.name)
+        with self.assertRaises(Http404):
+            await self.arequest_view(AsyncProductDetailView, url)
+
+    @mock.patch("catalog.services.CACHE_ENABLED", True)
+    async def test_product_detail_not_modified(self):
+        await sync_to_async(cache.clear)()
+        product = await Product.objects.filter(is_published=True).afirst()
+        url = reverse("catalog:product_detail", args=[product.pk])
+        etag = (await self.arequest_view(AsyncProductDetailView, url))["ETag"]
+        response = await self.arequest_view(
+            AsyncProductDetailView, url, headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_category_list(self):
+        response = await self.arequest_view(
+            AsyncCategoryListView, reverse("catalog:categories")
+        )
+        self.assertEqual(len(response.context_data["object_list"]), 5)
+        self.assertContains(response, "Тверская")
+
+
+class ContactsCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэш контактов организации в памяти процесса и в общем кэше.
+    """
+
+    def setUp(self):
+        super().setUp()
+        invalidate_contacts_cache()
+
+    def test_contacts_cached(self):
+        with self.assertNumQueries(1):
+            contacts = get_contacts_from_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_contacts_from_cache(), contacts)
+        # Другой процесс получает контакты из общего кэша.
+        with mock.patch("catalog.services._contacts_memo", None):
+            with self.assertNumQueries(0):
+                self.assertEqual(get_contacts_from_cache().inn, contacts.inn)
+
+    def test_contacts_save_invalidates_cache(self):
+        contacts = get_contacts_from_cache()
+        contacts.address = "Новый адрес"
+        with self.captureOnCommitCallbacks(execute=True):
+            contacts.save()
+        self.assertContains(self.client.get(reverse("catalog:home")), "Новый адрес")
+
+    def test_contacts_change_invalidates_product_page(self):
+        product = Product.objects.filter(is_published=True).first()
+        url = reverse("catalog:product_detail", args=[product.pk])
+        stale = get_contacts_from_cache()
+        etag = self.client.get(url)["ETag"]
+        contacts = Contacts.objects.get()
+        contacts.address = "Новый адрес"
+        with self.captureOnCommitCallbacks(execute=True):
+            contacts.save()
+        # Другой процесс еще хранит старые контакты в памяти.
+        with mock.patch(
+            "catalog.services._contacts_memo", (time.monotonic() + 60, stale)
+        ):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Новый адрес")
+
+
+class CategoryCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэш списка категорий с количеством опубликованных продуктов.
+    """
+
+    def test_categories_served_from_cache(self):
+        url = reverse("catalog:categories")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_products_count(self):
+        category = Category.objects.first()
+        expected = category.products.filter(is_published=True).count()
+        response = self.client.get(reverse("catalog:categories"))
+        counts = {
+            item["pk"]: item["products_count"]
+            for item in response.context["object_list"]
+        }
+        self.assertEqual(counts[category.pk], expected)
+
+    def test_product_change_invalidates_categories(self):
+        url = reverse("catalog:categories")
+        self.client.get(url)
+        product = Product.objects.filter(is_published=False).first()
+        product.is_published = True
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        response = self.client.get(url)
+        counts = {
+            item["pk"]: item["products_count"]
+            for item in response.context["object_list"]
+        }
+        self.assertEqual(
+            counts[product.category_id],
+            Product.objects.filter(
+                category=product.category, is_published=True
+            ).count(),
+        )
+
+
+class ProductSearchTest(DatasetMixin, TestCase):
+    """
+    Поиск продуктов с учетом прав пользователя.
+    """
+
+    def search(self, query):
+        response = self.client.get(reverse("catalog:search"), {"q": query})
+        return {product.pk for product in response.context["object_list"]}
+
+    def test_search_respects_visibility(self):
+        product = Product.objects.filter(is_published=False).first()
+        self.assertNotIn(product.pk, self.search(product.name))
+        self.client.force_login(self.users["moderator"])
+        self.assertIn(product.pk, self.search(product.name))
+
+    def test_search_by_description(self):
+        product = Product.objects.filter(is_published=True).first()
+        self.assertIn(product.pk, self.search(product.description.split(".")[0]))
+
+    def test_empty_query(self):
+        self.assertEqual(self.search(""), set())
+
+
+class ProductFacetsTest(DatasetMixin, TestCase):
+    """
+    Фильтрация списка продуктов и подсчет фасетов.
+    """
+
+    def get(self, **params):
+        return self.client.get(reverse("catalog:home"), params)
+
+    def test_price_filter(self):
+        response = self.get(price_min=300, price_max=600)
+        prices = [product.price for product in response.context["object_list"]]
+        self.assertTrue(prices)
+        self.assertTrue(all(300 <= price <= 600 for price in prices))
+
+    def test_facet_counts(self):
+        category = Category.objects.first()
+        facets = self.get(price_min=500).context["facets"]
+        published = Product.objects.filter(is_published=True)
+        counts = {item["pk"]: item["count"] for item in facets["categories"]}
+        self.assertEqual(
+            counts[category.pk],
+            published.filter(category=category, price__gte=500).count(),
+        )
+        # Счетчики цен не зависят от выбранного интервала цен.
+        self.assertEqual(
+            sum(bucket["count"] for bucket in facets["prices"]), published.count()
+        )
+
+    def test_facets_single_query(self):
+        category_ids = list(Category.objects.values_list("pk", flat=True))
+        with self.assertNumQueries(1):
+            get_facets(
+                Product.objects.all(),
+                {"price": Q(price__gte=500), "category": Q(category=category_ids[0])},
+                category_ids,
+                with_published=True,
+            )
+
+    def test_published_filter_for_moderator_only(self):
+        self.assertNotIn("published", self.get(published=0).context["facets"])
+        products = self.get(published=0).context["object_list"]
+        self.assertTrue(all(product.is_published for product in products))
+        self.client.force_login(self.users["moderator"])
+        response = self.get(published=0)
+        self.assertIn("published", response.context["facets"])
+        products = response.context["object_list"]
+        self.assertTrue(products)
+        self.assertFalse(any(product.is_published for product in products))
+
+
+class ForbiddenWordsTest(TestCase):
+    """
+    Проверка текстов продуктов на запрещенные слова.
+    """
+
+    def test_case_and_word_forms(self):
+        self.assertEqual(find_forbidden_word("Лучшее Казино"), "Казин")
+        self.assertIsNotNone(find_forbidden_word("торги на бирже"))
+        self.assertIsNotNone(find_forbidden_word("оплата КРИПТОВАЛЮТОЙ"))
+        self.assertIsNone(find_forbidden_word("Одеяло хлопковое"))
+        self.assertIsNotNone(find_forbidden_word("биржевой курс"))
+        # Основа внутри другого слова не считается запрещенным словом.
+        self.assertIsNone(find_forbidden_word("Скрипт для сайта"))
+        self.assertIsNone(find_forbidden_word(None))
+
+    def test_settings_reload(self):
+        with self.settings(FORBIDDEN_WORDS=["подделка"]):
+            self.assertIsNotNone(find_forbidden_word("Подделки"))
+            self.assertIsNone(find_forbidden_word("казино"))
+        self.assertIsNotNone(find_forbidden_word("казино"))
+
+    def test_product_form(self):
+        form = ProductForm(data={"name": "Казино", "description": "", "price": 100})
+        self.assertIn("name", form.errors)
+
+    def test_moderate_products_command(self):
+        category = Category.objects.create(name="Категория")
+        bad = Product.objects.create(
+            name="Подушка", description="Бесплатно!", price=1, is_published=True
+        )
+        good = Product.objects.create(
+            name="Подушка", category=category, price=1, is_published=True
+        )
+        out = StringIO()
+        call_command("moderate_products", "--unpublish", "--chunk-size=1", stdout=out)
+        bad.refresh_from_db()
+        good.refresh_from_db()
+        self.assertFalse(bad.is_published)
+        self.assertTrue(good.is_published)
+        self.assertIn("нарушений: 1", out.getvalue())
+
+
+class ImageVariantsTest(TestCase):
+    """
+    Создание уменьшенных копий и WebP-версий изображений.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        buffer = BytesIO()
+        Image.new("RGB", (400, 200), "red").save(buffer, "JPEG")
+        self.path = default_storage.save(
+            "catalog/photo.jpg", ContentFile(buffer.getvalue())
+        )
+
+    def test_generate_variants(self):
+        # Копия шириной 600 пикселей шире оригинала и не создается.
+        self.assertEqual(generate_variants(self.path), (2, 400))
+        self.assertEqual(generate_variants(self.path), (0, 400))
+        with default_storage.open(get_variant_name(self.path, 300)) as file:
+            with Image.open(file) as image:
+                self.assertEqual((image.format, image.size), ("WEBP", (300, 150)))
+        self.assertEqual(generate_variants(self.path, force=True), (2, 400))
+
+    def test_generate_image_variants_command(self):
+        product = Product.objects.create(name="Подушка", price=1, image=self.path)
+        # До создания копий страницы выводят оригинал.
+        self.assertEqual(get_srcset(product), "")
+        out = StringIO()
+        call_command("generate_image_variants", "--workers=1", stdout=out)
+        self.assertIn("создано копий: 2", out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.image_width, 400)
+
+        # Адреса копий строятся по сохраненной ширине, без обращения к хранилищу.
+        with mock.patch.object(default_storage, "exists", side_effect=AssertionError):
+            self.assertTrue(get_srcset(product).endswith("photo_300w.webp 300w"))
+            self.assertTrue(
+                get_variant_url(product, 300).endswith("variants/photo_300w.jpg")
+            )
+            self.assertTrue(get_variant_url(product, 600).endswith("photo.jpg"))
+
+        # Обработанные изображения не обрабатываются повторно.
+        out = StringIO()
+        call_command("generate_image_variants", "--workers=1", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+        # Замененное изображение снова попадает в очередь.
+        product.image = default_storage.save("catalog/other.jpg", ContentFile(b""))
+        product.save()
+        self.assertEqual(get_srcset(product), "")
+        err = StringIO()
+        call_command("generate_image_variants", "--workers=1", stdout=out, stderr=err)
+        self.assertIn("other.jpg", err.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.variants_source, product.image.name)
+        self.assertIsNone(product.image_width)
+
+    def test_reupload_under_same_name(self):
+        product = Product.objects.create(name="Подушка", price=1, image=self.path)
+        call_command("generate_image_variants", "--workers=1", stdout=StringIO())
+        variant = get_variant_name(self.path, 300)
+        # Копии созданы раньше, чем загружен новый файл.
+        past = time.time() - 60
+        for name in (variant, get_variant_name(self.path, 300, "JPEG")):
+            os.utime(default_storage.path(name), (past, past))
+
+        default_storage.delete(self.path)
+        buffer = BytesIO()
+        Image.new("RGB", (400, 200), "blue").save(buffer, "JPEG")
+        product.image = SimpleUploadedFile("photo.jpg", buffer.getvalue())
+        product.save()
+        self.assertEqual(product.image.name, self.path)
+        self.assertEqual(get_srcset(product), "")
+
+        call_command("generate_image_variants", "--workers=1", stdout=StringIO())
+        with default_storage.open(variant) as file:
+            with Image.open(file) as image:
+                red, green, blue = image.convert("RGB").getpixel((150, 75))
+        self.assertGreater(blue, red)
+
+
+class FillCommandTest(TestCase):
+    """
+    Потоковая загрузка каталога из json-файла.
+    """
+
+    def write_data(self, items):
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=".json", encoding="utf-8", delete=False
+        )
+        self.addCleanup(os.remove, file.name)
+        with file:
+            json.dump(items, file, ensure_ascii=False, indent=4)
+        return file.name
+
+    def test_fill(self):
+        Product.objects.create(name="Старый продукт", price=1)
+        items = [
+            {"model": "catalog.category", "pk": pk, "fields": {"name": f"К{pk}"}}
+            for pk in (3, 7)
+        ]
+        items += [
+            {
+                "model": "catalog.product",
+                "pk": index,
+                "fields": {"name": f"П{index}", "price": index, "category": 7},
+            }
+            for index in range(1, 12)
+        ]
+        path = self.write_data(items)
+        out = StringIO()
+        # Маленький буфер чтения проверяет разбор объектов, разрезанных по частям.
+        with mock.patch.object(FillCommand, "read_chunk_size", 64):
+            call_command("fill", f"--file={path}", "--batch-size=4", stdout=out)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Product.objects.filter(category=7).count(), 11)
+        self.assertFalse(Product.objects.filter(name="Старый продукт").exists())
+        self.assertEqual(Category.objects.create(name="Новая").pk, 8)
+        self.assertIn("продуктов: 11", out.getvalue())
+
+    def test_unknown_category(self):
+        path = self.write_data(
+            [
+                {
+                    "model": "catalog.product",
+                    "fields": {"name": "П", "price": 1, "category": 5},
+                }
+            ]
+        )
+        with self.assertRaises(CommandError):
+            call_command("fill", f"--file={path}", stdout=StringIO())
+
+    def test_sync(self):
+        items = [
+            {"model": "catalog.category", "pk": 1, "fields": {"name": "Одеяла"}},
+            {"model": "catalog.category", "pk": 2, "fields": {"name": "Подушки"}},
+        ]
+        items += [
+            {
+                "model": "catalog.product",
+                "pk": index,
+                "fields": {"name": f"П{index}", "price": index, "category": 1},
+            }
+            for index in range(1, 6)
+        ]
+        call_command("fill", f"--file={self.write_data(items)}", stdout=StringIO())
+        owner = User.objects.create(email="owner@test.ru")
+        kept = Product.objects.get(external_id=1)
+        Product.objects.filter(pk=kept.pk).update(owner=owner)
+        ProductVersion.objects.create(product=kept, version_number=1, version_name="A")
+        site_product = Product.objects.create(name="С сайта", price=1)
+
+        del items[1]
+        items[2]["fields"]["price"] = 100
+        items[-1]["pk"] = 10
+        out = StringIO()
+        call_command("fill", f"--file={self.write_data(items)}", "--sync", stdout=out)
+        self.assertIn(
+            "Создано: 1, изменено: 1, удалено: 2, без изменений: 4", out.getvalue()
+        )
+        kept.refresh_from_db()
+        self.assertEqual(kept.owner, owner)
+        self.assertTrue(kept.productversion_set.exists())
+        self.assertTrue(Product.objects.filter(pk=site_product.pk).exists())
+        self.assertEqual(Product.objects.get(external_id=2).price, 100)
+        self.assertEqual(
+            sorted(
+                Product.objects.filter(external_id__isnull=False).values_list(
+                    "external_id", flat=True
+                )
+            ),
+            [1, 2, 3, 4, 10],
+        )
+        self.assertFalse(Category.objects.filter(pk=2).exists())
+
+
+class ExportTest(TestCase):
+    """
+    Потоковая выгрузка каталога.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Одеяла")
+        owner = User.objects.create(email="owner@test.ru")
+        product = Product.objects.create(
+            name='Одеяло "Лето"', price=100, category=category, owner=owner
+        )
+        ProductVersion.objects.create(
+            product=product, version_number=1, version_name="Весна", is_active=True
+        )
+        Product.objects.create(name="Подушка", price=50)
+
+    def test_export_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "products.csv")
+        call_command("export_catalog", f"--output={path}", stdout=StringIO())
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["name"], 'Одеяло "Лето"')
+        self.assertEqual(rows[0]["category"], "Одеяла")
+        self.assertEqual(rows[0]["owner"], "owner@test.ru")
+        self.assertEqual(rows[0]["active_version"], "Весна")
+        self.assertEqual(rows[1]["active_version"], "Новый")
+
+        path = os.path.join(directory, "products.jsonl.gz")
+        call_command(
+            "export_catalog",
+            "--format=jsonl",
+            "--gzip",
+            "--chunk-size=1",
+            f"--output={path}",
+            stdout=StringIO(),
+        )
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([row["name"] for row in rows], ['Одеяло "Лето"', "Подушка"])
+        self.assertIsNone(rows[1]["category"])
+
+    def test_admin_action(self):
+        admin = User.objects.create(
+            email="admin@test.ru", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:catalog_product_changelist"),
+            {
+                "action": "export_csv",
+                "_selected_action": Product.objects.values_list("pk", flat=True),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 3)
+
+    async def test_admin_action_asgi(self):
+        admin = await User.objects.acreate(
+            email="admin@test.ru", is_staff=True, is_superuser=True
+        )
+        await sync_to_async(self.async_client.force_login)(admin)
+        pks = [pk async for pk in Product.objects.values_list("pk", flat=True)]
+        response = await self.async_client.post(
+            reverse("admin:catalog_product_changelist"),
+            {"action": "export_csv", "_selected_action": pks},
+        )
+        self.assertEqual(response.status_code, 200)
+        # Асинхронный итератор ASGI-обработчик отдает блоками, не собирая в память.
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b"".join(chunks).decode().splitlines()), 3)
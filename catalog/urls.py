@@ -1,5 +1,5 @@
+from django.conf import settings
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
 from catalog.apps import CatalogConfig
 from catalog.views import (
@@ -11,24 +11,29 @@ from catalog.views import (
     ProductDeleteView,
     CategoryListView,
     ProductCategoryList,
+    ProductSearchView,
 )
 
+if settings.ASYNC_VIEWS:
+    from catalog.async_views import (
+        AsyncCategoryListView as CategoryListView,
+        AsyncProductDetailView as ProductDetailView,
+        AsyncProductListView as ProductListView,
+    )
+
 app_name = CatalogConfig.name
 
 
 urlpatterns = (
     path("", ProductListView.as_view(), name="home"),
     path("contacts/", ContactsPage.as_view(), name="contacts"),
-    path(
-        "catalog/<int:pk>/",
-        cache_page(60)(ProductDetailView.as_view()),
-        name="product_detail",
-    ),
+    path("catalog/<int:pk>/", ProductDetailView.as_view(), name="product_detail"),
     path("catalog/create/", ProductCreateView.as_view(), name="product_create"),
     path("catalog/<int:pk>/edit/", ProductUpdateView.as_view(), name="product_edit"),
     path(
         "catalog/<int:pk>/delete/", ProductDeleteView.as_view(), name="product_delete"
     ),
+    path("catalog/search/", ProductSearchView.as_view(), name="search"),
     path("catalog/categories/", CategoryListView.as_view(), name="categories"),
     path(
         "catalog/categories/<int:pk>/",
@@ -0,0 +1,69 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+FORBIDDEN_WORDS = [
+    "казино",
+    "криптовалюта",
+    "крипта",
+    "биржа",
+    "дешево",
+    "бесплатно",
+    "обман",
+    "полиция",
+    "радар",
+]
+
+# Окончания, которые отбрасываются, чтобы находить другие формы слова:
+# "биржа" -> "бирж" найдет "биржи", "бирже", "биржевой".
+WORD_ENDINGS = "аеиоуыэюяйь"
+MIN_STEM_LENGTH = 4
+
+
+def get_stem(word):
+    """
+    Возвращает основу слова без конечных гласных.
+    """
+    stem = word.lower().rstrip(WORD_ENDINGS)
+    return stem if len(stem) >= MIN_STEM_LENGTH else word.lower()
+
+
+@lru_cache(maxsize=1)
+def get_forbidden_words_pattern():
+    """
+    Возвращает регулярное выражение, находящее любое запрещенное слово
+    в любой форме и любом регистре за один проход по тексту.
+    Основа ищется только в начале слова (\b), поэтому слова, лишь
+    содержащие ее внутри ("скрипт" и "крипта"), не считаются запрещенными.
+    Выражение компилируется один раз на процесс; список слов
+    можно переопределить настройкой FORBIDDEN_WORDS.
+    """
+    words = getattr(settings, "FORBIDDEN_WORDS", FORBIDDEN_WORDS)
+    stems = sorted({get_stem(word) for word in words}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, stems)) + ")", re.IGNORECASE)
+
+
+def reload_forbidden_words():
+    """
+    Сбрасывает скомпилированное выражение после изменения списка слов.
+    """
+    get_forbidden_words_pattern.cache_clear()
+
+
+@receiver(setting_changed)
+def forbidden_words_changed(setting, **kwargs):
+    if setting == "FORBIDDEN_WORDS":
+        reload_forbidden_words()
+
+
+def find_forbidden_word(text):
+    """
+    Возвращает первое найденное в тексте запрещенное слово или None.
+    """
+    if not text:
+        return None
+    match = get_forbidden_words_pattern().search(text)
+    return match.group() if match else None
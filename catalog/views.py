@@ -1,8 +1,10 @@
+from functools import partial
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
 from django.forms import inlineformset_factory
 from django.urls import reverse_lazy, reverse
+from django.utils.functional import SimpleLazyObject
 from django.views.generic import (
     ListView,
     DetailView,
@@ -12,9 +14,21 @@ from django.views.generic import (
     DeleteView,
 )
 
+from catalog.conditional import ConditionalGetMixin
+from catalog.facets import ProductFilterMixin
 from catalog.forms import ProductForm, ProductVersionForm, ProductModeratorForm
-from catalog.models import Product, Contacts, ProductVersion, Category
-from catalog.services import get_categories_from_cache
+from catalog.models import Product, ProductVersion, Category
+from catalog.pagination import KeysetPaginationMixin
+from catalog.services import (
+    PRODUCT_EDITOR_PERMISSIONS,
+    can_edit_product,
+    get_categories_from_cache,
+    get_catalog_data_from_cache,
+    get_catalog_list_etag,
+    get_contacts_from_cache,
+    get_product_detail_from_cache,
+    get_product_detail_validators,
+)
 
 
 class CategoryListView(ListView):
@@ -23,6 +37,7 @@ class CategoryListView(ListView):
     """
 
     model = Category
+    template_name = "catalog/category_list.html"
 
     def get_queryset(self):
         """
@@ -31,7 +46,9 @@ class CategoryListView(ListView):
         return get_categories_from_cache()
 
 
-class ProductListView(ListView):
+class ProductListView(
+    ConditionalGetMixin, ProductFilterMixin, KeysetPaginationMixin, ListView
+):
     """
     Контроллер списка продуктов.
     """
@@ -39,63 +56,92 @@ class ProductListView(ListView):
     model = Product
     extra_context = {"cat_selected": 0}
 
+    def get_validators(self):
+        """
+        Возвращает ETag страницы по версии каталога.
+        """
+        return (
+            get_catalog_list_etag(self.request.user, self.request.get_full_path()),
+            None,
+        )
+
     def get_queryset(self):
         """
-        Получает список продуктов, учитывая права пользователя.
+        Получает отфильтрованный список продуктов с активными версиями,
+        учитывая права пользователя.
         """
-        user = self.request.user
-        if user.has_perm("catalog.cancel_publication"):
-            return super().get_queryset().order_by("-created_at")
-        elif user.is_authenticated:
-            return (
-                super()
-                .get_queryset()
-                .filter(Q(owner=user) | Q(is_published=True))
-                .order_by("-created_at")
-            )
-        return super().get_queryset().filter(is_published=True).order_by("-created_at")
+        queryset = self.filter_queryset(
+            super().get_queryset().visible_to(self.request.user)
+        )
+        return queryset.select_related("category").with_active_version()
 
-    def get_context_data(self, **kwargs):
+    def paginate_queryset(self, queryset, page_size):
         """
-        Добавляет активную версию каждого продукта в контекст.
+        Получает страницу продуктов из кэша уровня видимости пользователя.
         """
-        context_data = super().get_context_data(**kwargs)
-        products = context_data.get("object_list")
-        for product in products:
-            versions = ProductVersion.objects.filter(product=product)
-            active_versions = versions.filter(is_active=True)
-            if active_versions:
-                product.active_version = active_versions.last().version_name
-            else:
-                product.active_version = "Новый"
-
-        context_data["object_list"] = products
-        return context_data
+        paginate = super().paginate_queryset
+        return get_catalog_data_from_cache(
+            "product_list",
+            self.request.user,
+            (
+                self.get_filter_query(),
+                self.get_sort(),
+                self.request.GET.get("cursor", ""),
+            ),
+            lambda: paginate(queryset, page_size),
+        )
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalGetMixin, DetailView):
     """
     Контроллер детальной информации о продукте.
     """
 
     model = Product
 
+    def get_validators(self):
+        """
+        Возвращает ETag и время изменения страницы по отметке изменения продукта.
+        """
+        return get_product_detail_validators(self.request.user, self.kwargs.get("pk"))
+
+    def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу продукта из кэша уровня видимости пользователя.
+        """
+        render = super().get
+        return get_product_detail_from_cache(
+            request.user, kwargs.get("pk"), lambda: render(request, *args, **kwargs)
+        )
+
     def get_context_data(self, **kwargs):
         """
-        Добавляет активную версию продукта в контекст.
+        Добавляет в контекст право редактирования продукта:
+        по той же проверке строится уровень кэша страницы.
         """
         context_data = super().get_context_data(**kwargs)
-        product = context_data.get("object")
-        versions = ProductVersion.objects.filter(product=product)
-        active_versions = versions.filter(is_active=True)
-        if active_versions:
-            product.active_version = active_versions.last().version_name
-        else:
-            product.active_version = "Новый"
-
-        context_data["object"] = product
+        context_data["can_edit"] = can_edit_product(self.request.user, self.object)
+        # Страница сохраняется в общем кэше, поэтому подвал - с актуальными
+        # контактами, а не с копией из памяти процесса.
+        context_data.setdefault(
+            "contacts",
+            SimpleLazyObject(partial(get_contacts_from_cache, for_shared_page=True)),
+        )
         return context_data
 
+    def get_queryset(self):
+        """
+        Получает продукт вместе с категорией и активной версией,
+        учитывая права пользователя.
+        """
+        return (
+            super()
+            .get_queryset()
+            .visible_to(self.request.user)
+            .select_related("category")
+            .with_active_version()
+        )
+
 
 class ProductCreateView(LoginRequiredMixin, CreateView):
     """
@@ -185,13 +231,10 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         Возвращает форму отображения в зависимости от прав текущего пользователя.
         """
         user = self.request.user
-        if user == self.object.owner:
+        # Сравнение по id не загружает владельца продукта из БД.
+        if user.pk == self.object.owner_id:
             return ProductForm
-        if (
-            user.has_perm("catalog.change_category")
-            and user.has_perm("catalog.change_description")
-            and user.has_perm("catalog.cancel_publication")
-        ):
+        if user.has_perms(PRODUCT_EDITOR_PERMISSIONS):
             return ProductModeratorForm
         raise PermissionDenied
 
@@ -205,7 +248,9 @@ class ProductDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy("catalog:home")
 
 
-class ProductCategoryList(ListView):
+class ProductCategoryList(
+    ConditionalGetMixin, ProductFilterMixin, KeysetPaginationMixin, ListView
+):
     """
     Контроллер списка продуктов по категории.
     """
@@ -213,41 +258,68 @@ class ProductCategoryList(ListView):
     template_name = "catalog/product_list.html"
     context_object_name = "products"
     allow_empty = False
+    filter_by_category = False
+
+    def get_validators(self):
+        """
+        Возвращает ETag страницы по версии каталога.
+        """
+        return (
+            get_catalog_list_etag(self.request.user, self.request.get_full_path()),
+            None,
+        )
 
     def get_queryset(self):
         """
-        Получает список продуктов из кэша или из БД,
+        Получает отфильтрованный список продуктов категории
+        с активными версиями, учитывая права пользователя.
+        """
+        queryset = self.filter_queryset(
+            Product.objects.filter(category=self.kwargs.get("pk")).visible_to(
+                self.request.user
+            )
+        )
+        return queryset.select_related("category").with_active_version()
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет выбранную категорию в контекст.
+        """
+        context_data = super().get_context_data(**kwargs)
+        context_data["cat_selected"] = self.kwargs.get("pk")
+        return context_data
+
+
+class ProductSearchView(ListView):
+    """
+    Контроллер поиска продуктов.
+    """
+
+    template_name = "catalog/product_list.html"
+    extra_context = {"cat_selected": 0}
+    results_limit = 48
+
+    def get_queryset(self):
+        """
+        Получает наиболее релевантные продукты по поисковому запросу,
         учитывая права пользователя.
         """
-        user = self.request.user
-        result = Product.objects.filter(category=self.kwargs.get("pk")).select_related(
-            "category"
+        query = self.request.GET.get("q", "").strip()
+        if not query:
+            return Product.objects.none()
+        return (
+            Product.objects.visible_to(self.request.user)
+            .select_related("category")
+            .with_active_version()
+            .search(query)[: self.results_limit]
         )
-        if user.has_perm("catalog.cancel_publication"):
-            return result.order_by("-created_at")
-        elif user.is_authenticated:
-            return result.filter(Q(owner=user) | Q(is_published=True)).order_by(
-                "-created_at"
-            )
-        return result.filter(is_published=True).order_by("-created_at")
 
     def get_context_data(self, **kwargs):
         """
-        Добавляет активную версию каждого продукта в контекст.
+        Добавляет поисковый запрос в контекст.
         """
         context_data = super().get_context_data(**kwargs)
-        category = context_data["products"][0].category
-        context_data["cat_selected"] = category.pk
-        products = context_data.get("object_list")
-        for product in products:
-            versions = ProductVersion.objects.filter(product=product)
-            active_versions = versions.filter(is_active=True)
-            if active_versions:
-                product.active_version = active_versions.last().version_name
-            else:
-                product.active_version = "Новый"
-
-        context_data["object_list"] = products
+        context_data["query"] = self.request.GET.get("q", "").strip()
         return context_data
 
 
@@ -263,7 +335,7 @@ class ContactsPage(TemplateView):
         Добавляет информацию о контактах в контекст.
         """
         context = super().get_context_data(**kwargs)
-        context["contacts"] = Contacts.objects.get(pk=1)
+        context["contacts"] = get_contacts_from_cache()
         return context
 
     def post(self, request, **kwargs):
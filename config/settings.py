@@ -18,12 +18,18 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django_crontab",
     "catalog",
     "blog",
     "users",
+    "mailing",
+    "benchmark",
+    "monitoring",
 ]
 
 MIDDLEWARE = [
+    "monitoring.middleware.RequestMetricsMiddleware",
+    "monitoring.middleware.DuplicateQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -46,6 +52,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "catalog.context_processors.contacts",
             ],
         },
     },
@@ -55,7 +62,7 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("NAME"),
         "USER": os.getenv("USER"),
         "PASSWORD": os.getenv("PASSWORD"),
@@ -107,15 +114,63 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", False) == "True"
 EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", False) == "True"
 
 AUTH_USER_MODEL = "users.User"
+# Пользователь запроса и его права загружаются из кэша (users.services).
+# Путь бэкенда хранится в сессии: ModelBackend оставлен, чтобы сессии,
+# созданные до перехода на кэш, не завершались; новые входы
+# выполняются через CachedModelBackend.
+AUTHENTICATION_BACKENDS = [
+    "users.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
 
+# Срок действия ссылки восстановления пароля, в секундах.
+PASSWORD_RESET_TIMEOUT = 60 * 60
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", False) == "True"
+# Бэкенды кэша учитывают обращения в метриках запросов (monitoring).
 if CACHE_ENABLED:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "BACKEND": "monitoring.cache.InstrumentedRedisCache",
             "LOCATION": os.getenv("LOCATION"),
         }
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "monitoring.cache.InstrumentedLocMemCache",
+        }
+    }
+
+# Периодические задачи: python manage.py crontab add
+CRONJOBS = [
+    ("*/5 * * * *", "blog.services.flush_post_views"),
+    ("* * * * *", "django.core.management.call_command", ["send_outbox"]),
+    (
+        "* * * * *",
+        "django.core.management.call_command",
+        ["generate_image_variants"],
+    ),
+    ("0 * * * *", "users.services.delete_expired_verifications"),
+]
+
+# Асинхронные контроллеры страниц каталога и блога.
+# Включаются при запуске через ASGI (config/asgi.py).
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", False) == "True"
+
+# Токен доступа к странице метрик /metrics (заголовок Authorization: Bearer);
+# без токена страница доступна только сотрудникам.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Поиск повторяющихся SQL-запросов (N+1) при разработке:
+# максимальное количество запросов одного вида за запрос к контроллеру.
+# Если не задано, проверка отключена.
+DUPLICATE_QUERY_THRESHOLD = (
+    int(os.getenv("DUPLICATE_QUERY_THRESHOLD"))
+    if os.getenv("DUPLICATE_QUERY_THRESHOLD")
+    else None
+)
+# Выбрасывать исключение вместо предупреждения в журнале.
+DUPLICATE_QUERY_RAISE = os.getenv("DUPLICATE_QUERY_RAISE", False) == "True"
@@ -20,11 +20,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from monitoring.views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("catalog.urls", namespace="catalog")),
     path("blog/", include("blog.urls", namespace="blog")),
     path("users/", include("users.urls", namespace="users")),
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
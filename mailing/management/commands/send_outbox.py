@@ -0,0 +1,104 @@
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+
+from mailing.models import OutgoingEmail
+from mailing.services import (
+    MAX_ATTEMPTS,
+    RETENTION,
+    get_outbox_metrics,
+    purge_outbox,
+    send_pending_mail,
+)
+
+# Интервал удаления старых писем в режиме --loop, в секундах.
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Отправляет письма из очереди."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Количество писем, отправляемых через одно соединение",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=MAX_ATTEMPTS,
+            help="Количество попыток отправки письма",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Работать постоянно, проверяя очередь с интервалом --interval",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=RETENTION.days,
+            help="Срок хранения отправленных и неотправленных писем в днях",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Интервал проверки очереди в секундах",
+        )
+
+    def send(self, options):
+        """
+        Отправляет все письма, время отправки которых наступило.
+        """
+        started = time.perf_counter()
+        counts = {status: 0 for status, _ in OutgoingEmail.STATUS_CHOICES}
+        while emails := send_pending_mail(
+            options["batch_size"], options["max_attempts"]
+        ):
+            for email in emails:
+                counts[email.status] += 1
+        processed = sum(counts.values())
+        if not processed and options["loop"]:
+            return
+        elapsed = time.perf_counter() - started
+        metrics = get_outbox_metrics()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Отправлено писем: {counts[OutgoingEmail.SENT]}, "
+                f"отложено: {counts[OutgoingEmail.PENDING]}, "
+                f"не отправлено: {counts[OutgoingEmail.FAILED]}. "
+                f"Скорость: {processed / elapsed if elapsed else processed:.1f} писем/с. "
+                f"В очереди: {metrics['pending']} "
+                f"(самое старое - {metrics['oldest_pending_age']:.0f} с), "
+                f"средняя задержка доставки: {metrics['delivery_latency']:.1f} с."
+            )
+        )
+
+    def purge(self, options):
+        """
+        Удаляет письма старше срока хранения.
+        """
+        deleted = purge_outbox(timedelta(days=options["retention_days"]))
+        if deleted:
+            self.stdout.write(f"Удалено старых писем: {deleted}.")
+
+    def handle(self, *args, **options):
+        """
+        Обработка команды: однократная отправка очереди
+        или постоянная работа с параметром --loop.
+        Старые письма удаляются при запуске, а в режиме --loop -
+        раз в PURGE_INTERVAL.
+        """
+        self.purge(options)
+        purged_at = time.monotonic()
+        self.send(options)
+        while options["loop"]:
+            time.sleep(options["interval"])
+            if time.monotonic() - purged_at >= PURGE_INTERVAL:
+                self.purge(options)
+                purged_at = time.monotonic()
+            self.send(options)
@@ -0,0 +1,50 @@
+from django.db import models
+from django.utils import timezone
+
+NULLABLE = {"blank": True, "null": True}
+
+
+class OutgoingEmail(models.Model):
+    """
+    Модель письма в очереди на отправку.
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Ожидает отправки"),
+        (SENT, "Отправлено"),
+        (FAILED, "Не отправлено"),
+    )
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    message = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(
+        max_length=254, verbose_name="Отправитель", **NULLABLE
+    )
+    recipients = models.JSONField(verbose_name="Получатели")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Статус"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Количество попыток"
+    )
+    last_error = models.TextField(verbose_name="Последняя ошибка", **NULLABLE)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Дата следующей попытки"
+    )
+    sent_at = models.DateTimeField(verbose_name="Дата отправки", **NULLABLE)
+
+    def __str__(self):
+        return f"{self.subject} ({', '.join(self.recipients)})"
+
+    class Meta:
+        verbose_name = "Письмо"
+        verbose_name_plural = "Письма"
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_status_next_idx"
+            ),
+        ]
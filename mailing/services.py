@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from mailing.models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+# Задержка перед повторной попыткой удваивается после каждой ошибки.
+RETRY_DELAY = timedelta(minutes=1)
+MAX_RETRY_DELAY = timedelta(hours=1)
+# Время, на которое письма закрепляются за обработчиком. Если обработчик
+# завершится, не записав результат, письма отправятся повторно после него.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Срок хранения отправленных и неотправленных писем.
+RETENTION = timedelta(days=30)
+PURGE_BATCH_SIZE = 1000
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    """
+    Ставит письмо в очередь на отправку.
+    Письмо сохраняется в текущей транзакции: если она будет отменена,
+    письмо не уйдет. Отправляет письма команда send_outbox.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def get_retry_delay(attempts):
+    """
+    Возвращает задержку перед следующей попыткой отправки.
+    """
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim_pending_mail(batch_size):
+    """
+    Закрепляет за обработчиком порцию писем, время отправки которых наступило.
+    Короткая транзакция блокирует строки (занятые другим обработчиком
+    пропускаются), учитывает попытку отправки и переносит время следующей
+    попытки на CLAIM_TIMEOUT, поэтому другие обработчики не возьмут
+    эти письма, пока они отправляются.
+    :return: список закрепленных писем
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + CLAIM_TIMEOUT
+        OutgoingEmail.objects.bulk_update(emails, ["attempts", "next_attempt_at"])
+    return emails
+
+
+def fail_attempt(email, error, max_attempts):
+    """
+    Откладывает письмо после неудачной попытки с растущей задержкой,
+    а после max_attempts попыток помечает как неотправленное.
+    """
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+
+
+def send_pending_mail(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    """
+    Отправляет порцию писем, время отправки которых наступило,
+    через одно SMTP-соединение.
+    Письма закрепляются за обработчиком в короткой транзакции
+    и отправляются вне ее, поэтому блокировки не держатся во время
+    обмена с SMTP-сервером, а обработчиков можно запускать несколько.
+    При ошибке письмо (или вся порция, если не удалось подключиться
+    к серверу) откладывается с растущей задержкой, а после max_attempts
+    попыток помечается как неотправленное.
+    :return: список обработанных писем
+    """
+    emails = claim_pending_mail(batch_size)
+    if not emails:
+        return emails
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            fail_attempt(email, error, max_attempts)
+    else:
+        try:
+            for index, email in enumerate(emails):
+                try:
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.message,
+                        from_email=email.from_email,
+                        to=email.recipients,
+                        connection=connection,
+                    ).send()
+                except Exception as error:
+                    fail_attempt(email, error, max_attempts)
+                    # Соединение могло оборваться: оно открывается заново
+                    # и используется для остальных писем порции.
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception as error:
+                        for rest in emails[index + 1 :]:
+                            fail_attempt(rest, error, max_attempts)
+                        break
+                else:
+                    email.status = OutgoingEmail.SENT
+                    email.sent_at = timezone.now()
+        finally:
+            connection.close()
+    OutgoingEmail.objects.bulk_update(
+        emails, ["status", "last_error", "next_attempt_at", "sent_at"]
+    )
+    return emails
+
+
+def purge_outbox(retention=RETENTION):
+    """
+    Удаляет отправленные и неотправленные письма, последняя попытка
+    отправки которых была раньше срока хранения. Время закрепления
+    письма за обработчиком (next_attempt_at) отмечает последнюю попытку,
+    поэтому поиск использует индекс очереди. Письма удаляются порциями,
+    чтобы не держать долгих блокировок.
+    :return: количество удаленных писем
+    """
+    emails = OutgoingEmail.objects.filter(
+        status__in=[OutgoingEmail.SENT, OutgoingEmail.FAILED],
+        next_attempt_at__lt=timezone.now() - retention,
+    )
+    deleted = 0
+    while pks := list(emails.values_list("pk", flat=True)[:PURGE_BATCH_SIZE]):
+        deleted += OutgoingEmail.objects.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def get_outbox_metrics(period=timedelta(hours=1)):
+    """
+    Возвращает метрики очереди писем одним запросом:
+    количество ожидающих и неотправленных писем, возраст самого старого
+    ожидающего письма и среднюю задержку доставки за период.
+    """
+    now = timezone.now()
+    metrics = OutgoingEmail.objects.aggregate(
+        pending=Count("pk", filter=Q(status=OutgoingEmail.PENDING)),
+        failed=Count("pk", filter=Q(status=OutgoingEmail.FAILED)),
+        oldest_pending=Min("created_at", filter=Q(status=OutgoingEmail.PENDING)),
+        delivery_latency=Avg(
+            F("sent_at") - F("created_at"),
+            filter=Q(status=OutgoingEmail.SENT, sent_at__gte=now - period),
+        ),
+    )
+    oldest_pending = metrics.pop("oldest_pending")
+    metrics["oldest_pending_age"] = (
+        (now - oldest_pending).total_seconds() if oldest_pending else 0
+    )
+    latency = metrics["delivery_latency"]
+    metrics["delivery_latency"] = latency.total_seconds() if latency else 0
+    return metrics
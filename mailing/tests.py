@@ -0,0 +1,156 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from mailing.models import OutgoingEmail
+from mailing.services import (
+    claim_pending_mail,
+    enqueue_mail,
+    get_outbox_metrics,
+    get_retry_delay,
+    send_pending_mail,
+)
+
+
+class OutboxTest(TestCase):
+    """
+    Очередь писем и их пакетная отправка.
+    """
+
+    def test_register_enqueues_mail(self):
+        response = self.client.post(
+            reverse("users:register"),
+            {
+                "email": "new@test.ru",
+                "password1": "Slozhnyi-parol-123",
+                "password2": "Slozhnyi-parol-123",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, ["new@test.ru"])
+
+    def test_send_outbox(self):
+        for index in range(3):
+            enqueue_mail("Тема", "Текст", [f"user{index}@test.ru"])
+        out = StringIO()
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.open"
+        ) as open_connection:
+            call_command("send_outbox", "--batch-size=2", stdout=out)
+        # Одно соединение на каждую порцию писем.
+        self.assertEqual(open_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists()
+        )
+        self.assertIn("Отправлено писем: 3", out.getvalue())
+        self.assertIn("В очереди: 0", out.getvalue())
+
+    def test_retry_with_backoff(self):
+        email = enqueue_mail("Тема", "Текст", ["user@test.ru"])
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=SMTPException("Сервер недоступен"),
+        ):
+            send_pending_mail(max_attempts=2)
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            # До наступления времени повтора письмо не отправляется.
+            self.assertEqual(send_pending_mail(max_attempts=2), [])
+
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            send_pending_mail(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+        self.assertEqual(email.last_error, "Сервер недоступен")
+        self.assertEqual(get_retry_delay(2), 2 * get_retry_delay(1))
+        self.assertEqual(get_retry_delay(20), timedelta(hours=1))
+
+    def test_connection_error_recorded_for_batch(self):
+        for index in range(2):
+            enqueue_mail("Тема", "Текст", [f"user{index}@test.ru"])
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.open",
+            side_effect=SMTPException("Соединение отклонено"),
+        ):
+            emails = send_pending_mail()
+        self.assertEqual(len(emails), 2)
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "Соединение отклонено")
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend")
+    def test_reconnect_once_after_send_error(self):
+        for index in range(4):
+            enqueue_mail("Тема", "Текст", [f"user{index}@test.ru"])
+        with mock.patch("django.core.mail.backends.smtp.smtplib.SMTP") as smtp:
+            smtp.return_value.sendmail.side_effect = [
+                SMTPException("Соединение оборвано"),
+                {},
+                {},
+                {},
+            ]
+            send_pending_mail()
+        # Первое соединение и одно повторное для оставшихся писем.
+        self.assertEqual(smtp.call_count, 2)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 3
+        )
+
+    def test_purge_old_mail(self):
+        old = timezone.now() - timedelta(days=31)
+        emails = {
+            status: enqueue_mail("Тема", "Текст", ["user@test.ru"])
+            for status, _ in OutgoingEmail.STATUS_CHOICES
+        }
+        OutgoingEmail.objects.update(next_attempt_at=old)
+        for status, email in emails.items():
+            OutgoingEmail.objects.filter(pk=email.pk).update(status=status)
+        recent = enqueue_mail("Тема", "Текст", ["user@test.ru"])
+        OutgoingEmail.objects.filter(pk=recent.pk).update(status=OutgoingEmail.SENT)
+
+        out = StringIO()
+        with mock.patch("mailing.services.PURGE_BATCH_SIZE", 1):
+            call_command("send_outbox", stdout=out)
+        self.assertIn("Удалено старых писем: 2", out.getvalue())
+        # Ожидающее письмо отправляется, а не удаляется.
+        self.assertEqual(
+            set(OutgoingEmail.objects.values_list("pk", flat=True)),
+            {emails[OutgoingEmail.PENDING].pk, recent.pk},
+        )
+
+    def test_claimed_mail_not_taken_twice(self):
+        enqueue_mail("Тема", "Текст", ["user@test.ru"])
+        claimed = claim_pending_mail(10)
+        # Письмо, закрепленное за другим обработчиком, не отправляется повторно.
+        self.assertEqual(send_pending_mail(), [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.next_attempt_at, claimed[0].next_attempt_at)
+
+    def test_metrics(self):
+        enqueue_mail("Тема", "Текст", ["user@test.ru"])
+        sent = enqueue_mail("Тема", "Текст", ["user@test.ru"])
+        OutgoingEmail.objects.filter(pk=sent.pk).update(
+            status=OutgoingEmail.SENT,
+            sent_at=sent.created_at + timedelta(seconds=30),
+        )
+        with self.assertNumQueries(1):
+            metrics = get_outbox_metrics()
+        self.assertEqual(metrics["pending"], 1)
+        self.assertEqual(metrics["failed"], 0)
+        self.assertEqual(metrics["delivery_latency"], 30)
@@ -0,0 +1,85 @@
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from monitoring.collector import current_metrics
+
+MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    """
+    Примесь бэкенда кэша: учитывает в метриках текущего запроса
+    попадания, промахи и время обращений к кэшу.
+    """
+
+    def timed(self, method, *args, **kwargs):
+        """
+        Вызывает метод кэша, учитывая время вызова.
+        Вложенные вызовы (например, decr через incr) не учитываются повторно.
+        """
+        metrics = current_metrics.get()
+        if metrics is None:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        token = current_metrics.set(None)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            current_metrics.reset(token)
+            metrics.cache_time += time.perf_counter() - started
+
+    def get(self, key, default=None, version=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().get(key, default, version)
+        started = time.perf_counter()
+        value = super().get(key, MISSING, version)
+        metrics.cache_time += time.perf_counter() - started
+        if value is MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().get_many(keys, version)
+        keys = list(keys)
+        # Базовая реализация get_many вызывает get для каждого ключа,
+        # поэтому попадания считаются по результату.
+        values = self.timed(super().get_many, keys, version)
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+
+    def set(self, *args, **kwargs):
+        return self.timed(super().set, *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        return self.timed(super().add, *args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self.timed(super().set_many, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self.timed(super().delete, *args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self.timed(super().delete_many, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self.timed(super().incr, *args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        return self.timed(super().decr, *args, **kwargs)
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
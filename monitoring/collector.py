@@ -0,0 +1,61 @@
+import time
+from contextvars import ContextVar
+
+# Метрики текущего запроса; вне запроса (команды, тесты) - None.
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса: SQL-запросы, обращения к кэшу
+    и отрисовка шаблонов.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_time = 0.0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """
+        Обертка выполнения SQL-запросов (connection.execute_wrapper).
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def get_server_timing(self):
+        """
+        Возвращает значение заголовка Server-Timing (длительности в мс).
+        """
+        return ", ".join(
+            (
+                f'db;dur={self.db_time * 1000:.1f};desc="SQL: {self.db_queries}"',
+                f"cache;dur={self.cache_time * 1000:.1f};"
+                f'desc="hit: {self.cache_hits}, miss: {self.cache_misses}"',
+                f"template;dur={self.template_time * 1000:.1f}",
+                f"total;dur={self.total_time * 1000:.1f}",
+            )
+        )
+
+
+def track_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL-запросов на всех соединениях с БД
+    (monitoring/signals.py): учитывает запрос в метриках текущего запроса.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.db_wrapper(execute, sql, params, many, context)
@@ -0,0 +1,120 @@
+import os
+import re
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Строковые литералы, числа, параметры и списки значений IN (...) и VALUES (...)
+# заменяются на ?, чтобы запросы, отличающиеся только значениями,
+# имели один вид.
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+PARAM_RE = re.compile(r"%s|%\(\w+\)s")
+IN_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+VALUES_RE = re.compile(r"\bVALUES\s*\([^)]*\)(?:\s*,\s*\([^)]*\))*", re.IGNORECASE)
+SPACE_RE = re.compile(r"\s+")
+# Управление транзакциями повторяется в каждом запросе и не является дублем.
+IGNORED_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+# Кадры стека, не относящиеся к коду проекта: сторонние пакеты
+# и сам поиск повторов.
+IGNORED_PATHS = (
+    os.sep + "site-packages" + os.sep,
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "collector.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "middleware.py"),
+)
+# Счетчик запросов текущего запроса к контроллеру; вне запроса
+# или без DuplicateQueryMiddleware - None.
+current_tracker = ContextVar("current_tracker", default=None)
+
+
+class DuplicateQueryError(Exception):
+    """
+    Один и тот же SQL-запрос выполнен больше допустимого числа раз.
+    """
+
+
+def normalize_sql(sql):
+    """
+    Возвращает вид SQL-запроса без значений:
+    SELECT ... WHERE "id" = 5 -> SELECT ... WHERE "id" = ?
+    """
+    sql = STRING_RE.sub("?", sql)
+    sql = PARAM_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = IN_RE.sub("IN (...)", sql)
+    sql = VALUES_RE.sub("VALUES (...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def get_caller():
+    """
+    Возвращает место в коде проекта, из которого выполняется запрос:
+    ближайший к запросу кадр стека вне Django и сторонних пакетов.
+    """
+    base_dir = str(settings.BASE_DIR) + os.sep
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base_dir) and not any(
+            path in frame.filename for path in IGNORED_PATHS
+        ):
+            filename = os.path.relpath(frame.filename, base_dir)
+            return f"{filename}:{frame.lineno} in {frame.name}: {frame.line}"
+    return "неизвестно"
+
+
+class QueryShapeTracker:
+    """
+    Считает SQL-запросы одного вида за время запроса к контроллеру.
+    Используется как обертка выполнения SQL-запросов
+    (connection.execute_wrapper). Место в коде запоминается
+    при превышении порога, поэтому стек не разбирается для каждого запроса.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.callers = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            shape = normalize_sql(sql)
+            count = self.counts.get(shape, 0) + 1
+            self.counts[shape] = count
+            if count == self.threshold + 1:
+                self.callers[shape] = get_caller()
+        return execute(sql, params, many, context)
+
+    def get_duplicates(self):
+        """
+        Возвращает список (вид запроса, количество, место в коде)
+        для запросов, повторившихся больше порога.
+        """
+        return [
+            (shape, self.counts[shape], caller)
+            for shape, caller in self.callers.items()
+        ]
+
+    def get_report(self, view):
+        """
+        Возвращает описание повторяющихся запросов контроллера
+        или пустую строку, если их нет.
+        """
+        duplicates = self.get_duplicates()
+        if not duplicates:
+            return ""
+        lines = [f"Повторяющиеся SQL-запросы в {view} (порог {self.threshold}):"]
+        for shape, count, caller in duplicates:
+            lines.append(f"{count} раз: {shape}\n    {caller}")
+        return "\n".join(lines)
+
+
+def track_query_shape(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL-запросов на всех соединениях с БД
+    (monitoring/signals.py): передает запрос счетчику текущего запроса.
+    """
+    tracker = current_tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+    return tracker(execute, sql, params, many, context)
@@ -0,0 +1,169 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import empty
+
+from monitoring.collector import RequestMetrics, current_metrics
+from monitoring.duplicates import (
+    DuplicateQueryError,
+    QueryShapeTracker,
+    current_tracker,
+)
+from monitoring.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_name(request):
+    resolver_match = getattr(request, "resolver_match", None)
+    return resolver_match.view_name if resolver_match else "unresolved"
+
+
+class RequestMetricsMiddleware:
+    """
+    Измеряет для каждого запроса количество и время SQL-запросов,
+    попадания, промахи и время обращений к кэшу и время отрисовки шаблонов.
+    Метрики добавляются к гистограммам контроллера (страница /metrics),
+    а сотрудникам отдаются в заголовке Server-Timing.
+    Должен стоять первым в MIDDLEWARE, чтобы учитывать всю обработку запроса.
+    Работает и в синхронном, и в асинхронном режиме, поэтому под ASGI
+    не добавляет перехода в поток синхронного кода.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Под ASGI синхронный метод вызывался бы в отдельном потоке.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics)
+
+    def record(self, request, response, metrics):
+        """
+        Добавляет метрики запроса к гистограммам контроллера,
+        а для сотрудников - заголовок Server-Timing.
+        """
+        registry.record(
+            get_view_name(request), request.method, response.status_code, metrics
+        )
+        if self.is_staff(request):
+            response["Server-Timing"] = metrics.get_server_timing()
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        """
+        Проверяет, что запрос выполнил сотрудник.
+        Пользователь не загружается ради заголовка: если контроллер
+        к нему не обращался, заголовок не добавляется.
+        """
+        user = getattr(request, "user", None)
+        if user is None or getattr(user, "_wrapped", None) is empty:
+            return False
+        return user.is_staff
+
+    def process_template_response(self, request, response):
+        return self.time_render(response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_render(response)
+
+    @staticmethod
+    def time_render(response):
+        """
+        Учитывает время отрисовки шаблона ответа.
+        """
+        metrics = current_metrics.get()
+        if metrics is None:
+            return response
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                metrics.template_time += time.perf_counter() - started
+
+        response.render = timed_render
+        return response
+
+
+class DuplicateQueryMiddleware:
+    """
+    Находит повторяющиеся SQL-запросы (N+1): запросы, отличающиеся только
+    значениями, считаются одним видом, и при превышении порога
+    DUPLICATE_QUERY_THRESHOLD в журнал пишется предупреждение с контроллером
+    и строкой кода, выполняющей запрос. При DUPLICATE_QUERY_RAISE
+    вместо предупреждения выбрасывается DuplicateQueryError.
+    Предназначен для разработки и тестового стенда: без порога отключается.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DUPLICATE_QUERY_THRESHOLD is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.DUPLICATE_QUERY_THRESHOLD
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tracker = QueryShapeTracker(self.threshold)
+        token = current_tracker.set(tracker)
+        try:
+            # Ответы с шаблоном отрисовываются до возврата в промежуточные
+            # слои, поэтому запросы из шаблонов тоже учитываются.
+            response = self.get_response(request)
+        finally:
+            current_tracker.reset(token)
+        return self.report(request, response, tracker)
+
+    async def __acall__(self, request):
+        tracker = QueryShapeTracker(self.threshold)
+        token = current_tracker.set(tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_tracker.reset(token)
+        return self.report(request, response, tracker)
+
+    def report(self, request, response, tracker):
+        """
+        Пишет в журнал или выбрасывает отчет о повторяющихся запросах.
+        """
+        report = tracker.get_report(f"{request.method} {get_view_name(request)}")
+        if report:
+            if settings.DUPLICATE_QUERY_RAISE:
+                raise DuplicateQueryError(report)
+            logger.warning(report)
+        return response
@@ -0,0 +1,162 @@
+import threading
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Счетчик Prometheus с метками.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        for labels, value in sorted(self.values.items()):
+            names = format_labels(zip(self.label_names, labels))
+            yield f"{self.name}{{{names}}} {format_value(value)}"
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с метками: накопленные счетчики по границам
+    интервалов, сумма и количество наблюдений.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, labels, value):
+        counts = self.values.get(labels)
+        if counts is None:
+            # Счетчики интервалов, затем сумма и количество наблюдений.
+            counts = self.values[labels] = [0] * len(self.buckets) + [0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def render(self):
+        for labels, counts in sorted(self.values.items()):
+            pairs = list(zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, counts):
+                names = format_labels([*pairs, ("le", format_value(float(bound)))])
+                yield f"{self.name}_bucket{{{names}}} {count}"
+            names = format_labels([*pairs, ("le", "+Inf")])
+            yield f"{self.name}_bucket{{{names}}} {counts[-1]}"
+            names = format_labels(pairs)
+            yield f"{self.name}_sum{{{names}}} {format_value(float(counts[-2]))}"
+            yield f"{self.name}_count{{{names}}} {counts[-1]}"
+
+
+class Registry:
+    """
+    Метрики запросов в памяти процесса.
+    Каждый процесс сервера хранит свои значения, а /metrics отдает значения
+    процесса, принявшего запрос, поэтому метрики рассчитаны на запуск
+    сервера одним процессом (uvicorn без --workers, gunicorn --workers 1
+    с потоками). Для нескольких процессов каждый из них нужно опрашивать
+    на отдельном порту.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            "http_requests_total", "Количество запросов", ("view", "method", "status")
+        )
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Время обработки запроса", ("view",)
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds", "Время SQL-запросов", ("view",)
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries",
+            "Количество SQL-запросов",
+            ("view",),
+            QUERIES_BUCKETS,
+        )
+        self.cache_duration = Histogram(
+            "http_request_cache_duration_seconds", "Время обращений к кэшу", ("view",)
+        )
+        self.cache_requests = Counter(
+            "http_request_cache_requests_total",
+            "Попадания и промахи кэша",
+            ("view", "result"),
+        )
+        self.template_duration = Histogram(
+            "http_request_template_duration_seconds",
+            "Время отрисовки шаблонов",
+            ("view",),
+        )
+        self.metrics = (
+            self.requests,
+            self.duration,
+            self.db_duration,
+            self.db_queries,
+            self.cache_duration,
+            self.cache_requests,
+            self.template_duration,
+        )
+
+    def record(self, view, method, status, metrics):
+        """
+        Добавляет метрики запроса к гистограммам контроллера.
+        """
+        labels = (view,)
+        with self.lock:
+            self.requests.inc((view, method, f"{status // 100}xx"))
+            self.duration.observe(labels, metrics.total_time)
+            self.db_duration.observe(labels, metrics.db_time)
+            self.db_queries.observe(labels, metrics.db_queries)
+            self.cache_duration.observe(labels, metrics.cache_time)
+            self.cache_requests.inc((view, "hit"), metrics.cache_hits)
+            self.cache_requests.inc((view, "miss"), metrics.cache_misses)
+            self.template_duration.observe(labels, metrics.template_time)
+
+    def render(self, gauges=None):
+        """
+        Возвращает метрики в текстовом формате Prometheus.
+        :param gauges: дополнительные метрики {имя: (описание, значение)}
+        """
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.render())
+        for name, (description, value) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,20 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from monitoring.collector import track_query
+from monitoring.duplicates import track_query_shape
+
+QUERY_WRAPPERS = (track_query, track_query_shape)
+
+
+@receiver(connection_created)
+def install_query_wrappers(sender, connection, **kwargs):
+    """
+    Устанавливает на соединение с БД обертки, учитывающие SQL-запросы
+    в метриках и поиске повторов текущего запроса. Запрос к контроллеру
+    определяется переменными контекста, поэтому учитываются и SQL-запросы
+    асинхронных контроллеров, выполненные в потоках sync_to_async.
+    """
+    for wrapper in QUERY_WRAPPERS:
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
@@ -0,0 +1,220 @@
+import re
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from benchmark.dataset import seed_dataset
+from catalog.models import Product, ProductVersion
+from monitoring.collector import RequestMetrics
+from monitoring.duplicates import (
+    DuplicateQueryError,
+    QueryShapeTracker,
+    normalize_sql,
+)
+from monitoring.middleware import DuplicateQueryMiddleware, RequestMetricsMiddleware
+from monitoring.registry import Registry, registry
+from tests.perf import DatasetMixin
+from users.models import User
+
+
+class ServerTimingTest(DatasetMixin, TestCase):
+    """
+    Заголовок Server-Timing для сотрудников.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create(email="staff@example.com", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_timing(self, response):
+        return dict(
+            re.findall(
+                r'(\w+);dur=[\d.]+(?:;desc="([^"]*)")?', response["Server-Timing"]
+            )
+        )
+
+    def test_staff_only(self):
+        url = reverse("catalog:home")
+        self.assertFalse(self.client.get(url).has_header("Server-Timing"))
+        self.client.force_login(self.users["owner"])
+        self.assertFalse(self.client.get(url).has_header("Server-Timing"))
+        self.client.force_login(self.staff)
+        self.assertTrue(self.client.get(url).has_header("Server-Timing"))
+
+    def test_queries_counted(self):
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(3) as queries:
+            response = self.client.get(reverse("catalog:categories"))
+        timing = self.get_timing(response)
+        self.assertEqual(timing["db"], f"SQL: {len(queries)}")
+        self.assertIn("template", timing)
+        self.assertIn("total", timing)
+
+    async def test_async_middleware(self):
+        async def view(request):
+            # Асинхронный ORM выполняет запрос в потоке sync_to_async.
+            await Product.objects.acount()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get("/")
+        request.user = self.staff
+        response = await middleware(request)
+        self.assertEqual(self.get_timing(response)["db"], "SQL: 1")
+
+    @mock.patch("catalog.services.CACHE_ENABLED", True)
+    def test_cache_hits_and_misses(self):
+        self.client.force_login(self.staff)
+        url = reverse("catalog:categories")
+        first = self.get_timing(self.client.get(url))["cache"]
+        second = self.get_timing(self.client.get(url))["cache"]
+        self.assertNotEqual(first, "hit: 0, miss: 0")
+        self.assertTrue(second.startswith("hit: "))
+        self.assertTrue(second.endswith("miss: 0"))
+
+
+@override_settings(METRICS_TOKEN="metrics-token")
+class MetricsTest(TestCase):
+    """
+    Страница метрик в формате Prometheus.
+    """
+
+    def test_view_histograms(self):
+        url = reverse("catalog:contacts")
+        self.client.get(url)
+        self.client.get(url)
+        content = self.client.get(
+            reverse("metrics"), headers={"Authorization": "Bearer metrics-token"}
+        ).content.decode()
+        count = re.search(
+            r'http_request_duration_seconds_count\{view="catalog:contacts"\} (\d+)',
+            content,
+        )
+        self.assertGreaterEqual(int(count.group(1)), 2)
+        self.assertIn(
+            'http_requests_total{view="catalog:contacts",method="GET"', content
+        )
+        self.assertIn("outbox_pending_emails 0", content)
+
+    def test_access(self):
+        url = reverse("metrics")
+        # Адрес клиента не дает доступа: за прокси у всех запросов он локальный.
+        self.assertEqual(self.client.get(url, REMOTE_ADDR="127.0.0.1").status_code, 403)
+        response = self.client.get(url, headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            url, headers={"Authorization": "Bearer metrics-token"}
+        )
+        self.assertEqual(response.status_code, 200)
+        with override_settings(METRICS_TOKEN=None):
+            response = self.client.get(url, headers={"Authorization": "Bearer "})
+            self.assertEqual(response.status_code, 403)
+        staff = User.objects.create(email="staff@example.com", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_registry_render(self):
+        metrics_registry = Registry()
+        metrics = RequestMetrics()
+        metrics.db_queries = 3
+        metrics_registry.record('a"b', "GET", 200, metrics)
+        content = metrics_registry.render({"queue": ("Очередь", 5)})
+        self.assertIn(
+            'http_request_db_queries_bucket{view="a\\"b",le="2.0"} 0', content
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{view="a\\"b",le="5.0"} 1', content
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{view="a\\"b",le="+Inf"} 1', content
+        )
+        self.assertIn(
+            'http_requests_total{view="a\\"b",method="GET",status="2xx"} 1', content
+        )
+        self.assertIn("queue 5", content)
+        self.assertIsNot(metrics_registry, registry)
+
+
+def load_versions_per_product(request):
+    """
+    Контроллер с N+1: версии загружаются отдельно для каждого продукта.
+    """
+    for product in Product.objects.all()[:5]:
+        list(ProductVersion.objects.filter(product=product))
+    return HttpResponse()
+
+
+class DuplicateQueryTest(TestCase):
+    """
+    Поиск повторяющихся SQL-запросов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(categories=1, products=5, versions=1, posts=0)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql(
+                'SELECT "t1"."id" FROM "t1" WHERE ("t1"."id" IN (%s, %s, %s) '
+                'AND "t1"."name" = \'it\'\'s\'  AND "t1"."price" > 10.5) LIMIT 21'
+            ),
+            'SELECT "t1"."id" FROM "t1" WHERE ("t1"."id" IN (...) '
+            'AND "t1"."name" = ? AND "t1"."price" > ?) LIMIT ?',
+        )
+        self.assertEqual(
+            normalize_sql('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (...)',
+        )
+
+    def test_tracker_reports_view_and_line(self):
+        tracker = QueryShapeTracker(threshold=2)
+        with connection.execute_wrapper(tracker):
+            for product in Product.objects.all()[:3]:
+                list(product.productversion_set.all())
+        report = tracker.get_report("versions")
+        self.assertIn("versions", report)
+        self.assertIn("3 раз", report)
+        self.assertIn('FROM "catalog_productversion"', report)
+        self.assertIn("monitoring/tests.py", report)
+        self.assertIn("list(product.productversion_set.all())", report)
+
+    @override_settings(DUPLICATE_QUERY_THRESHOLD=2, DUPLICATE_QUERY_RAISE=False)
+    def test_middleware_warns(self):
+        middleware = DuplicateQueryMiddleware(load_versions_per_product)
+        with self.assertLogs("monitoring.middleware", "WARNING") as logs:
+            middleware(RequestFactory().get("/"))
+        self.assertIn("5 раз", logs.output[0])
+        self.assertIn("in load_versions_per_product", logs.output[0])
+
+    @override_settings(DUPLICATE_QUERY_THRESHOLD=5, DUPLICATE_QUERY_RAISE=True)
+    def test_middleware_threshold_and_raise(self):
+        middleware = DuplicateQueryMiddleware(load_versions_per_product)
+        with self.assertNoLogs("monitoring.middleware"):
+            middleware(RequestFactory().get("/"))
+        with override_settings(DUPLICATE_QUERY_THRESHOLD=4):
+            middleware = DuplicateQueryMiddleware(load_versions_per_product)
+            with self.assertRaises(DuplicateQueryError):
+                middleware(RequestFactory().get("/"))
+
+    @override_settings(DUPLICATE_QUERY_THRESHOLD=2, DUPLICATE_QUERY_RAISE=False)
+    async def test_async_middleware(self):
+        async def view(request):
+            return await sync_to_async(load_versions_per_product)(request)
+
+        middleware = DuplicateQueryMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs("monitoring.middleware", "WARNING") as logs:
+            await middleware(RequestFactory().get("/"))
+        self.assertIn("5 раз", logs.output[0])
+        self.assertIn("in load_versions_per_product", logs.output[0])
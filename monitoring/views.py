@@ -0,0 +1,47 @@
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from mailing.services import get_outbox_metrics
+from monitoring.registry import registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def has_metrics_token(request):
+    """
+    Проверяет заголовок Authorization: Bearer <METRICS_TOKEN>.
+    Без настройки METRICS_TOKEN доступ по токену выключен.
+    """
+    if not settings.METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    )
+
+
+def metrics(request):
+    """
+    Отдает метрики запросов процесса и состояние очереди писем
+    в текстовом формате Prometheus.
+    Доступно сотрудникам и по токену METRICS_TOKEN.
+    """
+    if not has_metrics_token(request) and not request.user.is_staff:
+        raise PermissionDenied
+    outbox = get_outbox_metrics()
+    gauges = {
+        "outbox_pending_emails": ("Письма в очереди", outbox["pending"]),
+        "outbox_failed_emails": ("Неотправленные письма", outbox["failed"]),
+        "outbox_oldest_pending_age_seconds": (
+            "Возраст самого старого письма в очереди",
+            outbox["oldest_pending_age"],
+        ),
+        "outbox_delivery_latency_seconds": (
+            "Средняя задержка доставки за последний час",
+            outbox["delivery_latency"],
+        ),
+    }
+    return HttpResponse(registry.render(gauges), content_type=CONTENT_TYPE)
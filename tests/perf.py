@@ -0,0 +1,171 @@
+"""
+Общие инструменты тестов контроллеров: наполненная БД с пользователями
+разных ролей, проверка бюджета SQL-запросов, поиск повторяющихся
+запросов (N+1) и запись базовых значений времени ответа.
+
+Базовые значения времени записываются в JSON-файл, если задана переменная
+окружения PERF_BASELINE_FILE. Если дополнительно задана PERF_MAX_SLOWDOWN
+(например, 1.5), время ответа сравнивается с ранее записанным значением.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from benchmark.dataset import seed_dataset
+from catalog.services import get_contacts_from_cache, invalidate_contacts_cache
+from monitoring.duplicates import QueryShapeTracker
+
+TIMING_REPEATS = 3
+# Допустимое количество SQL-запросов одного вида за запрос к контроллеру.
+DUPLICATE_QUERIES_THRESHOLD = 2
+
+
+class DatasetMixin:
+    """
+    Миксин для TestCase: наполняет БД общим набором данных
+    (benchmark/dataset.py) и выполняет запросы от имени ролей
+    anonymous, owner и moderator.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_dataset()
+
+    def login_as(self, role):
+        """
+        Авторизует тестовый клиент пользователем указанной роли.
+        """
+        self.client.logout()
+        user = self.users[role]
+        if user is not None:
+            self.client.force_login(user)
+
+    async def arequest_view(self, view_class, path, role="anonymous", headers=None):
+        """
+        Выполняет GET-запрос к асинхронному контроллеру от имени роли
+        и отрисовывает ответ, как это делает ASGI-обработчик.
+        """
+        request = AsyncRequestFactory().get(path, headers=headers)
+        request.user = self.users[role] or AnonymousUser()
+        request.resolver_match = resolve(request.path)
+        response = await view_class.as_view()(request, **request.resolver_match.kwargs)
+        if hasattr(response, "render"):
+            await sync_to_async(response.render)()
+        return response
+
+
+class CacheEnabledMixin(DatasetMixin):
+    """
+    Миксин для TestCase: включает кэширование сервисов (CACHE_ENABLED)
+    на время каждого теста и начинает тест с пустым кэшем.
+    """
+
+    cached_services = ("catalog.services", "blog.services", "users.services")
+
+    def setUp(self):
+        super().setUp()
+        for module in self.cached_services:
+            patcher = mock.patch(f"{module}.CACHE_ENABLED", True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache.clear()
+
+
+class ViewPerformanceMixin(DatasetMixin):
+    """
+    Миксин для TestCase: проверяет количество SQL-запросов контроллера
+    и записывает время ответа.
+    """
+
+    timings = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.timings = {}
+        super().setUpClass()
+
+    def assertViewWithinBudget(self, url, role, budget, method="get", status=200):
+        """
+        Выполняет запрос к контроллеру от имени роли на холодном кэше
+        и проверяет, что количество SQL-запросов не превышает бюджет.
+        Контакты организации нужны на всех страницах и загружаются заранее,
+        как после первого запроса к процессу.
+        Время ответа - минимум из нескольких повторов.
+        """
+        cache.clear()
+        invalidate_contacts_cache()
+        get_contacts_from_cache()
+        self.login_as(role)
+        request = getattr(self.client, method)
+        with self.assertNoDuplicateQueries(f"{role} {url}"):
+            with CaptureQueriesContext(connection) as queries:
+                response = request(url)
+        # Журнал запросов очищается в начале каждого запроса, поэтому
+        # количество фиксируется до повторных замеров времени.
+        queries_count = len(queries)
+        self.assertEqual(response.status_code, status, f"{role} {url}")
+        self.assertLessEqual(
+            queries_count,
+            budget,
+            f"{role} {url}: {queries_count} запросов при бюджете {budget}\n"
+            + "\n".join(query["sql"] for query in queries),
+        )
+
+        elapsed = []
+        for _ in range(TIMING_REPEATS):
+            start = time.perf_counter()
+            request(url)
+            elapsed.append(time.perf_counter() - start)
+        self.timings[f"{method.upper()} {url} [{role}]"] = {
+            "queries": queries_count,
+            "seconds": min(elapsed),
+        }
+        return response
+
+    @contextmanager
+    def assertNoDuplicateQueries(self, view, threshold=DUPLICATE_QUERIES_THRESHOLD):
+        """
+        Проверяет, что внутри блока запросы одного вида (N+1)
+        выполняются не больше threshold раз.
+        """
+        tracker = QueryShapeTracker(threshold)
+        with connection.execute_wrapper(tracker):
+            yield tracker
+        report = tracker.get_report(view)
+        if report:
+            self.fail(report)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        path = os.getenv("PERF_BASELINE_FILE")
+        if not path or not cls.timings:
+            return
+        baseline = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                baseline = json.load(file)
+        max_slowdown = os.getenv("PERF_MAX_SLOWDOWN")
+        if max_slowdown:
+            slow = [
+                f"{key}: {value['seconds']:.4f}s > {baseline[key]['seconds']:.4f}s"
+                for key, value in cls.timings.items()
+                if key in baseline
+                and value["seconds"] > baseline[key]["seconds"] * float(max_slowdown)
+            ]
+            if slow:
+                raise AssertionError("Замедление контроллеров:\n" + "\n".join(slow))
+        baseline.update(cls.timings)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, ensure_ascii=False, indent=2, sort_keys=True)
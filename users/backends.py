@@ -0,0 +1,15 @@
+from functools import partial
+
+from django.contrib.auth.backends import ModelBackend
+
+from users.services import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Бэкенд аутентификации, который загружает пользователя запроса
+    вместе с его правами из общего кэша, а не из БД.
+    """
+
+    def get_user(self, user_id):
+        return get_cached_user(user_id, partial(super().get_user, user_id))
@@ -1,4 +1,4 @@
-from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from django.contrib.auth.forms import SetPasswordForm, UserCreationForm, UserChangeForm
 from django import forms
 
 from catalog.forms import StyleFormMixin
@@ -28,3 +28,9 @@ class UserProfileForm(StyleFormMixin, UserChangeForm):
         super().__init__(*args, **kwargs)
 
         self.fields["password"].widget = forms.HiddenInput()
+
+
+class UserSetPasswordForm(StyleFormMixin, SetPasswordForm):
+    """
+    Форма задания нового пароля по ссылке восстановления.
+    """
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_new_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VerificationToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(max_length=64, unique=True, verbose_name="Токен"),
+                ),
+                (
+                    "purpose",
+                    models.CharField(
+                        choices=[
+                            ("register", "Подтверждение регистрации"),
+                            ("change_email", "Подтверждение изменения почты"),
+                        ],
+                        max_length=20,
+                        verbose_name="Назначение",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                ("expires_at", models.DateTimeField(verbose_name="Действует до")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="verification_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Токен подтверждения",
+                "verbose_name_plural": "Токены подтверждения",
+                "indexes": [
+                    models.Index(fields=["expires_at"], name="token_expires_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# Срок действия перенесенных токенов: по сроку новых токенов регистрации.
+MOVED_TOKEN_LIFETIME = timedelta(days=3)
+
+
+def move_user_tokens(apps, schema_editor):
+    """
+    Переносит неиспользованные токены пользователей в таблицу токенов.
+    Токен регистрации действует, пока аккаунт не активирован.
+    """
+    User = apps.get_model("users", "User")
+    VerificationToken = apps.get_model("users", "VerificationToken")
+    expires_at = timezone.now() + MOVED_TOKEN_LIFETIME
+    tokens = {}
+    users = User.objects.exclude(token__isnull=True, new_token__isnull=True)
+    for pk, is_active, token, new_token in users.values_list(
+        "pk", "is_active", "token", "new_token"
+    ):
+        if new_token:
+            tokens[new_token] = (pk, "change_email")
+        elif token and not is_active:
+            tokens[token] = (pk, "register")
+    VerificationToken.objects.bulk_create(
+        (
+            VerificationToken(
+                user_id=pk, token=token, purpose=purpose, expires_at=expires_at
+            )
+            for token, (pk, purpose) in tokens.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_verificationtoken"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_user_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="user",
+            name="token",
+        ),
+        migrations.RemoveField(
+            model_name="user",
+            name="new_token",
+        ),
+    ]
@@ -0,0 +1,16 @@
+from users.services import aget_request_user
+
+
+class AsyncUserMixin:
+    """
+    Примесь асинхронного контроллера: до обработки запроса загружает
+    пользователя и его права, чтобы проверки прав в контроллере
+    не обращались к синхронному ORM из цикла событий.
+    """
+
+    # Контроллерам, которые не проверяют права, достаточно пользователя.
+    load_permissions = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        await aget_request_user(request, self.load_permissions)
+        return await super().dispatch(request, *args, **kwargs)
@@ -15,13 +15,11 @@ class User(AbstractUser):
     phone = models.CharField(max_length=20, verbose_name="Номер телефона", **NULLABLE)
     avatar = models.ImageField(upload_to="users/", verbose_name="Аватар", **NULLABLE)
     country = models.CharField(max_length=50, verbose_name="Страна", **NULLABLE)
-    token = models.CharField(max_length=100, verbose_name="Token", **NULLABLE)
     new_email = models.EmailField(
         verbose_name="Email",
         **NULLABLE,
-        help_text="Для подтверждения изменения необходимо пройти по ссылке, направленной на email"
+        help_text="Для подтверждения изменения необходимо пройти по ссылке, направленной на email",
     )
-    new_token = models.CharField(max_length=100, **NULLABLE)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -32,3 +30,40 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+
+
+class VerificationToken(models.Model):
+    """
+    Модель одноразового токена из ссылки в письме: подтверждение
+    регистрации, изменения адреса электронной почты или восстановление пароля.
+    """
+
+    REGISTER = "register"
+    CHANGE_EMAIL = "change_email"
+    PURPOSE_CHOICES = (
+        (REGISTER, "Подтверждение регистрации"),
+        (CHANGE_EMAIL, "Подтверждение изменения почты"),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="verification_tokens",
+        verbose_name="Пользователь",
+    )
+    token = models.CharField(max_length=64, unique=True, verbose_name="Токен")
+    purpose = models.CharField(
+        max_length=20, choices=PURPOSE_CHOICES, verbose_name="Назначение"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    expires_at = models.DateTimeField(verbose_name="Действует до")
+
+    def __str__(self):
+        return f"{self.user} ({self.get_purpose_display()})"
+
+    class Meta:
+        verbose_name = "Токен подтверждения"
+        verbose_name_plural = "Токены подтверждения"
+        indexes = [
+            models.Index(fields=["expires_at"], name="token_expires_idx"),
+        ]
@@ -1,12 +1,152 @@
 import secrets
-import string
+import time
+from datetime import timedelta
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
 
-def generate_password():
+from config.settings import CACHE_ENABLED
+from users.models import User, VerificationToken
+
+AUTH_VERSION_KEY = "auth_version"
+USER_CACHE_TIMEOUT = 60 * 60
+# Срок действия токенов из писем по их назначению.
+TOKEN_LIFETIMES = {
+    VerificationToken.REGISTER: timedelta(days=3),
+    VerificationToken.CHANGE_EMAIL: timedelta(days=1),
+}
+CLEANUP_BATCH_SIZE = 500
+
+
+def create_verification_token(user, purpose):
+    """
+    Создает одноразовый токен пользователя для ссылки в письме.
+    Ранее выданные токены того же назначения перестают действовать.
+    :return: строка токена
+    """
+    VerificationToken.objects.filter(user=user, purpose=purpose).delete()
+    verification = VerificationToken.objects.create(
+        user=user,
+        purpose=purpose,
+        token=secrets.token_urlsafe(32),
+        expires_at=timezone.now() + TOKEN_LIFETIMES[purpose],
+    )
+    return verification.token
+
+
+def get_valid_tokens(purpose):
+    """
+    Возвращает действующие токены назначения purpose вместе с пользователями.
+    """
+    return VerificationToken.objects.select_related("user").filter(
+        purpose=purpose, expires_at__gt=timezone.now()
+    )
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Удаляет объекты queryset порциями по batch_size, чтобы не блокировать
+    таблицу надолго.
+    :return: количество удаленных объектов
+    """
+    deleted = 0
+    while pks := list(queryset.values_list("pk", flat=True)[:batch_size]):
+        queryset.model.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+    return deleted
+
+
+def delete_expired_verifications(batch_size=CLEANUP_BATCH_SIZE):
+    """
+    Удаляет порциями аккаунты, которые не были активированы до истечения
+    срока токена регистрации, и просроченные токены.
+    Аккаунты без токена регистрации (например, отключенные администратором)
+    и с просроченным токеном смены почты не удаляются.
+    Запускается периодически (настройка CRONJOBS).
+    :return: количество удаленных токенов и пользователей
+    """
+    now = timezone.now()
+    users = User.objects.filter(
+        is_active=False,
+        last_login__isnull=True,
+        verification_tokens__purpose=VerificationToken.REGISTER,
+        verification_tokens__expires_at__lte=now,
+    )
+    users_deleted = delete_in_batches(users, batch_size)
+    tokens_deleted = delete_in_batches(
+        VerificationToken.objects.filter(expires_at__lte=now), batch_size
+    )
+    return tokens_deleted, users_deleted
+
+
+def load_request_user(request, with_permissions=True):
+    """
+    Загружает пользователя запроса из сессии, при необходимости - вместе с его правами.
+    """
+    user = request.user
+    if with_permissions and user.is_authenticated:
+        user.get_all_permissions()
+    return user
+
+
+async def aget_request_user(request, with_permissions=True):
+    """
+    Асинхронно загружает пользователя запроса и его права.
+    Сессия и права читаются синхронным ORM, поэтому загрузка выполняется
+    в потоке; после нее проверки прав в асинхронном коде не обращаются к БД.
+    """
+    return await sync_to_async(load_request_user)(request, with_permissions)
+
+
+def get_user_cache_key(pk):
+    return f"auth_user:{pk}"
+
+
+def get_cached_user(pk, load):
+    """
+    Возвращает пользователя вместе с его правами из кэша.
+    Если кэш пуст или устарел, пользователь загружается функцией load,
+    его права вычисляются и сохраняются вместе с ним, поэтому проверки
+    прав (has_perm) не обращаются к БД.
+    Закэшированный пользователь действителен, пока не изменилась версия
+    прав (изменение групп и прав) и пока он сам не изменен.
+    """
+    if not CACHE_ENABLED:
+        return load()
+    key = get_user_cache_key(pk)
+    # Версия прав и пользователь читаются из кэша за одно обращение.
+    cached = cache.get_many([AUTH_VERSION_KEY, key])
+    version = cached.get(AUTH_VERSION_KEY)
+    if version is None:
+        # Начальное значение от времени, чтобы после вытеснения ключа
+        # не совпасть с версией уже закэшированных пользователей.
+        version = time.time_ns()
+        if not cache.add(AUTH_VERSION_KEY, version, None):
+            version = cache.get(AUTH_VERSION_KEY, version)
+    if key in cached and cached[key][0] == version:
+        return cached[key][1]
+    user = load()
+    if user is not None:
+        user.get_all_permissions()
+        cache.set(key, (version, user), USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user_cache(pk):
+    """
+    Удаляет пользователя из кэша после его изменения.
+    """
+    if CACHE_ENABLED:
+        cache.delete(get_user_cache_key(pk))
+
+
+def bump_auth_version():
     """
-    Генерирует случайный пароль из 10 символов,
-    который может содержать прописные и заглавные буквы, цифры и спецсимволы.
+    Меняет версию прав после изменения групп, прав или их связей
+    с пользователями: все закэшированные пользователи становятся недействительны.
     """
-    password_characters = string.ascii_letters + string.digits + string.punctuation
-    password = "".join(secrets.choice(password_characters) for _ in range(10))
-    return password
+    if not CACHE_ENABLED:
+        return
+    # Версия - время изменения в наносекундах, как и версия каталога.
+    cache.set(AUTH_VERSION_KEY, time.time_ns(), None)
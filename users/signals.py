@@ -0,0 +1,42 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from users.services import bump_auth_version, invalidate_user_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Удаляет измененного пользователя из кэша.
+    Кэш сбрасывается после фиксации транзакции, иначе параллельный запрос
+    успеет закэшировать старые данные.
+    """
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_user_cache(pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def permissions_changed(sender, **kwargs):
+    """
+    Меняет версию прав при изменении групп и прав,
+    в том числе при загрузке групп из фикстуры (loaddata).
+    """
+    transaction.on_commit(bump_auth_version)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def permission_links_changed(sender, action, **kwargs):
+    """
+    Меняет версию прав при изменении прав групп, групп и прав пользователей.
+    """
+    if action.startswith("post_"):
+        transaction.on_commit(bump_auth_version)
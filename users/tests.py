@@ -1 +1,293 @@
+import os
+import re
+import tempfile
+from datetime import timedelta
 
+from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.tokens import default_token_generator
+from django.core import serializers
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from benchmark.dataset import create_user
+from mailing.models import OutgoingEmail
+from tests.perf import CacheEnabledMixin, ViewPerformanceMixin
+from users.backends import CachedModelBackend
+from users.models import User, VerificationToken
+from users.services import create_verification_token, delete_expired_verifications
+
+
+class UsersViewsPerformanceTest(ViewPerformanceMixin, TestCase):
+    """
+    Бюджет SQL-запросов и время ответа контроллеров пользователей.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Неактивные пользователи с токенами из писем подтверждения
+        # регистрации и смены email.
+        expires_at = timezone.now() + timedelta(days=1)
+        VerificationToken.objects.create(
+            user=create_user("new@example.com", is_active=False),
+            token="register-token",
+            purpose=VerificationToken.REGISTER,
+            expires_at=expires_at,
+        )
+        VerificationToken.objects.create(
+            user=create_user(
+                "old@example.com", new_email="changed@example.com", is_active=False
+            ),
+            token="change-token",
+            purpose=VerificationToken.CHANGE_EMAIL,
+            expires_at=expires_at,
+        )
+        # Пользователь со ссылкой из письма восстановления пароля.
+        user = create_user("reset@example.com")
+        cls.reset_args = [
+            urlsafe_base64_encode(force_bytes(user.pk)),
+            default_token_generator.make_token(user),
+        ]
+
+    def test_login(self):
+        url = reverse("users:login")
+        self.assertViewWithinBudget(url, "anonymous", 0)
+        self.assertViewWithinBudget(url, "owner", 2)
+        self.assertViewWithinBudget(url, "moderator", 2)
+
+    def test_logout(self):
+        url = reverse("users:logout")
+        self.assertViewWithinBudget(url, "anonymous", 0, status=302)
+        self.assertViewWithinBudget(url, "owner", 4, status=302)
+        self.assertViewWithinBudget(url, "moderator", 4, status=302)
+
+    def test_register(self):
+        url = reverse("users:register")
+        self.assertViewWithinBudget(url, "anonymous", 0)
+        self.assertViewWithinBudget(url, "owner", 2)
+        self.assertViewWithinBudget(url, "moderator", 2)
+
+    def test_email_confirm(self):
+        url = reverse("users:email_confirm", args=["register-token"])
+        # Поиск по токену, изменение пользователя и удаление использованного токена.
+        self.assertViewWithinBudget(url, "anonymous", 3, status=302)
+
+    def test_reset_password(self):
+        url = reverse("users:reset_password")
+        self.assertViewWithinBudget(url, "anonymous", 0)
+        self.assertViewWithinBudget(url, "owner", 2)
+        self.assertViewWithinBudget(url, "moderator", 2)
+
+    def test_reset_password_confirm(self):
+        url = reverse("users:reset_password_confirm", args=self.reset_args)
+        # Поиск пользователя по ссылке и сохранение токена в сессии
+        # перед перенаправлением на форму без токена в адресе.
+        self.assertViewWithinBudget(url, "anonymous", 5, status=302)
+        self.assertViewWithinBudget(url, "owner", 5, status=302)
+        self.assertViewWithinBudget(url, "moderator", 5, status=302)
+
+    def test_profile(self):
+        url = reverse("users:profile")
+        self.assertViewWithinBudget(url, "owner", 2)
+        self.assertViewWithinBudget(url, "moderator", 2)
+
+    def test_change_email(self):
+        url = reverse("users:change_email", args=["change-token"])
+        # Поиск по токену, изменение пользователя и удаление использованного токена.
+        self.assertViewWithinBudget(url, "anonymous", 3, status=302)
+
+
+class UserCacheTest(CacheEnabledMixin, TestCase):
+    """
+    Кэширование пользователя запроса и его прав.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.backend = CachedModelBackend()
+        self.moderator = self.users["moderator"]
+
+    def get_user(self):
+        return self.backend.get_user(self.moderator.pk)
+
+    def test_permissions_without_queries(self):
+        self.get_user()
+        with self.assertNumQueries(0):
+            user = self.get_user()
+            self.assertTrue(user.has_perm("catalog.cancel_publication"))
+            self.assertTrue(user.has_perm("blog.change_post"))
+            self.assertFalse(user.has_perm("catalog.delete_product"))
+
+    def test_hot_page_loads_only_session(self):
+        self.login_as("moderator")
+        url = reverse("catalog:home")
+        self.client.get(url)
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIn('FROM "django_session"', queries[0]["sql"])
+
+    def test_session_of_previous_backend(self):
+        # Сессии, созданные до перехода на кэширующий бэкенд, действуют.
+        self.client.force_login(
+            self.moderator, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        response = self.client.get(reverse("users:profile"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user"], self.moderator)
+        # Новый вход выполняется через кэширующий бэкенд.
+        self.client.logout()
+        self.client.force_login(self.moderator)
+        self.assertEqual(
+            self.client.session["_auth_user_backend"],
+            "users.backends.CachedModelBackend",
+        )
+
+    def test_user_change(self):
+        self.get_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.moderator.is_active = False
+            self.moderator.save()
+        self.assertIsNone(self.get_user())
+
+    def test_group_change(self):
+        self.get_user()
+        group = Group.objects.get(name="moderator")
+        with self.captureOnCommitCallbacks(execute=True):
+            group.permissions.remove(
+                Permission.objects.get(codename="cancel_publication")
+            )
+        self.assertFalse(self.get_user().has_perm("catalog.cancel_publication"))
+
+    def test_membership_change(self):
+        self.get_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.moderator.groups.clear()
+        self.assertFalse(self.get_user().has_perm("blog.change_post"))
+
+    def test_fixture_load(self):
+        group = Group.objects.get(name="moderator")
+        data = serializers.serialize("json", [group])
+        with self.captureOnCommitCallbacks(execute=True):
+            group.permissions.clear()
+        self.assertFalse(self.get_user().has_perm("catalog.cancel_publication"))
+        # Права, восстановленные из фикстуры, видны без ожидания срока кэша.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "groups.json")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(data)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("loaddata", path, verbosity=0)
+        self.assertTrue(self.get_user().has_perm("catalog.cancel_publication"))
+
+
+class VerificationTokenTest(TestCase):
+    """
+    Токены подтверждения из писем и очистка просроченных токенов.
+    """
+
+    def test_register_and_confirm(self):
+        response = self.client.post(
+            reverse("users:register"),
+            {
+                "email": "user@example.com",
+                "password1": "Secret-password-1",
+                "password2": "Secret-password-1",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        verification = VerificationToken.objects.get(user__email="user@example.com")
+        self.assertEqual(verification.purpose, VerificationToken.REGISTER)
+        self.assertIn(verification.token, OutgoingEmail.objects.get().message)
+
+        url = reverse("users:email_confirm", args=[verification.token])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertTrue(User.objects.get(email="user@example.com").is_active)
+        # Токен одноразовый.
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_purpose_and_expiry(self):
+        user = User.objects.create(email="user@example.com", is_active=False)
+        token = create_verification_token(user, VerificationToken.REGISTER)
+        url = reverse("users:change_email", args=[token])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        VerificationToken.objects.update(expires_at=timezone.now())
+        url = reverse("users:email_confirm", args=[token])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_new_token_replaces_old(self):
+        user = User.objects.create(email="user@example.com")
+        old = create_verification_token(user, VerificationToken.CHANGE_EMAIL)
+        new = create_verification_token(user, VerificationToken.CHANGE_EMAIL)
+        self.assertEqual(
+            list(VerificationToken.objects.values_list("token", flat=True)), [new]
+        )
+        self.assertNotEqual(old, new)
+
+    def test_reset_password_link(self):
+        user = User.objects.create(email="user@example.com", is_active=True)
+        user.set_password("Old-password-1")
+        user.save()
+        self.client.post(reverse("users:reset_password"), {"email": user.email})
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("Old-password-1"))
+        message = OutgoingEmail.objects.get().message
+        url = re.search(r"http://testserver(\S+/)", message).group(1)
+
+        response = self.client.get(url, follow=True)
+        self.assertTrue(response.context["validlink"])
+        password = "New-password-1"
+        self.client.post(
+            response.redirect_chain[-1][0],
+            {"new_password1": password, "new_password2": password},
+        )
+        user.refresh_from_db()
+        self.assertTrue(user.check_password(password))
+        # Ссылка одноразовая.
+        self.client.logout()
+        response = self.client.get(url, follow=True)
+        self.assertFalse(response.context["validlink"])
+
+    def test_cleanup(self):
+        now = timezone.now()
+        old = now - timedelta(days=30)
+        stale = User.objects.create(email="stale@example.com", is_active=False)
+        pending = User.objects.create(email="pending@example.com", is_active=False)
+        changing = User.objects.create(
+            email="changing@example.com", is_active=False, last_login=old
+        )
+        active = User.objects.create(email="active@example.com", is_active=True)
+        # Отключен администратором до первого входа: токена регистрации нет.
+        User.objects.create(email="disabled@example.com", is_active=False)
+        new_email = User.objects.create(email="new-email@example.com", is_active=False)
+        User.objects.update(date_joined=old)
+        for user, expires_at, purpose in (
+            (stale, now, VerificationToken.REGISTER),
+            (pending, now + timedelta(days=1), VerificationToken.REGISTER),
+            (changing, now, VerificationToken.REGISTER),
+            (active, now, VerificationToken.REGISTER),
+            (new_email, now, VerificationToken.CHANGE_EMAIL),
+        ):
+            VerificationToken.objects.create(
+                user=user, token=user.email, purpose=purpose, expires_at=expires_at
+            )
+
+        # Токен stale удаляется вместе с пользователем.
+        self.assertEqual(delete_expired_verifications(batch_size=1), (3, 1))
+        self.assertQuerySetEqual(
+            User.objects.order_by("email").values_list("email", flat=True),
+            [
+                "active@example.com",
+                "changing@example.com",
+                "disabled@example.com",
+                "new-email@example.com",
+                "pending@example.com",
+            ],
+        )
+        self.assertQuerySetEqual(
+            VerificationToken.objects.values_list("token", flat=True),
+            ["pending@example.com"],
+        )
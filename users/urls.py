@@ -6,6 +6,7 @@ from users.views import (
     UserCreateView,
     email_verification,
     reset_password,
+    ResetPasswordConfirmView,
     ProfileView,
     change_email,
 )
@@ -18,6 +19,11 @@ urlpatterns = [
     path("register/", UserCreateView.as_view(), name="register"),
     path("email_confirm/<str:token>/", email_verification, name="email_confirm"),
     path("reset_password/", reset_password, name="reset_password"),
+    path(
+        "reset_password/<uidb64>/<token>/",
+        ResetPasswordConfirmView.as_view(),
+        name="reset_password_confirm",
+    ),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("change_email/<str:token>/", change_email, name="change_email"),
 ]
@@ -1,14 +1,21 @@
-import secrets
-
-from django.core.mail import send_mail
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.auth.views import PasswordResetConfirmView
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 from django.views.generic import CreateView, UpdateView
 
 from config.settings import EMAIL_HOST_USER
-from users.forms import UserRegisterForm, UserProfileForm
-from users.models import User
-from users.services import generate_password
+from mailing.services import enqueue_mail
+from users.forms import UserProfileForm, UserRegisterForm, UserSetPasswordForm
+from users.models import User, VerificationToken
+from users.services import (
+    create_verification_token,
+    get_valid_tokens,
+)
 
 
 class UserCreateView(CreateView):
@@ -20,20 +27,20 @@ class UserCreateView(CreateView):
     form_class = UserRegisterForm
     success_url = reverse_lazy("users:login")
 
+    @transaction.atomic
     def form_valid(self, form):
         """
         Сохраняет нового пользователя и генерирует токен подтверждения.
-        Отправляет письмо с ссылкой подтверждения на адрес электронной почты.
+        Ставит в очередь письмо с ссылкой подтверждения на адрес электронной почты.
         """
         user = form.save()
         user.is_active = False
-        token = secrets.token_hex(16)
-        user.token = token
         user.new_email = user.email
-        user.save(update_fields=["token", "is_active"])
+        user.save(update_fields=["is_active"])
+        token = create_verification_token(user, VerificationToken.REGISTER)
         host = self.request.get_host()
         url = f"http://{host}/users/email_confirm/{token}/"
-        send_mail(
+        enqueue_mail(
             subject="Подтверждение почты",
             message=f"Здравствуйте. Для подтверждения адреса электронной почты, пожалуйста, перейдите по ссылке {url}. "
             f"Служба поддержки Naomitex.",
@@ -47,25 +54,36 @@ def email_verification(request, token):
     """
     Контроллер подтверждения адреса электронной почты.
     """
-    user = get_object_or_404(User, token=token)
+    verification = get_object_or_404(
+        get_valid_tokens(VerificationToken.REGISTER), token=token
+    )
+    user = verification.user
     user.is_active = True
-    user.save()
+    user.save(update_fields=["is_active"])
+    verification.delete()
     return redirect(reverse("users:login"))
 
 
 def reset_password(request):
     """
     Контроллер восстановления пароля.
+    Направляет на электронную почту одноразовую ссылку для задания
+    нового пароля: сам пароль не передается в письме и не хранится
+    в очереди писем.
     """
     if request.method == "POST":
         email = request.POST.get("email")
         user = get_object_or_404(User, email=email)
-        password = generate_password()
-        user.set_password(password)
-        user.save(update_fields=["token", "is_active"])
-        send_mail(
+        uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+        host = request.get_host()
+        path = reverse("users:reset_password_confirm", args=[uidb64, token])
+        url = f"http://{host}{path}"
+        hours = settings.PASSWORD_RESET_TIMEOUT // 3600
+        enqueue_mail(
             subject="Восстановление пароля",
-            message=f"Здравствуйте! Ваш пароль для доступа изменен: {password}. Служба поддержки Naomitex.",
+            message=f"Здравствуйте! Для задания нового пароля перейдите по ссылке {url}. "
+            f"Ссылка действует {hours} ч. Служба поддержки Naomitex.",
             from_email=EMAIL_HOST_USER,
             recipient_list=[user.email],
         )
@@ -73,6 +91,17 @@ def reset_password(request):
     return render(request, "users/reset_password.html")
 
 
+class ResetPasswordConfirmView(PasswordResetConfirmView):
+    """
+    Контроллер задания нового пароля по ссылке из письма.
+    Ссылка одноразовая: токен перестает действовать после смены пароля.
+    """
+
+    form_class = UserSetPasswordForm
+    template_name = "users/reset_password_confirm.html"
+    success_url = reverse_lazy("users:login")
+
+
 class ProfileView(UpdateView):
     """
     Контроллер редактирования профиля пользователя.
@@ -88,22 +117,22 @@ class ProfileView(UpdateView):
         """
         return self.request.user
 
+    @transaction.atomic
     def form_valid(self, form):
         """
         Сохраняет изменения в профиле пользователя.
         В случае изменения адреса электронной почты генерирует токен подтверждения.
-        Отправляет письмо с ссылкой подтверждения на адрес электронной почты.
+        Ставит в очередь письмо с ссылкой подтверждения на адрес электронной почты.
         """
         user = self.get_object()
         if user.email != form.cleaned_data["new_email"]:
             user.new_email = form.cleaned_data["new_email"]
-            token = secrets.token_hex(16)
-            user.new_token = token
             user.is_active = False
             user.save()
+            token = create_verification_token(user, VerificationToken.CHANGE_EMAIL)
             host = self.request.get_host()
             url = f"http://{host}/users/change_email/{token}/"
-            send_mail(
+            enqueue_mail(
                 subject="Подтверждение почты",
                 message=f"Здравствуйте. Для подтверждения адреса электронной почты, "
                 f"пожалуйста, перейдите по ссылке {url}. Служба поддержки Naomitex.",
@@ -119,10 +148,12 @@ def change_email(request, token):
     """
     Контроллер подтверждения изменения адреса электронной почты.
     """
-    user = get_object_or_404(User, new_token=token)
+    verification = get_object_or_404(
+        get_valid_tokens(VerificationToken.CHANGE_EMAIL), token=token
+    )
+    user = verification.user
     user.email = user.new_email
-    user.token = user.new_token
-    user.new_token = ""
     user.is_active = True
     user.save()
+    verification.delete()
     return redirect("users:profile")